@@ -0,0 +1,122 @@
+"""
+Per-step savings of the form-scoped document layer (src/document.py) over the
+step handlers of the baseline commit, which built a full BeautifulSoup tree per
+step and looked up every registration field with its own find().
+
+Run with:
+    uv run python -m benchmarks.bench_document
+"""
+import logging
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from benchmarks.common import DATA_DIR, BOOKING_URL, bench
+from src.bot import (
+    BUTTON_TEXTS,
+    FIELD_MAPPING,
+    prepare_buchen_submission,
+    prepare_registration_submission,
+    prepare_confirmation_submission,
+)
+from src.config import UserInfo
+from src.course_table import CourseTable
+
+USER = UserInfo(
+    gender="männlich", first_name="Max", last_name="Mustermann", address="Musterstraße 123",
+    zip_city="52062 Aachen", status="S-RWTH", student_id="123456",
+    email="max.mustermann@rwth-aachen.de", phone="0123456789", accept_terms=True, kursnr="13131849"
+)
+
+# The parsing half of the baseline handle_*_step functions and their helpers, without the requests
+
+def baseline_find_form_by_button_text(soup, text_hint):
+    for form in soup.find_all('form'):
+        submit_btn = form.find('input', type='submit')
+        if submit_btn:
+            if text_hint in submit_btn.get('value', '').lower() or text_hint in submit_btn.get('name', '').lower():
+                return form
+        btn = form.find('button')
+        if btn and text_hint in btn.get_text().lower():
+            return form
+    return None
+
+def baseline_submission(form, base_url):
+    data = {tag.get('name'): tag.get('value', '') for tag in form.find_all('input') if tag.get('name')}
+    return {'url': urljoin(base_url, form.get('action')), 'method': form.get('method', 'get').lower(), 'data': data}
+
+def baseline_map_user(form, user):
+    data = {tag.get('name'): tag.get('value', '') for tag in form.find_all('input', type='hidden') if tag.get('name')}
+
+    def get_name(element_id):
+        el = form.find(id=element_id)
+        return el.get('name') if el else None
+
+    fields = {
+        'sex': FIELD_MAPPING['sex']['male'] if user.gender == 'männlich' else FIELD_MAPPING['sex']['female'],
+        get_name(FIELD_MAPPING['firstname']): user.first_name,
+        get_name(FIELD_MAPPING['lastname']): user.last_name,
+        get_name(FIELD_MAPPING['street']): user.address,
+        get_name(FIELD_MAPPING['city']): user.zip_city,
+        get_name(FIELD_MAPPING['email']): user.email,
+        get_name(FIELD_MAPPING['phone']): user.phone,
+    }
+    for name, value in fields.items():
+        if name:
+            data[name] = value
+    status_el = form.find(id=FIELD_MAPPING['status'])
+    if status_el:
+        for option in status_el.find_all('option'):
+            if user.status in option.get_text() or user.status == option.get('value'):
+                data[status_el.get('name')] = option.get('value')
+                break
+    if user.status == 'S-RWTH':
+        matr_input = form.find('input', attrs={'name': lambda x: x and FIELD_MAPPING['matriculation'] in x.lower()})
+        if matr_input:
+            data[matr_input.get('name')] = user.student_id
+    if user.accept_terms:
+        data[FIELD_MAPPING['terms']] = '1'
+    return data
+
+def baseline_buchen(html: str):
+    soup = BeautifulSoup(html, 'html.parser')
+    form = baseline_find_form_by_button_text(soup, BUTTON_TEXTS['buchen']) or soup.find('form')
+    return baseline_submission(form, BOOKING_URL)
+
+def baseline_registration(html: str):
+    form = BeautifulSoup(html, 'html.parser').find('form')
+    submission = baseline_submission(form, BOOKING_URL)
+    submission['data'] = baseline_map_user(form, USER)
+    return submission
+
+def baseline_confirmation(html: str):
+    form = BeautifulSoup(html, 'html.parser').find('form')
+    final_submit = form.find('input', type='submit')
+    if final_submit and BUTTON_TEXTS['buchen'] in final_submit.get('value', '').lower():
+        return baseline_submission(form, BOOKING_URL)
+    return None
+
+def baseline_offer(html: str):
+    return CourseTable.from_soup(BeautifulSoup(html, 'html.parser'))
+
+def main():
+    logging.disable(logging.CRITICAL)
+    page1 = (DATA_DIR / "page1.html").read_text(encoding='utf-8')
+    registration = (DATA_DIR / "3.html").read_text(encoding='utf-8')
+    page3 = (DATA_DIR / "page3.html").read_text(encoding='utf-8')
+    offer = (DATA_DIR / "1.html").read_text(encoding='iso-8859-1')
+
+    steps = [
+        ("buchen (page1.html)", lambda: baseline_buchen(page1), lambda: prepare_buchen_submission(page1, BOOKING_URL)),
+        ("registration (3.html)", lambda: baseline_registration(registration),
+         lambda: prepare_registration_submission(registration, USER, BOOKING_URL)),
+        ("confirmation (page3.html)", lambda: baseline_confirmation(page3),
+         lambda: prepare_confirmation_submission(page3, BOOKING_URL)),
+        ("offer table (1.html)", lambda: baseline_offer(offer), lambda: CourseTable.from_html(offer)),
+    ]
+    for label, baseline, scoped in steps:
+        print(label)
+        baseline_time = bench("baseline", baseline, 30)
+        scoped_time = bench("forms only", scoped, 30)
+        print(f"{'saved':<12} {(baseline_time - scoped_time) * 1000:8.3f} ms/call ({1 - scoped_time / baseline_time:.0%})")
+
+if __name__ == "__main__":
+    main()
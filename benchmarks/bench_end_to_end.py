@@ -0,0 +1,90 @@
+"""
+Time-to-booking against the local stand-in server (src/mock_server.py).
+For every engine mode the course opens a moment after polling starts; reports
+detection latency (opening -> booking info found) and time-to-confirmation
+(opening -> success page), median over several rounds.
+
+Run with:
+    uv run python -m benchmarks.bench_end_to_end [--latency 0.02] [--jitter 0.01] [--rounds 5]
+"""
+import time
+import asyncio
+import logging
+import argparse
+import statistics
+import httpx
+from src import bot, async_bot
+from src.config import Config, UserInfo, EngineConfig
+from src.engine import PollingEngine
+from src.mock_server import MockBookingServer
+from src.scanner import find_course_streaming
+
+KURSNR = "13131849"
+OPENS_AFTER = 0.3
+
+USER = UserInfo(
+    gender="männlich", first_name="Max", last_name="Mustermann", address="Musterstraße 123",
+    zip_city="52062 Aachen", status="S-RWTH", student_id="123456",
+    email="max.mustermann@rwth-aachen.de", phone="0123456789", accept_terms=True, kursnr=KURSNR
+)
+
+def sync_mode(detector: str):
+    def run(config: Config):
+        find = find_course_streaming if detector == "stream" else bot.find_course
+        with httpx.Client() as client:
+            while True:
+                booking_info = find(client, config, KURSNR)
+                if booking_info:
+                    break
+                time.sleep(config.engine.poll_interval)
+            detected = time.time()
+            return detected, bot.process_booking(client, config, booking_info)
+    return run
+
+def async_mode(detector: str):
+    def run(config: Config):
+        async def book():
+            async with httpx.AsyncClient() as client:
+                booking_info = await PollingEngine(client, config, KURSNR).wait_for_course()
+                detected = time.time()
+                return detected, await async_bot.process_booking(client, config, booking_info)
+        config.engine.detector = detector
+        return asyncio.run(book())
+    return run
+
+MODES = {
+    'sync/soup': sync_mode("soup"),
+    'sync/stream': sync_mode("stream"),
+    'async/soup': async_mode("soup"),
+    'async/stream': async_mode("stream"),
+}
+
+def measure(run, args) -> tuple:
+    with MockBookingServer(KURSNR, opening_at=time.time() + OPENS_AFTER, latency=args.latency,
+                           jitter=args.jitter, seed=args.seed) as server:
+        config = Config(target_url=server.offer_url, kurs_row=3, user_headers={}, user_info=USER,
+                        engine=EngineConfig(poll_interval=args.interval))
+        detected, success = run(config)
+        confirmed = time.time()
+        assert success and server.stats['confirmations'] == 1
+        return detected - server.opening_at, confirmed - server.opening_at
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.02, help="server latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--interval", type=float, default=0.05, help="poll interval (s)")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    print(f"{'mode':<14} {'detect ms':>10} {'confirm ms':>11}")
+    for name, run in MODES.items():
+        samples = [measure(run, args) for _ in range(args.rounds)]
+        detect = statistics.median(s[0] for s in samples)
+        confirm = statistics.median(s[1] for s in samples)
+        print(f"{name:<14} {detect * 1000:10.1f} {confirm * 1000:11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Poll throughput of the async find_course with parsing inline, in a thread pool or in a process pool.
+N watchers poll a never-opening course on the local stand-in server
+(src/mock_server.py) back to back for --seconds each round; every poll parses
+the full offer page. Reports polls per second and the worst event loop stall
+(how late a 10 ms timer fired) at 1, 4 and 16 concurrent watchers.
+
+Run with:
+    uv run python -m benchmarks.bench_parse_pool [--watchers 1 4 16] [--seconds 5] [--latency 0.02]
+"""
+import os
+import time
+import asyncio
+import logging
+import argparse
+import httpx
+from src import async_bot
+from src.config import Config, ParsingConfig
+from src.mock_server import MockBookingServer
+from src.parse_pool import PARSE_POOL, EXECUTORS
+from .bench_end_to_end import KURSNR, USER
+
+TICK = 0.01
+
+async def measure(config: Config, watchers: int, seconds: float) -> tuple:
+    """(polls per second, worst loop stall in seconds)"""
+    polls = 0
+    stall = 0.0
+    deadline = time.monotonic() + seconds
+
+    async def watch(client: httpx.AsyncClient):
+        nonlocal polls
+        while time.monotonic() < deadline:
+            assert await async_bot.find_course(client, config, KURSNR) is None
+            polls += 1
+
+    async def ticker():
+        nonlocal stall
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            await asyncio.sleep(TICK)
+            stall = max(stall, time.monotonic() - started - TICK)
+
+    limits = httpx.Limits(max_connections=watchers, max_keepalive_connections=watchers)
+    async with httpx.AsyncClient(limits=limits) as client:
+        started = time.monotonic()
+        await asyncio.gather(ticker(), *(watch(client) for _ in range(watchers)))
+        return polls / (time.monotonic() - started), stall
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--watchers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--executors", nargs="+", choices=EXECUTORS, default=list(EXECUTORS))
+    parser.add_argument("--workers", type=int, default=0, help="pool size, 0 = one per CPU")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of every round")
+    parser.add_argument("--latency", type=float, default=0.02, help="server latency per request (s)")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    print(f"{os.cpu_count()} CPUs, {args.latency * 1000:.0f} ms server latency")
+    print(f"{'executor':<9} {'watchers':>8} {'polls/s':>9} {'max stall ms':>13}")
+    # Shows "ab <date>" for the whole run
+    with MockBookingServer(KURSNR, opening_at=time.time() + 365 * 86400, latency=args.latency) as server:
+        config = Config(target_url=server.offer_url, kurs_row=3, user_headers={}, user_info=USER)
+        for executor in args.executors:
+            PARSE_POOL.configure(ParsingConfig(executor=executor, workers=args.workers))
+            for watchers in args.watchers:
+                rate, stall = asyncio.run(measure(config, watchers, args.seconds))
+                print(f"{executor:<9} {watchers:>8} {rate:9.1f} {stall * 1000:13.1f}")
+        PARSE_POOL.configure(ParsingConfig())
+
+if __name__ == "__main__":
+    main()
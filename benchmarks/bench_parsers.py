@@ -0,0 +1,221 @@
+"""
+Parser micro-benchmarks over the captured pages in data/, with regression thresholds.
+
+Every parser backend (html.parser, lxml and html5lib when installed, a
+SoupStrainer restricted to <form>, and the hand-written byte scanners) parses
+each page; the bot.py helpers then run on the parsed tree. Reports per-call
+latency, live allocations (tracemalloc blocks) and peak memory per step.
+Latency thresholds are ratios to the html.parser parse of the same page in
+the same run, so they hold on faster and slower machines alike.
+
+Run with:
+    uv run python -m benchmarks.bench_parsers            # report
+    uv run python -m benchmarks.bench_parsers --check    # exit 1 on a regression
+    uv run python -m benchmarks.bench_parsers --update   # rewrite the thresholds
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+import tracemalloc
+import importlib.util
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from bs4 import BeautifulSoup, SoupStrainer
+from benchmarks.common import DATA_DIR, OFFER_URL, BOOKING_URL
+from src.bot import (
+    verify_page_identity,
+    get_course_rows,
+    find_row_by_kursnr,
+    extract_booking_info_from_row,
+    extract_button_content,
+    find_form_by_button_text,
+    extract_form_submission_data,
+)
+from src.scanner import CourseScanner
+from src.payload_template import scan_form
+
+THRESHOLDS_FILE = Path(__file__).parent / "parser_thresholds.json"
+
+# Headroom written by --update over the measured values
+RATIO_HEADROOM = 3.0
+MEMORY_HEADROOM = 1.5
+
+# Every latency is compared relative to this backend's parse of the same page
+BASELINE = 'html.parser'
+
+KURSNR = "13131849"
+KURS_ROW = 3
+
+# name -> (file, encoding, kind, base_url)
+PAGES = {
+    '1.html': ('1.html', 'iso-8859-1', 'offer', OFFER_URL),
+    'debug_page.html': ('debug_page.html', 'iso-8859-1', 'offer', OFFER_URL),
+    'page1.html': ('page1.html', 'utf-8', 'form', BOOKING_URL),
+    'page3.html': ('page3.html', 'utf-8', 'form', BOOKING_URL),
+}
+
+def soup_backends() -> Dict[str, Callable[[str], BeautifulSoup]]:
+    """Tree-building backends available in this environment."""
+    backends = {
+        'html.parser': lambda html: BeautifulSoup(html, 'html.parser'),
+        # Every helper only needs the <form> subtree (the offer tables sit inside it)
+        'strainer': lambda html: BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer('form')),
+    }
+    if importlib.util.find_spec('lxml'):
+        backends['lxml'] = lambda html: BeautifulSoup(html, 'lxml')
+        backends['lxml+strainer'] = lambda html: BeautifulSoup(html, 'lxml', parse_only=SoupStrainer('form'))
+    if importlib.util.find_spec('html5lib'):
+        backends['html5lib'] = lambda html: BeautifulSoup(html, 'html5lib')
+    return backends
+
+def offer_steps(soup: BeautifulSoup, base_url: str) -> Dict[str, Callable]:
+    rows = get_course_rows(soup)
+    row = find_row_by_kursnr(rows, KURSNR)
+    return {
+        'verify_page_identity': lambda: verify_page_identity(soup),
+        'get_course_rows': lambda: get_course_rows(soup),
+        'find_row_by_kursnr': lambda: find_row_by_kursnr(rows, KURSNR),
+        'extract_booking_info_from_row': lambda: extract_booking_info_from_row(row, base_url),
+        'extract_button_content': lambda: extract_button_content(soup, KURS_ROW),
+    }
+
+def form_steps(soup: BeautifulSoup, base_url: str) -> Dict[str, Callable]:
+    form = find_form_by_button_text(soup, 'buchen')
+    return {
+        'find_form_by_button_text': lambda: find_form_by_button_text(soup, 'buchen'),
+        'extract_form_submission_data': lambda: extract_form_submission_data(form, base_url),
+    }
+
+def scanner_step(raw: bytes, kind: str, encoding: str, base_url: str) -> Callable:
+    """The hand-written equivalent of parse + all helpers of a page kind."""
+    if kind == 'offer':
+        def scan():
+            scanner = CourseScanner(KURSNR, encoding)
+            scanner.feed(raw)
+            return scanner.state(), scanner.booking_info(base_url)
+        return scan
+    html = raw.decode(encoding)
+    return lambda: scan_form(html)
+
+def time_call(func: Callable, budget: float = 0.2) -> float:
+    """Seconds per call, repeating until `budget` seconds are spent."""
+    func()
+    rounds, elapsed = 0, 0.0
+    start = time.perf_counter()
+    while elapsed < budget:
+        func()
+        rounds += 1
+        elapsed = time.perf_counter() - start
+    return elapsed / rounds
+
+def memory_call(func: Callable) -> tuple:
+    """(live blocks, peak KiB) of one call, the result kept alive."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        after = tracemalloc.take_snapshot()
+        blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+        del result
+    finally:
+        tracemalloc.stop()
+    return blocks, peak / 1024
+
+def measure(func: Callable) -> dict:
+    blocks, peak = memory_call(func)
+    return {'ms': time_call(func) * 1000, 'blocks': blocks, 'peak_kib': peak}
+
+def baseline_key(key: str) -> str:
+    return f"{key.split('/')[0]}/parse/{BASELINE}"
+
+def run_suite(pages: List[str], backends: List[str]) -> Dict[str, dict]:
+    """
+    Measure every page/step/backend. Keys are 'page/step/backend'.
+    The baseline parse is measured even when its backend is left out.
+    """
+    results = {}
+    available = soup_backends()
+    for page in pages:
+        name, encoding, kind, base_url = PAGES[page]
+        raw = (DATA_DIR / name).read_bytes()
+        html = raw.decode(encoding)
+        if BASELINE not in backends:
+            results[baseline_key(page)] = measure(lambda: available[BASELINE](html))
+        for backend in backends:
+            if backend == 'scanner':
+                results[f"{page}/scan/scanner"] = measure(scanner_step(raw, kind, encoding, base_url))
+                continue
+            parse = available[backend]
+            results[f"{page}/parse/{backend}"] = measure(lambda: parse(html))
+            steps = offer_steps if kind == 'offer' else form_steps
+            for step, func in steps(parse(html), base_url).items():
+                results[f"{page}/{step}/{backend}"] = measure(func)
+    for key, values in results.items():
+        values['ratio'] = values['ms'] / results[baseline_key(key)]['ms']
+    return results
+
+def check(results: Dict[str, dict], thresholds: Dict[str, dict]) -> List[str]:
+    """Regressions as readable lines; keys missing on either side are ignored."""
+    failures = []
+    for key, limits in thresholds.items():
+        measured = results.get(key)
+        if measured is None:
+            continue
+        for metric, limit in limits.items():
+            if measured[metric] > limit:
+                failures.append(f"{key}: {metric} {measured[metric]:.3f} > {limit:.3f}")
+    return failures
+
+def updated_thresholds(results: Dict[str, dict]) -> Dict[str, dict]:
+    return {
+        key: {
+            'ratio': round(values['ratio'] * RATIO_HEADROOM, 4),
+            'peak_kib': round(max(values['peak_kib'], 1.0) * MEMORY_HEADROOM, 1),
+        }
+        for key, values in sorted(results.items())
+        # Always 1.0
+        if key != baseline_key(key)
+    }
+
+def print_report(results: Dict[str, dict]) -> None:
+    print(f"{'page':<16} {'step':<30} {'backend':<14} {'ms/call':>9} {'x parse':>8} {'blocks':>8} {'peak KiB':>9}")
+    for key, values in results.items():
+        page, step, backend = key.split('/')
+        print(f"{page:<16} {step:<30} {backend:<14} {values['ms']:9.3f} {values['ratio']:8.4f} "
+              f"{values['blocks']:8d} {values['peak_kib']:9.1f}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    backends = list(soup_backends()) + ['scanner']
+    parser = argparse.ArgumentParser(description="Parser micro-benchmarks over data/")
+    parser.add_argument("--check", action="store_true", help=f"compare against {THRESHOLDS_FILE.name}")
+    parser.add_argument("--update", action="store_true", help=f"rewrite {THRESHOLDS_FILE.name}")
+    parser.add_argument("--page", action="append", choices=list(PAGES), help="limit to pages")
+    parser.add_argument("--backend", action="append", choices=backends, help="limit to backends")
+    args = parser.parse_args(argv)
+    logging.disable(logging.CRITICAL)
+
+    results = run_suite(args.page or list(PAGES), args.backend or backends)
+    print_report(results)
+
+    if args.update:
+        thresholds = json.loads(THRESHOLDS_FILE.read_text()) if THRESHOLDS_FILE.exists() else {}
+        updated = updated_thresholds(results)
+        thresholds.update(updated)
+        THRESHOLDS_FILE.write_text(json.dumps(thresholds, indent=2, sort_keys=True) + "\n")
+        print(f"Wrote {len(updated)} thresholds to {THRESHOLDS_FILE}")
+    if args.check:
+        failures = check(results, json.loads(THRESHOLDS_FILE.read_text()))
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            return 1
+        print("All parser benchmarks within thresholds")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
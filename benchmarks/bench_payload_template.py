@@ -0,0 +1,36 @@
+"""
+Time of the registration step's form mapping with and without the precompiled
+payload template, on data/3.html.
+
+Run with:
+    uv run python -m benchmarks.bench_payload_template
+"""
+import logging
+import tempfile
+from pathlib import Path
+from benchmarks.common import DATA_DIR, BOOKING_URL, bench
+from src.bot import prepare_registration_submission
+from src.config import UserInfo
+from src.payload_template import PayloadTemplateCache
+
+USER = UserInfo(
+    gender="männlich", first_name="Max", last_name="Mustermann", address="Musterstraße 123",
+    zip_city="52062 Aachen", status="S-RWTH", student_id="123456",
+    email="max.mustermann@rwth-aachen.de", phone="0123456789", accept_terms=True, kursnr=""
+)
+
+def main():
+    logging.disable(logging.CRITICAL)
+    html_content = (DATA_DIR / "3.html").read_text(encoding='utf-8')
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = PayloadTemplateCache(Path(cache_dir))
+        prepare_registration_submission(html_content, USER, BOOKING_URL, cache)
+        assert cache.render(html_content, USER, BOOKING_URL) == prepare_registration_submission(html_content, USER, BOOKING_URL)
+
+        mapped = bench("mapped", lambda: prepare_registration_submission(html_content, USER, BOOKING_URL), 100)
+        template = bench("template", lambda: prepare_registration_submission(html_content, USER, BOOKING_URL, cache), 2000)
+    print(f"speedup      {mapped / template:8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Per-poll cost of the flight recorder (src/recorder.py) on the offer page.
+
+Run with:
+    uv run python -m benchmarks.bench_recorder
+"""
+import httpx
+from benchmarks.common import DATA_DIR, OFFER_URL, bench
+from src.config import RecorderConfig
+from src.recorder import FlightRecorder
+
+def response(body: bytes) -> httpx.Response:
+    return httpx.Response(200, content=body, request=httpx.Request("GET", OFFER_URL))
+
+def main():
+    page = (DATA_DIR / "1.html").read_bytes()
+    same = response(page)
+    changing = [response(page.replace(b"</head>", b"<!-- %d --></head>" % i, 1)) for i in range(2)]
+    recorder = FlightRecorder(RecorderConfig(enabled=True))
+    turn = iter(range(10 ** 9))
+
+    print(f"offer page, {len(page) / 1024:.0f} KiB")
+    bench("unchanged", lambda: recorder.record_response(same), 2000)
+    bench("changed", lambda: recorder.record_response(changing[next(turn) % 2]), 200)
+    blobs = {id(entry['body']): len(entry['body']) for entry in recorder.responses}
+    print(f"{'memory':<12} {sum(blobs.values()) / 1024:8.1f} KiB for {len(recorder.responses)} responses")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Detection latency of the streaming scanner vs. the BeautifulSoup path on data/1.html.
+
+Run with:
+    uv run python -m benchmarks.bench_scanner
+"""
+import logging
+from benchmarks.common import DATA_DIR, OFFER_URL, bench
+from src.bot import parse_booking_info
+from src.scanner import CourseScanner
+
+KURSNR = "13131849"
+CHUNK_SIZE = 16 * 1024 # roughly what httpx hands out per read
+
+def main():
+    logging.disable(logging.CRITICAL)
+    body = (DATA_DIR / "1.html").read_bytes()
+    chunks = [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+
+    def soup():
+        return parse_booking_info(body.decode('iso-8859-1'), OFFER_URL, KURSNR)
+
+    def stream():
+        scanner = CourseScanner(KURSNR)
+        for chunk in chunks:
+            if scanner.feed(chunk):
+                break
+        return scanner.booking_info(OFFER_URL)
+
+    assert soup()['url'] == stream()['url']
+    soup_time = bench("soup", soup, 50)
+    stream_time = bench("stream", stream, 2000)
+    print(f"speedup      {soup_time / stream_time:8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Soak test of the sync poll loop against the local stand-in server (src/mock_server.py).
+Polls a course that never opens, by default 50k times with a full parse each,
+and reports throughput, resident set size and (with --trace) the traced heap
+and its top growing allocation sites every --every polls. A heap or RSS that
+keeps climbing across reports is a leak; with --rss-budget the client is
+recycled the way src/main.py does when the budget is exceeded.
+
+Run with:
+    uv run python -m benchmarks.bench_soak [--polls 50000] [--mode parse|conditional|detector] [--trace]
+"""
+import time
+import logging
+import argparse
+import tracemalloc
+from src import bot
+from src.config import Config, MemoryConfig
+from src.connections import ConnectionManager
+from src.conditional import ConditionalPoller
+from src.change_detector import ChangeDetector
+from src.memory import MemoryGuard, rss_bytes, MIB
+from src.mock_server import MockBookingServer
+from .bench_end_to_end import KURSNR, USER
+
+def rss_text() -> str:
+    rss = rss_bytes()
+    return f"{rss / MIB:8.1f}" if rss is not None else f"{'n/a':>8}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--polls", type=int, default=50_000)
+    parser.add_argument("--every", type=int, default=5_000, help="polls between two reports")
+    parser.add_argument("--mode", choices=["parse", "conditional", "detector"], default="parse",
+                        help="parse every page, skip unchanged pages via ETag, or via the change detector")
+    parser.add_argument("--trace", action="store_true", help="trace allocations (parsing gets several times slower)")
+    parser.add_argument("--frames", type=int, default=10)
+    parser.add_argument("--heap-budget", type=float, default=0.0, help="MiB, needs --trace")
+    parser.add_argument("--rss-budget", type=float, default=0.0, help="MiB")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    settings = MemoryConfig(enabled=True, frames=args.frames, heap_budget=args.heap_budget, rss_budget=args.rss_budget)
+    # Shows "ab <date>" for the whole run
+    with MockBookingServer(KURSNR, opening_at=time.time() + 365 * 86400) as server:
+        config = Config(target_url=server.offer_url, kurs_row=3, user_headers={}, user_info=USER)
+        manager = ConnectionManager(config)
+        client = manager.create_client()
+        poller = ConditionalPoller() if args.mode == "conditional" else None
+        detector = ChangeDetector(KURSNR) if args.mode == "detector" else None
+        guard = MemoryGuard(settings)
+        if args.trace:
+            guard.start()
+
+        print(f"{'polls':>8} {'polls/s':>9} {'RSS MiB':>8} {'heap MiB':>9} {'recycles':>9}")
+        print(f"{0:>8} {'':>9} {rss_text()} {'':>9} {0:>9}")
+        started = last = time.perf_counter()
+        for poll in range(1, args.polls + 1):
+            assert bot.find_course(client, config, KURSNR, poller, detector) is None
+            if poll % args.every and poll != args.polls:
+                continue
+            now = time.perf_counter()
+            rate = args.every / (now - last) if poll % args.every == 0 else 0.0
+            last = now
+            sites = guard.growth()[:5] if args.trace else []
+            if (args.trace or args.rss_budget) and guard.check():
+                client = manager.recycle(client)
+                guard.collect()
+            heap = f"{tracemalloc.get_traced_memory()[0] / MIB:9.1f}" if args.trace else f"{'-':>9}"
+            print(f"{poll:>8} {rate:9.0f} {rss_text()} {heap} {guard.recycles:>9}")
+            for site, size, count in sites:
+                print(f"{'':>10}+{size / 1024:.1f} KiB in {count:+d} blocks at {site}")
+        elapsed = time.perf_counter() - started
+        if args.trace:
+            guard.stop()
+        client.close()
+
+    print(f"{args.polls} polls in {elapsed:.1f}s ({args.polls / elapsed:.0f} polls/s), "
+          f"{server.stats['polls']} served, {server.stats['not_modified']} not modified")
+
+if __name__ == "__main__":
+    main()
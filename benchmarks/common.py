@@ -0,0 +1,19 @@
+"""
+Shared helpers for the offline benchmarks.
+"""
+import time
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+OFFER_URL = "https://buchung.hsz.rwth-aachen.de/angebote/aktueller_zeitraum/_Basketball_Spielbetrieb.html"
+BOOKING_URL = "https://buchung.hsz.rwth-aachen.de/cgi/anmeldung.fcgi"
+
+def bench(label: str, func, rounds: int) -> float:
+    """Time `rounds` calls after one warm-up call and print ms/call."""
+    func()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    per_call = (time.perf_counter() - start) / rounds
+    print(f"{label:<12} {per_call * 1000:8.3f} ms/call")
+    return per_call
@@ -0,0 +1,164 @@
+'''
+Async counterparts of the network-facing helpers in bot.py.
+Parsing is shared with bot.py, only the HTTP layer differs; it runs through
+PARSE_POOL, inline unless [parsing] selects a thread or process pool.
+'''
+
+
+import asyncio
+import httpx
+import logging
+from typing import Optional, Dict, Any
+from .config import Config, UserInfo
+from .conditional import ConditionalPoller
+from .change_detector import ChangeDetector
+from .connections import step_timeout
+from .course_table import CourseTable
+from .metrics import METRICS, timed
+from .capture import CAPTURE
+from .recorder import RECORDER, recorded
+from .bot import (
+    report_booking_info,
+    request_kwargs,
+    prepare_buchen_submission,
+    prepare_registration_submission,
+    prepare_confirmation_submission,
+    is_booking_successful,
+)
+from .payload_template import PayloadTemplateCache
+from .booking_flow import BookingFlow
+from .parse_pool import PARSE_POOL
+
+logger = logging.getLogger(__name__)
+
+def create_async_client(config: Config) -> httpx.AsyncClient:
+    """Create and return a configured httpx AsyncClient."""
+    return httpx.AsyncClient(
+        headers=config.user_headers,
+        timeout=30.0,
+        follow_redirects=True
+    )
+
+async def fetch_url(client: httpx.AsyncClient, url: str, method: str = 'GET', data: dict = None, params: dict = None, headers: dict = None, timeout: Optional[httpx.Timeout] = None) -> Optional[httpx.Response]:
+    """Helper to perform HTTP requests with error handling."""
+    timeout = timeout or httpx.USE_CLIENT_DEFAULT
+    extensions = {'trace': METRICS.async_trace()}
+    try:
+        with METRICS.span('fetch'):
+            if method.upper() == 'POST':
+                response = await client.post(url, data=data, headers=headers, timeout=timeout, extensions=extensions)
+            else:
+                response = await client.get(url, params=params, headers=headers, timeout=timeout, extensions=extensions)
+        # 304 answers a conditional poll, it is not an error
+        RECORDER.record_response(response)
+        CAPTURE.record(response)
+        if response.status_code != httpx.codes.NOT_MODIFIED:
+            response.raise_for_status()
+        return response
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Request for {url} returned HTTP {e.response.status_code}")
+        return None
+    except httpx.RequestError as e:
+        RECORDER.event('request_error', url=url, error=repr(e))
+        CAPTURE.record_error(e)
+        logger.error(f"Request failed for {url}: {e}")
+        return None
+
+@timed('find_course')
+async def find_course(client: httpx.AsyncClient, config: Config, kursnr: str, poller: Optional[ConditionalPoller] = None,
+                      detector: Optional[ChangeDetector] = None) -> Optional[Dict[str, Any]]:
+    """
+    High-level function to find a course and return booking info.
+    With a ConditionalPoller, unchanged pages reuse the previous result without parsing;
+    with a ChangeDetector, so do pages whose course table region did not change.
+    """
+    METRICS.record_poll()
+    response = await fetch_url(client, config.target_url, headers=poller.request_headers() if poller else None,
+                         timeout=step_timeout('poll'))
+    if not response:
+        METRICS.record_poll_error()
+        return None
+
+    if poller and not poller.observe(response):
+        return poller.cached_result
+
+    if detector and not detector.observe(response):
+        return detector.cached_result
+    state, booking_info = (await PARSE_POOL.course_states(response, [kursnr]))[kursnr]
+    if detector:
+        booking_info = detector.update(state, booking_info)
+    else:
+        booking_info = report_booking_info(kursnr, state, booking_info)
+    if poller:
+        poller.remember(booking_info)
+    return booking_info
+
+async def fetch_course_state(client: httpx.AsyncClient, config: Config, kursnr: str) -> Optional[str]:
+    """Return the booking cell content ("ab ...", "Warteliste", "buchen") of the Kursnr."""
+    response = await fetch_url(client, config.target_url)
+    if not response:
+        return None
+    record = CourseTable.from_html(response.text).get(kursnr)
+    return record.state if record else None
+
+@timed('buchen')
+@recorded('buchen')
+async def handle_buchen_step(client: httpx.AsyncClient, html_content: str, base_url: str) -> Optional[httpx.Response]:
+    """Find and submit the 'Buchen' button on the popup page."""
+    submission = prepare_buchen_submission(html_content, base_url)
+    if not submission:
+        return None
+
+    logger.info(f"Submitting 'Buchen' form to {submission['url']}")
+    return await fetch_url(client, submission['url'], **request_kwargs(submission['method'], submission['data']),
+                           timeout=step_timeout('buchen'))
+
+@timed('registration')
+@recorded('registration')
+async def handle_registration_step(client: httpx.AsyncClient, html_content: str, user: UserInfo, base_url: str,
+                                   templates: Optional[PayloadTemplateCache] = None) -> Optional[httpx.Response]:
+    """Fill and submit the registration form."""
+    submission = prepare_registration_submission(html_content, user, base_url, templates)
+    if not submission:
+        return None
+
+    logger.info(f"Submitting registration form to {submission['url']}")
+    return await fetch_url(client, submission['url'], method='POST', data=submission['data'],
+                           timeout=step_timeout('registration'))
+
+@timed('confirmation')
+@recorded('confirmation')
+async def handle_confirmation_step(client: httpx.AsyncClient, html_content: str, base_url: str) -> bool:
+    """Handle the final confirmation page."""
+    form_found, submission = prepare_confirmation_submission(html_content, base_url)
+    if not form_found:
+        return False
+
+    if submission:
+        logger.info("Found final confirmation button. Submitting...")
+        response = await fetch_url(client, submission['url'], method='POST', data=submission['data'],
+                                   timeout=step_timeout('confirmation'))
+        if not response:
+            return False
+        return is_booking_successful(response.text)
+
+    return is_booking_successful(html_content)
+
+@recorded('booking', dump=True)
+async def process_booking(client: httpx.AsyncClient, config: Config, booking_info: Dict[str, Any]) -> bool:
+    """
+    Execute the full booking flow. A failed step is re-sent on its own, see booking_flow.
+    """
+    flow = BookingFlow(config, booking_info)
+    while (request := flow.next_request()) is not None:
+        step, submission = request
+        delay = flow.retry_delay()
+        if delay:
+            await asyncio.sleep(delay)
+        with METRICS.span(step):
+            response = await fetch_url(client, submission['url'],
+                                       **request_kwargs(submission.get('method'), submission.get('data')),
+                                       timeout=step_timeout(step))
+            reading = await PARSE_POOL.booking_step(step, response, config) if response else None
+            flow.on_response(step, response, reading)
+    return flow.finish()
@@ -0,0 +1,183 @@
+'''
+Batch booking for several (user, Kursnr) jobs from one shared poller.
+The offer page is fetched and parsed once per tick (through PARSE_POOL);
+every job whose course became bookable gets its own booking pipeline on an
+isolated session. With [connections] prewarm, every session is kept warm
+(ConnectionManager.keep_warm) until its job is removed.
+'''
+
+
+import asyncio
+import logging
+from dataclasses import replace
+from typing import Dict, List, Optional
+import httpx
+from .config import Config, BookingJob
+from .connections import ConnectionManager, step_timeout
+from .async_bot import fetch_url, process_booking
+from .booking_flow import CONFIRMATIONS, job_key
+from .parse_pool import PARSE_POOL, RowState
+from .metrics import METRICS
+from .rate_control import RateController
+
+logger = logging.getLogger(__name__)
+
+def job_label(job: BookingJob) -> str:
+    """Kursnr/e-mail: the registration identity, like booking_flow.job_key. Names can repeat."""
+    return f"{job.kursnr}/{job.user_info.email}"
+
+class BatchBooker:
+    """One poller, one session per job. Jobs can be added and removed while it runs."""
+
+    def __init__(self, config: Config, jobs: List[BookingJob], manager: Optional[ConnectionManager] = None):
+        self.config = config
+        self.jobs: List[BookingJob] = []
+        self.manager = manager or ConnectionManager(config)
+        self.results: Dict[str, bool] = {}
+        self.states: Dict[str, Optional[str]] = {} # last seen booking cell per job label
+        self.ticks = 0
+        self.pending: List[BookingJob] = []
+        self.in_flight: Dict[str, asyncio.Task] = {}
+        self.sessions: Dict[str, httpx.AsyncClient] = {}
+        self.warmers: Dict[str, asyncio.Task] = {} # keep_warm per session label
+        self.poller: Optional[httpx.AsyncClient] = None
+        self.controller: Optional[RateController] = None
+        for job in jobs:
+            if not self.add_job(job):
+                logger.error(f"Job {job_label(job)} is configured twice, booking it once")
+
+    def add_job(self, job: BookingJob) -> bool:
+        """Queue a job; False if a job with the same label exists."""
+        label = job_label(job)
+        if any(job_label(j) == label for j in self.jobs):
+            return False
+        self.jobs.append(job)
+        self.pending.append(job)
+        self.sessions[label] = self.manager.create_async_client()
+        return True
+
+    async def remove_job(self, label: str) -> bool:
+        """Drop a job that is not booking right now; False if unknown or in flight."""
+        job = next((j for j in self.jobs if job_label(j) == label), None)
+        if job is None or label in self.in_flight:
+            return False
+        self.jobs.remove(job)
+        if job in self.pending:
+            self.pending.remove(job)
+        self.states.pop(label, None)
+        warmer = self.warmers.pop(label, None)
+        if warmer:
+            warmer.cancel()
+            await asyncio.gather(warmer, return_exceptions=True)
+        session = self.sessions.pop(label, None)
+        if session:
+            await session.aclose()
+        return True
+
+    def job_status(self, job: BookingJob) -> str:
+        label = job_label(job)
+        if label in self.in_flight:
+            return 'booking'
+        if self.results.get(label):
+            return 'booked'
+        return 'watching'
+
+    def ready_jobs(self, states: Dict[str, RowState], pending: List[BookingJob]) -> List[tuple]:
+        """Jobs whose course row shows a bookable button, with their booking info."""
+        ready = []
+        for job in pending:
+            if job.kursnr not in states:
+                continue # added while the page was parsed
+            state, booking_info = states[job.kursnr]
+            self.states[job_label(job)] = state
+            if booking_info:
+                ready.append((job, booking_info))
+        return ready
+
+    def job_config(self, job: BookingJob) -> Config:
+        return replace(self.config, user_info=replace(job.user_info, kursnr=job.kursnr))
+
+    async def _book(self, session: httpx.AsyncClient, job: BookingJob, booking_info: dict) -> bool:
+        try:
+            return await process_booking(session, self.job_config(job), booking_info)
+        except Exception as e:
+            logger.error(f"Booking {job_label(job)} failed: {e}")
+            return False
+
+    async def start(self) -> None:
+        """Create the poller and warm every connection."""
+        self.poller = self.manager.create_async_client()
+        if self.config.rate_control.enabled:
+            self.controller = RateController(self.config.rate_control, lambda: 1 / self.config.engine.poll_interval)
+            self.controller.install(self.poller)
+        if self.config.connections.prewarm:
+            await asyncio.gather(*(self.manager.prewarm_async(c) for c in [self.poller, *self.sessions.values()]))
+            for label in self.sessions:
+                self.keep_warm(label)
+
+    def keep_warm(self, label: str) -> None:
+        """Re-warm the session of a job whenever it sat idle; a cold session warms up first."""
+        if label not in self.warmers:
+            self.warmers[label] = asyncio.create_task(self.manager.keep_warm(self.sessions[label]))
+
+    async def tick(self) -> None:
+        """Collect finished bookings, then poll once for the pending jobs."""
+        # Collect finished pipelines; failed jobs go back to polling
+        for label, task in list(self.in_flight.items()):
+            if task.done():
+                del self.in_flight[label]
+                job = next(j for j in self.jobs if job_label(j) == label)
+                if task.result():
+                    logger.info(f"Job {label} booked")
+                    self.results[label] = True
+                elif job_key(self.job_config(job)) in CONFIRMATIONS.claimed:
+                    # The confirmation may have gone through, a second booking could double-book
+                    logger.error(f"Job {label} has an unknown outcome, not retrying")
+                    self.results[label] = False
+                else:
+                    logger.error(f"Job {label} failed during booking. Retrying...")
+                    self.pending.append(job)
+
+        if self.pending:
+            self.ticks += 1
+            METRICS.record_poll()
+            response = await fetch_url(self.poller, self.config.target_url, timeout=step_timeout('poll'))
+            if not response:
+                METRICS.record_poll_error()
+            else:
+                kursnrs = {job.kursnr for job in self.pending}
+                states = await PARSE_POOL.course_states(response, kursnrs, bookable_only=True)
+                # Jobs may have been added or removed (daemon control socket) during the parse
+                for job, booking_info in self.ready_jobs(states, self.pending):
+                    label = job_label(job)
+                    self.pending.remove(job)
+                    logger.info(f"Job {label} bookable, starting booking")
+                    self.in_flight[label] = asyncio.create_task(self._book(self.sessions[label], job, booking_info))
+
+        METRICS.maybe_export(self.config.metrics)
+
+    async def close(self) -> None:
+        tasks = [*self.in_flight.values(), *self.warmers.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.warmers.clear()
+        clients = list(self.sessions.values()) + ([self.poller] if self.poller else [])
+        await asyncio.gather(*(c.aclose() for c in clients))
+        METRICS.export(self.config.metrics)
+
+    async def run(self, forever: bool = False) -> Dict[str, bool]:
+        """Poll until every job is booked (or until cancelled). Returns success per job label."""
+        await self.start()
+        try:
+            while forever or self.pending or self.in_flight:
+                await self.tick()
+                await asyncio.sleep(self.controller.delay() if self.controller else self.config.engine.poll_interval)
+        finally:
+            await self.close()
+        return self.results
+
+async def run(config: Config, jobs: List[BookingJob]) -> Dict[str, bool]:
+    """Book all jobs from one shared poller."""
+    logger.info(f"Starting batch booking for {len(jobs)} jobs")
+    return await BatchBooker(config, jobs).run()
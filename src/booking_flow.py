@@ -0,0 +1,189 @@
+'''
+Resumable booking state machine.
+The flow booking_page -> buchen -> registration -> confirmation keeps the
+submission of every step it reached, so a failed request is retried on its
+own (one round trip) instead of restarting from find_course. Each step has a
+bounded retry policy; the final confirmation is never sent twice.
+The HTTP layer lives in bot.process_booking / async_bot.process_booking.
+'''
+
+
+import logging
+from typing import Optional, Dict, Any, Tuple
+import httpx
+from .config import Config, UserInfo
+from .recorder import RECORDER
+from .payload_template import PayloadTemplateCache
+from .bot import (
+    payload_templates,
+    prepare_buchen_submission,
+    prepare_registration_submission,
+    prepare_confirmation_submission,
+    is_booking_successful,
+)
+
+logger = logging.getLogger(__name__)
+
+STEPS = ('booking_page', 'buchen', 'registration', 'confirmation')
+
+# Attempts per step, overridden by [booking.retries]. The confirmation is sent
+# at most once whatever the configuration says: a lost answer may still have booked.
+DEFAULT_ATTEMPTS = {'booking_page': 3, 'buchen': 3, 'registration': 3, 'confirmation': 1}
+
+STEP_LABELS = {
+    'booking_page': "Accessing booking page",
+    'buchen': "Submitting 'Buchen' form to",
+    'registration': "Submitting registration form to",
+    'confirmation': "Submitting final confirmation to",
+}
+
+def job_key(config: Config) -> str:
+    return f"{config.user_info.kursnr}/{config.user_info.email}"
+
+def read_step(step: str, html_content: str, url: str, user: UserInfo,
+              templates: Optional[PayloadTemplateCache] = None) -> Dict[str, Any]:
+    """
+    What the flow needs from the answer to `step`, as a small picklable record,
+    so that the parse can also run in a worker (see parse_pool).
+    """
+    if step == 'booking_page':
+        return {'submission': prepare_buchen_submission(html_content, url)}
+    if step == 'buchen':
+        return {'submission': prepare_registration_submission(html_content, user, url, templates)}
+    if step == 'registration':
+        form_found, submission = prepare_confirmation_submission(html_content, url)
+        return {'form_found': form_found, 'submission': submission}
+    # The confirmation answer is only searched for the success message
+    return {}
+
+class ConfirmationGuard:
+    """Keys of jobs whose final confirmation was submitted (or may have been)."""
+
+    def __init__(self):
+        self.claimed = set()
+
+    def claim(self, key: str) -> bool:
+        if key in self.claimed:
+            return False
+        self.claimed.add(key)
+        return True
+
+    def release(self, key: str) -> None:
+        self.claimed.discard(key)
+
+# Confirmations with an unknown outcome stay claimed for the rest of the process
+CONFIRMATIONS = ConfirmationGuard()
+
+class BookingFlow:
+    """
+    State of one booking. next_request() names the step to send and its
+    submission; on_response() feeds the answer back and moves on, retries the
+    step, or ends the flow with outcome 'booked', 'failed' or 'unknown'.
+    """
+
+    def __init__(self, config: Config, booking_info: Dict[str, Any], guard: ConfirmationGuard = CONFIRMATIONS):
+        self.config = config
+        self.guard = guard
+        self.key = job_key(config)
+        self.step = STEPS[0]
+        self.submissions: Dict[str, Dict[str, Any]] = {
+            'booking_page': {'url': booking_info['url'], 'method': booking_info.get('method', 'get'),
+                             'data': booking_info.get('inputs')},
+        }
+        self.pages: Dict[str, Tuple[str, str]] = {} # step -> (html, url) of its last good answer
+        self.attempts = {step: 0 for step in STEPS}
+        self.outcome: Optional[str] = None
+        self.claimed = False
+
+    @property
+    def booked(self) -> bool:
+        return self.outcome == 'booked'
+
+    def max_attempts(self, step: str) -> int:
+        if step == 'confirmation':
+            return 1
+        return max(1, int(self.config.booking.retries.get(step, DEFAULT_ATTEMPTS[step])))
+
+    def retry_delay(self) -> float:
+        """Backoff before the request next_request() just returned, doubling per retry."""
+        retries = self.attempts[self.step] - 1
+        return self.config.booking.backoff * 2 ** (retries - 1) if retries > 0 else 0.0
+
+    def next_request(self) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(step, submission) to send now, or None once the flow has an outcome."""
+        if self.outcome:
+            return None
+        step = self.step
+        if not self.claimed and self.key in self.guard.claimed:
+            logger.error(f"Confirmation for {self.key} was already submitted, not booking again")
+            self.outcome = 'failed'
+            return None
+        if step == 'confirmation':
+            self.claimed = self.guard.claim(self.key)
+        self.attempts[step] += 1
+        submission = self.submissions[step]
+        logger.info(f"{STEP_LABELS[step]}: {submission['url']}")
+        RECORDER.event(step, phase='start', attempt=self.attempts[step])
+        return step, submission
+
+    def on_response(self, step: str, response: Optional[httpx.Response],
+                    reading: Optional[Dict[str, Any]] = None) -> None:
+        """`reading` is the read_step() record of the response, parsed here when missing."""
+        if response is None:
+            RECORDER.event(step, phase='end', ok=False)
+            if step == 'confirmation':
+                # The request may have reached the server; re-sending could book twice
+                logger.error("Confirmation outcome unknown, not re-submitting. Check your e-mail.")
+                self.outcome = 'unknown'
+                return
+            self._retry_or_fail(step, "request failed")
+            return
+
+        html_content, url = response.text, str(response.url)
+        if reading is None:
+            reading = read_step(step, html_content, url, self.config.user_info, payload_templates(self.config))
+        advanced = self._advance(step, html_content, reading)
+        RECORDER.event(step, phase='end', ok=advanced)
+        if advanced:
+            self.pages[step] = (html_content, url)
+        elif not self.outcome:
+            self._retry_or_fail(step, "unexpected page")
+
+    def _advance(self, step: str, html_content: str, reading: Dict[str, Any]) -> bool:
+        """Prepare the next step from this step's answer. False if the answer is not usable."""
+        if step == 'booking_page':
+            return self._goto('buchen', reading['submission'])
+        if step == 'buchen':
+            return self._goto('registration', reading['submission'])
+        if step == 'registration':
+            if not reading['form_found']:
+                return False
+            if reading['submission'] is None:
+                # No final click needed, the registration answer is the result
+                self.outcome = 'booked' if is_booking_successful(html_content) else 'failed'
+                return True
+            return self._goto('confirmation', dict(reading['submission'], method='post'))
+
+        self.outcome = 'booked' if is_booking_successful(html_content) else 'failed'
+        return True
+
+    def _goto(self, step: str, submission: Optional[Dict[str, Any]]) -> bool:
+        if not submission:
+            return False
+        self.submissions[step] = submission
+        self.step = step
+        return True
+
+    def _retry_or_fail(self, step: str, reason: str) -> None:
+        if self.attempts[step] < self.max_attempts(step):
+            logger.warning(f"Step {step} failed ({reason}), retrying ({self.attempts[step]}/{self.max_attempts(step)})")
+            return
+        logger.error(f"Step {step} failed ({reason}) after {self.attempts[step]} attempts")
+        self.outcome = 'failed'
+
+    def finish(self) -> bool:
+        """Release this flow's confirmation claim unless its outcome is unknown."""
+        if self.claimed and self.outcome != 'unknown':
+            self.guard.release(self.key)
+            self.claimed = False
+        return self.booked
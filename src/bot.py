@@ -3,12 +3,22 @@ uv run
 ''' 
 
 
+import time
 import httpx
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from .config import Config, UserInfo
+from .conditional import ConditionalPoller
+from .change_detector import ChangeDetector
+from .connections import step_timeout
+from .course_table import CourseTable, BOOK_BUTTON_CLASS
+from .metrics import METRICS, timed
+from .capture import CAPTURE
+from .recorder import RECORDER, HOT_LOG, recorded
+from .document import FormDocument, parse_forms, contains_success_marker
+from .payload_template import PayloadTemplateCache, get_template_cache, scan_form
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -31,9 +41,12 @@ FIELD_MAPPING = {
 
 BUTTON_TEXTS = {
     'buchen': 'buchen',
-    'book_button_class': 'bs_btn_buchen'
+    'book_button_class': BOOK_BUTTON_CLASS
 }
 
+# bs_head heading of the default offer page; other offers pass their own
+OFFER_TITLE = "Basketball Spielbetrieb"
+
 def create_client(config: Config) -> httpx.Client:
     """Create and return a configured httpx Client."""
     return httpx.Client(
@@ -42,16 +55,28 @@ def create_client(config: Config) -> httpx.Client:
         follow_redirects=True
     )
 
-def fetch_url(client: httpx.Client, url: str, method: str = 'GET', data: dict = None, params: dict = None) -> Optional[httpx.Response]:
+def fetch_url(client: httpx.Client, url: str, method: str = 'GET', data: dict = None, params: dict = None, headers: dict = None, timeout: Optional[httpx.Timeout] = None) -> Optional[httpx.Response]:
     """Helper to perform HTTP requests with error handling."""
+    timeout = timeout or httpx.USE_CLIENT_DEFAULT
+    extensions = {'trace': METRICS.trace()}
     try:
-        if method.upper() == 'POST':
-            response = client.post(url, data=data)
-        else:
-            response = client.get(url, params=params)
-        response.raise_for_status()
+        with METRICS.span('fetch'):
+            if method.upper() == 'POST':
+                response = client.post(url, data=data, headers=headers, timeout=timeout, extensions=extensions)
+            else:
+                response = client.get(url, params=params, headers=headers, timeout=timeout, extensions=extensions)
+        # 304 answers a conditional poll, it is not an error
+        RECORDER.record_response(response)
+        CAPTURE.record(response)
+        if response.status_code != httpx.codes.NOT_MODIFIED:
+            response.raise_for_status()
         return response
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Request for {url} returned HTTP {e.response.status_code}")
+        return None
     except httpx.RequestError as e:
+        RECORDER.event('request_error', url=url, error=repr(e))
+        CAPTURE.record_error(e)
         logger.error(f"Request failed for {url}: {e}")
         return None
 
@@ -66,7 +91,12 @@ def get_course_rows(soup: BeautifulSoup) -> List[Any]:
 def find_row_by_kursnr(rows: List[Any], kursnr: str) -> Optional[Any]:
     """Find the specific row containing the Kursnr."""
     for row in rows:
-        if kursnr in row.get_text():
+        # Compare the Kursnr cell exactly, other cells may contain the number as well
+        kursnr_cell = row.find('td', class_='bs_sknr')
+        if kursnr_cell is not None:
+            if kursnr_cell.get_text(strip=True) == kursnr:
+                return row
+        elif kursnr in row.get_text():
             return row
     return None
 
@@ -105,71 +135,38 @@ def extract_booking_info_from_row(row: Any, base_url: str) -> Optional[Dict[str,
     logger.warning("Row found but no recognized booking button or link")
     return None
 
-def verify_page_identity(soup: BeautifulSoup) -> bool:
+def verify_page_identity(soup: BeautifulSoup, expected_title: str = OFFER_TITLE) -> bool:
     """
-    Check if the page contains the specific header:
+    Check if the page contains the specific header, by default:
     <div class="bs_head" role="heading">Basketball Spielbetrieb</div>
     """
     header = soup.find('div', class_='bs_head', role='heading')
 
-    if header and "Basketball Spielbetrieb" in header.get_text():
-        logger.info("Page identity verified: Basketball Spielbetrieb")
+    if header and expected_title in header.get_text():
+        logger.info(f"Page identity verified: {expected_title}")
         return True
         
-    logger.error("Page identity verification failed")
+    logger.error(f"Page identity verification failed, expected {expected_title!r}")
     return False
 
 def extract_button_content(soup: BeautifulSoup, row_index: int) -> Optional[str]:
     """
     Extract the content of the button in the 9th cell (index 8) of the specified row.
     """
-    courses_table = soup.find('table', class_='bs_kurse')
-    if not courses_table:
+    return button_content_from_table(CourseTable.from_soup(soup), row_index)
+
+def button_content_from_table(table: CourseTable, row_index: int) -> Optional[str]:
+    """Button content of the given row in an already extracted CourseTable."""
+    if not len(table):
         logger.error("Could not find course table (table.bs_kurse)")
         return None
-    
-    rows = courses_table.find_all('tr')
-    # Filter out header row if it's included in find_all('tr') usually it is inside thead, 
-    # but find_all('tr') on table returns all.
-    # Based on HTML, the first row is in thead. The body rows start after.
-    # Let's be safe and look for tbody if possible, or just skip the first one if it's a header.
-    
-    tbody = courses_table.find('tbody')
-    if tbody:
-        rows = tbody.find_all('tr')
-    else:
-        # Fallback: skip the first row if it contains 'th'
-        all_rows = courses_table.find_all('tr')
-        rows = [r for r in all_rows if not r.find('th')]
 
-    if row_index < 0 or row_index >= len(rows):
-        logger.error(f"Row index {row_index} out of bounds. Found {len(rows)} rows.")
-        return None
-    
-    target_row = rows[row_index]
-    cells = target_row.find_all('td')
-    
-    # 9th cell is index 8
-    if len(cells) <= 8:
-        logger.error(f"Row {row_index} does not have 9 cells.")
+    record = table.row(row_index)
+    if record is None:
+        logger.error(f"Row index {row_index} out of bounds. Found {len(table)} rows.")
         return None
-        
-    booking_cell = cells[8]
-    
-    # Check for input button
-    input_btn = booking_cell.find('input', type='submit')
-    if input_btn:
-        return input_btn.get('value')
-        
-    # Check for span (e.g. "ab 03.12., 19:30")
-    span_btn = booking_cell.find('span')
-    if span_btn:
-        text = span_btn.get_text(strip=True)
-        return " ".join(text.split())
-        
-    # Fallback: just text
-    text = booking_cell.get_text(strip=True)
-    return " ".join(text.split())
+
+    return record.state
 
 def run_check(client: httpx.Client, config: Config) -> None:
     """
@@ -180,38 +177,85 @@ def run_check(client: httpx.Client, config: Config) -> None:
     if not response:
         return
 
-    soup = BeautifulSoup(response.text, 'html.parser')
+    # Header and course tables both sit inside the booking form
+    soup = parse_forms(response.text)
     
     # 1. Verify Page
-    if not verify_page_identity(soup):
+    verified = verify_page_identity(soup)
+    table = CourseTable.from_soup(soup)
+    soup.decompose()
+    if not verified:
         return
         
     # 2. Extract Button Content
-    content = extract_button_content(soup, config.kurs_row)
+    content = button_content_from_table(table, config.kurs_row)
     if content:
         logger.info(f"Button content at row {config.kurs_row}: '{content}'")
         print(f"RESULT: {content}") # Print to stdout for easy reading
     else:
         logger.error("Failed to extract button content")
 
-def find_course(client: httpx.Client, config: Config, kursnr: str) -> Optional[Dict[str, Any]]:
-    """High-level function to find a course and return booking info."""
-    logger.info(f"Navigating to target URL: {config.target_url}")
-    response = fetch_url(client, config.target_url)
-    if not response:
-        return None
-
-    soup = BeautifulSoup(response.text, 'html.parser')
-    rows = get_course_rows(soup)
-    logger.info(f"Found {len(rows)} rows in course table")
+@timed('parse')
+def parse_booking_info(html_content: str, base_url: str, kursnr: str) -> Optional[Dict[str, Any]]:
+    """Parse the offer page and return booking info for the given Kursnr."""
+    table = CourseTable.from_html(html_content)
+    logger.debug("Found %d rows in course tables", len(table))
     
-    target_row = find_row_by_kursnr(rows, kursnr)
-    if not target_row:
+    record = table.get(kursnr)
+    return report_booking_info(kursnr, record.state if record else None,
+                               record.booking_info(base_url) if record else None)
+
+def report_booking_info(kursnr: str, state: Optional[str], booking_info: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Log and record what the offer page shows for the Kursnr (state None: no such row)."""
+    if state is None:
         logger.error(f"Course with Kursnr {kursnr} not found")
         return None
 
-    logger.info(f"Found row for Kursnr {kursnr}")
-    return extract_booking_info_from_row(target_row, str(response.url))
+    RECORDER.event('state', kursnr=kursnr, state=state)
+    skipped = HOT_LOG.allow('state')
+    if skipped is not None:
+        logger.info(f"Found row for Kursnr {kursnr}: {state} ({skipped} polls since last message)")
+    if booking_info:
+        logger.info(f"Found booking {booking_info['type']}: {booking_info['url']}")
+    elif HOT_LOG.allow('no_button') is not None:
+        logger.warning("Row found but no recognized booking button or link")
+    return booking_info
+
+@timed('find_course')
+def find_course(client: httpx.Client, config: Config, kursnr: str, poller: Optional[ConditionalPoller] = None,
+                detector: Optional[ChangeDetector] = None) -> Optional[Dict[str, Any]]:
+    """
+    High-level function to find a course and return booking info.
+    With a ConditionalPoller, unchanged pages reuse the previous result without parsing;
+    with a ChangeDetector, so do pages whose course table region did not change.
+    """
+    METRICS.record_poll()
+    response = fetch_url(client, config.target_url, headers=poller.request_headers() if poller else None,
+                         timeout=step_timeout('poll'))
+    if not response:
+        METRICS.record_poll_error()
+        return None
+
+    if poller and not poller.observe(response):
+        return poller.cached_result
+
+    if detector:
+        if not detector.observe(response):
+            return detector.cached_result
+        booking_info = detector.extract(response.text, str(response.url))
+    else:
+        booking_info = parse_booking_info(response.text, str(response.url), kursnr)
+    if poller:
+        poller.remember(booking_info)
+    return booking_info
+
+def fetch_course_state(client: httpx.Client, config: Config, kursnr: str) -> Optional[str]:
+    """Return the booking cell content ("ab ...", "Warteliste", "buchen") of the Kursnr."""
+    response = fetch_url(client, config.target_url)
+    if not response:
+        return None
+    record = CourseTable.from_html(response.text).get(kursnr)
+    return record.state if record else None
 
 def find_form_by_button_text(soup: BeautifulSoup, text_hint: str) -> Optional[Any]:
     """Find a form that contains a submit button with specific text."""
@@ -245,27 +289,42 @@ def extract_form_submission_data(form: Any, base_url: str) -> Dict[str, Any]:
     }
     return {'url': url, 'method': method, 'data': data}
 
+def request_kwargs(method: str, data: Optional[dict]) -> Dict[str, Any]:
+    """Route form data to the request body for POST and the query string otherwise."""
+    method = (method or 'get').lower()
+    return {
+        'method': method,
+        'data': data if method == 'post' else None,
+        'params': data if method == 'get' else None,
+    }
+
+def prepare_buchen_submission(html_content: str, base_url: str) -> Optional[Dict[str, Any]]:
+    """Find the 'Buchen' form on the popup page and return its submission data."""
+    with FormDocument(html_content) as document:
+        buchen_form = document.form_with_button(BUTTON_TEXTS['buchen'])
+        
+        if not buchen_form:
+            # Fallback: if only one form exists, it might be the one
+            buchen_form = document.first_form
+            if buchen_form:
+                logger.warning("Explicit 'Buchen' button not found, trying the first form.")
+            else:
+                logger.error("No booking form found on the page")
+                return None
+
+        return buchen_form.submission(base_url)
+
+@timed('buchen')
+@recorded('buchen')
 def handle_buchen_step(client: httpx.Client, html_content: str, base_url: str) -> Optional[httpx.Response]:
     """Find and submit the 'Buchen' button on the popup page."""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    buchen_form = find_form_by_button_text(soup, BUTTON_TEXTS['buchen'])
-    
-    if not buchen_form:
-        # Fallback: if only one form exists, it might be the one
-        forms = soup.find_all('form')
-        if forms:
-            logger.warning("Explicit 'Buchen' button not found, trying the first form.")
-            buchen_form = forms[0]
-        else:
-            logger.error("No booking form found on the page")
-            return None
+    submission = prepare_buchen_submission(html_content, base_url)
+    if not submission:
+        return None
 
-    submission = extract_form_submission_data(buchen_form, base_url)
     logger.info(f"Submitting 'Buchen' form to {submission['url']}")
-    
-    return fetch_url(client, submission['url'], method=submission['method'], 
-                     data=submission['data'] if submission['method'] == 'post' else None,
-                     params=submission['data'] if submission['method'] == 'get' else None)
+    return fetch_url(client, submission['url'], **request_kwargs(submission['method'], submission['data']),
+                     timeout=step_timeout('buchen'))
 
 def map_user_to_form_fields(form: Any, user: UserInfo) -> Dict[str, str]:
     """Map UserInfo to the specific fields in the registration form."""
@@ -275,8 +334,13 @@ def map_user_to_form_fields(form: Any, user: UserInfo) -> Dict[str, str]:
         if input_tag.get('name')
     }
     
+    # One walk over the form instead of a find() per field
+    by_id = {}
+    for tag in form.find_all(id=True):
+        by_id.setdefault(tag['id'], tag)
+
     def get_name(element_id):
-        el = form.find(id=element_id)
+        el = by_id.get(element_id)
         return el.get('name') if el else None
 
     # Standard fields mapping
@@ -295,7 +359,7 @@ def map_user_to_form_fields(form: Any, user: UserInfo) -> Dict[str, str]:
             data[name] = value
 
     # Status field (Select)
-    status_el = form.find(id=FIELD_MAPPING['status'])
+    status_el = by_id.get(FIELD_MAPPING['status'])
     if status_el:
         status_name = status_el.get('name')
         for option in status_el.find_all('option'):
@@ -318,79 +382,118 @@ def map_user_to_form_fields(form: Any, user: UserInfo) -> Dict[str, str]:
         
     return data
 
-def handle_registration_step(client: httpx.Client, html_content: str, user: UserInfo, base_url: str) -> Optional[httpx.Response]:
-    """Fill and submit the registration form."""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    reg_form = soup.find('form')
-    if not reg_form:
-        logger.error("No registration form found")
+def payload_templates(config: Config) -> Optional[PayloadTemplateCache]:
+    """The registration payload cache, if enabled in [engine]."""
+    if not config.engine.payload_templates:
         return None
-        
-    logger.info("Filling registration form")
-    form_data = map_user_to_form_fields(reg_form, user)
+    return get_template_cache(config.engine.payload_cache_dir)
+
+def prepare_registration_submission(html_content: str, user: UserInfo, base_url: str,
+                                    templates: Optional[PayloadTemplateCache] = None) -> Optional[Dict[str, Any]]:
+    """Fill the registration form and return its submission data."""
+    if templates:
+        submission = templates.render(html_content, user, base_url)
+        if submission:
+            logger.info("Using precompiled registration payload")
+            return submission
+
+    with FormDocument(html_content) as document:
+        reg_form = document.first_form
+        if not reg_form:
+            logger.error("No registration form found")
+            return None
+            
+        logger.info("Filling registration form")
+        form_data = map_user_to_form_fields(reg_form.element, user)
+        submission = reg_form.submission(base_url)
+
+    if templates:
+        scan = scan_form(html_content)
+        if scan:
+            templates.store(scan, user, form_data)
     
-    submission = extract_form_submission_data(reg_form, base_url)
     # Override data with our filled data
     submission['data'] = form_data
-    
+    submission['method'] = 'post'
+    return submission
+
+@timed('registration')
+@recorded('registration')
+def handle_registration_step(client: httpx.Client, html_content: str, user: UserInfo, base_url: str,
+                             templates: Optional[PayloadTemplateCache] = None) -> Optional[httpx.Response]:
+    """Fill and submit the registration form."""
+    submission = prepare_registration_submission(html_content, user, base_url, templates)
+    if not submission:
+        return None
+
     logger.info(f"Submitting registration form to {submission['url']}")
-    return fetch_url(client, submission['url'], method='POST', data=submission['data'])
+    return fetch_url(client, submission['url'], method='POST', data=submission['data'],
+                     timeout=step_timeout('registration'))
 
-def handle_confirmation_step(client: httpx.Client, html_content: str, base_url: str) -> bool:
-    """Handle the final confirmation page."""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    conf_form = soup.find('form')
-    
-    if not conf_form:
-        logger.error("No confirmation form found")
-        return False
-        
-    # Check if we need to click a button or if it's already done
-    final_submit = conf_form.find('input', type='submit')
-    if final_submit and BUTTON_TEXTS['buchen'] in final_submit.get('value', '').lower():
-        logger.info("Found final confirmation button. Submitting...")
-        submission = extract_form_submission_data(conf_form, base_url)
+def prepare_confirmation_submission(html_content: str, base_url: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """
+    Inspect the final confirmation page.
+    Returns (form_found, submission); submission is None when no final click is needed.
+    """
+    with FormDocument(html_content) as document:
+        conf_form = document.first_form
         
-        # Add button value if needed
-        if final_submit.get('name'):
-            submission['data'][final_submit.get('name')] = final_submit.get('value')
+        if not conf_form:
+            logger.error("No confirmation form found")
+            return False, None
             
-        response = fetch_url(client, submission['url'], method='POST', data=submission['data'])
-        if not response:
-            return False
-        text = response.text.lower()
-    else:
-        text = html_content.lower()
+        # Check if we need to click a button or if it's already done
+        final_submit = conf_form.submits[0] if conf_form.submits else None
+        if final_submit and BUTTON_TEXTS['buchen'] in final_submit.get('value', '').lower():
+            # Named submit buttons are part of conf_form.inputs already
+            return True, conf_form.submission(base_url)
 
-    if "erfolgreich" in text or "successful" in text:
+    return True, None
+
+def is_booking_successful(text: str) -> bool:
+    """Check the final page for the success message."""
+    if contains_success_marker(text):
         logger.info("Booking successful! 🎉")
         return True
     
     logger.warning("Booking finished but success message not found.")
     return True
 
-def process_booking(client: httpx.Client, config: Config, booking_info: Dict[str, Any]) -> bool:
-    """
-    Execute the full booking flow.
-    """
-    # 1. Access Booking Page
-    logger.info(f"Accessing booking page: {booking_info['url']}")
-    response = fetch_url(client, booking_info['url'], 
-                         method=booking_info.get('method', 'get'),
-                         data=booking_info.get('inputs') if booking_info.get('method') == 'post' else None,
-                         params=booking_info.get('inputs') if booking_info.get('method') == 'get' else None)
-    if not response:
+@timed('confirmation')
+@recorded('confirmation')
+def handle_confirmation_step(client: httpx.Client, html_content: str, base_url: str) -> bool:
+    """Handle the final confirmation page."""
+    form_found, submission = prepare_confirmation_submission(html_content, base_url)
+    if not form_found:
         return False
 
-    # 2. Handle 'Buchen' Step (Popup)
-    response = handle_buchen_step(client, response.text, str(response.url))
-    if not response:
-        return False
+    if submission:
+        logger.info("Found final confirmation button. Submitting...")
+        response = fetch_url(client, submission['url'], method='POST', data=submission['data'],
+                             timeout=step_timeout('confirmation'))
+        if not response:
+            return False
+        return is_booking_successful(response.text)
 
-    # 3. Handle Registration Form
-    response = handle_registration_step(client, response.text, config.user_info, str(response.url))
-    if not response:
-        return False
+    return is_booking_successful(html_content)
 
-    # 4. Handle Final Confirmation
-    return handle_confirmation_step(client, response.text, str(response.url))
+@recorded('booking', dump=True)
+def process_booking(client: httpx.Client, config: Config, booking_info: Dict[str, Any]) -> bool:
+    """
+    Execute the full booking flow. A failed step is re-sent on its own, see booking_flow.
+    """
+    # Imported here: booking_flow builds on the helpers of this module
+    from .booking_flow import BookingFlow
+
+    flow = BookingFlow(config, booking_info)
+    while (request := flow.next_request()) is not None:
+        step, submission = request
+        delay = flow.retry_delay()
+        if delay:
+            time.sleep(delay)
+        with METRICS.span(step):
+            response = fetch_url(client, submission['url'],
+                                 **request_kwargs(submission.get('method'), submission.get('data')),
+                                 timeout=step_timeout(step))
+            flow.on_response(step, response)
+    return flow.finish()
@@ -0,0 +1,308 @@
+'''
+Capture and replay of whole sessions.
+With [capture] enabled, every request fetch_url sends (the poll sequence and
+every booking step, redirects and request errors included) is written to one
+zip file under data/captures/: index.jsonl holds one line per exchange with
+its timestamp, method, URL, headers and status; bodies are stored compressed
+under blobs/ once per distinct content, so a long run of identical polls
+costs one copy. While the run lasts, the same layout is written to a working
+directory next to it, one index line at a time, and packed into the zip on
+exit; a killed run leaves that directory, which loads like a zip.
+Captures contain the data sent in the registration form, so both are only
+accessible to their owner.
+
+ReplayTransport answers a client from a capture instead of the network, so the
+bot's parsing and booking code runs against a real opening event offline,
+either request by request as fast as possible or on the captured timeline,
+accelerated by `speed`.
+
+    uv run python -m src.capture info data/captures/<file>.zip (or the directory of a killed run)
+    uv run python -m src.capture replay data/captures/<file>.zip [--speed 10]
+'''
+
+
+import os
+import json
+import time
+import shutil
+import bisect
+import atexit
+import asyncio
+import hashlib
+import logging
+import zipfile
+import argparse
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+import httpx
+from .config import CaptureConfig, Config, load_config
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# Bodies are stored decoded, these would describe the wire format
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+class SessionCapture:
+    """Writes the exchanges of one run to a capture file."""
+
+    def __init__(self, settings: Optional[CaptureConfig] = None):
+        self.index = None
+        self.configure(settings or CaptureConfig())
+
+    def configure(self, settings: CaptureConfig) -> None:
+        self.close()
+        self.settings = settings
+        self.enabled = settings.enabled
+        self.entries = 0
+        self.blobs: set = set()
+        self.path: Optional[Path] = None
+        if not self.enabled:
+            return
+        root = Path(__file__).parent.parent / settings.dir
+        root.mkdir(parents=True, exist_ok=True)
+        name = time.strftime('%Y%m%d-%H%M%S')
+        self.path = root / f"{name}.zip"
+        self.work = root / name
+        (self.work / "blobs").mkdir(mode=0o700, parents=True)
+        os.chmod(self.work, 0o700)
+        self.started = time.time()
+        self.clock = time.monotonic()
+        (self.work / "session.json").write_text(json.dumps({'version': FORMAT_VERSION, 'started': self.started}))
+        self.index = open(self.work / "index.jsonl", 'a', encoding='utf-8')
+        atexit.register(self.close)
+        logger.info(f"Capturing session to {self.path}")
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        # One flushed line per exchange: a killed run keeps everything up to its last request
+        self.index.write(json.dumps(entry) + "\n")
+        self.index.flush()
+        self.entries += 1
+
+    def _entry(self, request: httpx.Request) -> Dict[str, Any]:
+        return {
+            't': round(time.monotonic() - self.clock, 6),
+            'method': request.method,
+            'url': str(request.url),
+            'request_headers': request.headers.multi_items(),
+            'request_body': request.content.decode('utf-8', errors='replace'),
+        }
+
+    def record(self, response: httpx.Response) -> None:
+        """Store a read response and the redirects that led to it."""
+        if not self.enabled:
+            return
+        for hop in [*response.history, response]:
+            body = hop.content
+            blob = hashlib.sha1(body).hexdigest()
+            if blob not in self.blobs:
+                self.blobs.add(blob)
+                (self.work / "blobs" / blob).write_bytes(body)
+            try:
+                elapsed = hop.elapsed.total_seconds()
+            except RuntimeError:
+                elapsed = None
+            self._write(self._entry(hop.request) | {
+                'status': hop.status_code,
+                'elapsed': elapsed,
+                'headers': [(k, v) for k, v in hop.headers.multi_items() if k.lower() not in DROPPED_HEADERS],
+                'body': blob,
+            })
+
+    def record_error(self, error: httpx.RequestError) -> None:
+        """Store a request that got no response; the replay raises the same error."""
+        if not self.enabled:
+            return
+        try:
+            request = error.request
+        except RuntimeError:
+            return
+        self._write(self._entry(request) | {'error': type(error).__name__, 'message': str(error)})
+
+    def close(self) -> Optional[Path]:
+        """Pack the working directory into the capture file and remove it."""
+        if self.index is None:
+            return None
+        self.index.close()
+        self.index = None
+        meta = {'version': FORMAT_VERSION, 'started': self.started, 'entries': self.entries, 'blobs': len(self.blobs)}
+        os.close(os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600))
+        with zipfile.ZipFile(self.path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+            archive.write(self.work / "index.jsonl", "index.jsonl")
+            for blob in sorted(self.blobs):
+                archive.write(self.work / "blobs" / blob, f"blobs/{blob}")
+            archive.writestr("meta.json", json.dumps(meta))
+        shutil.rmtree(self.work)
+        logger.info(f"Captured {self.entries} exchanges ({len(self.blobs)} distinct bodies) to {self.path}")
+        return self.path
+
+CAPTURE = SessionCapture()
+
+class Capture:
+    """A capture file loaded for replay, or the working directory of a run that did not finish."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        if self.path.is_dir():
+            self.meta = json.loads((self.path / "session.json").read_text())
+            index = (self.path / "index.jsonl").read_text(encoding='utf-8')
+            self._bodies = {blob.name: blob.read_bytes() for blob in (self.path / "blobs").iterdir()}
+            self.meta |= {'blobs': len(self._bodies), 'complete': False}
+        else:
+            with zipfile.ZipFile(self.path) as archive:
+                self.meta = json.loads(archive.read("meta.json")) | {'complete': True}
+                index = archive.read("index.jsonl").decode('utf-8')
+                self._bodies = {name.removeprefix("blobs/"): archive.read(name)
+                                for name in archive.namelist() if name.startswith("blobs/")}
+        # A line cut off by the kill is dropped
+        self.entries = []
+        for line in index.splitlines():
+            try:
+                self.entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+
+    def body(self, entry: Dict[str, Any]) -> bytes:
+        return self._bodies[entry['body']]
+
+    @property
+    def duration(self) -> float:
+        return self.entries[-1]['t'] - self.entries[0]['t'] if self.entries else 0.0
+
+    def first_url(self, method: str = 'GET') -> Optional[str]:
+        return next((entry['url'] for entry in self.entries if entry['method'] == method), None)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+class ReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Answers requests from a capture, matched by method and URL.
+    Without `speed`, each (method, URL) gets its captured answers in order and
+    the last one repeats. With `speed`, a GET gets the answer that was current
+    at that point of the captured timeline (replay time x speed), and every
+    answer is delayed by its captured latency / speed; other methods stay in order.
+    """
+
+    def __init__(self, capture: Capture, speed: Optional[float] = None):
+        self.capture = capture
+        self.speed = speed
+        self.queues: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for entry in capture.entries:
+            self.queues.setdefault((entry['method'], entry['url']), []).append(entry)
+        self.times = {key: [entry['t'] for entry in queue] for key, queue in self.queues.items()}
+        self.served: Dict[Tuple[str, str], int] = {}
+        self.origin = capture.entries[0]['t'] if capture.entries else 0.0
+        self.started: Optional[float] = None
+        self.stats = {'requests': 0, 'unmatched': 0}
+
+    def _select(self, request: httpx.Request) -> Optional[Dict[str, Any]]:
+        key = (request.method, str(request.url))
+        queue = self.queues.get(key)
+        if not queue:
+            return None
+        if self.speed and request.method == 'GET':
+            now = self.origin + (time.monotonic() - self.started) * self.speed
+            return queue[max(bisect.bisect_right(self.times[key], now) - 1, 0)]
+        position = self.served.get(key, 0)
+        self.served[key] = position + 1
+        return queue[min(position, len(queue) - 1)]
+
+    def _answer(self, request: httpx.Request) -> Tuple[float, Optional[Dict[str, Any]]]:
+        """(seconds to wait, captured entry) for a request."""
+        if self.started is None:
+            self.started = time.monotonic()
+        self.stats['requests'] += 1
+        entry = self._select(request)
+        if entry is None:
+            self.stats['unmatched'] += 1
+            logger.warning(f"Replay: no captured answer for {request.method} {request.url}")
+            return 0.0, None
+        delay = (entry.get('elapsed') or 0.0) / self.speed if self.speed else 0.0
+        return delay, entry
+
+    def _response(self, request: httpx.Request, entry: Optional[Dict[str, Any]]) -> httpx.Response:
+        if entry is None:
+            return httpx.Response(404, request=request)
+        if 'error' in entry:
+            raise getattr(httpx, entry['error'], httpx.TransportError)(entry['message'], request=request)
+        return httpx.Response(entry['status'], headers=entry['headers'], content=self.capture.body(entry),
+                              request=request)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        delay, entry = self._answer(request)
+        if delay:
+            time.sleep(delay)
+        return self._response(request, entry)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        delay, entry = self._answer(request)
+        if delay:
+            await asyncio.sleep(delay)
+        return self._response(request, entry)
+
+def replay(capture: Capture, config: Config, speed: Optional[float] = None,
+           poll_interval: float = 0.0) -> Dict[str, Any]:
+    """
+    Run the sync poll loop and booking flow against a capture.
+    Without `speed` the loop polls back to back; with it, every `poll_interval`.
+    """
+    # Imported here: bot records through this module
+    from . import bot
+
+    transport = ReplayTransport(capture, speed)
+    polls = 0
+    started = time.perf_counter()
+    with httpx.Client(transport=transport, headers=config.user_headers, follow_redirects=True) as client:
+        polled = sum(entry['method'] == 'GET' and entry['url'] == config.target_url for entry in capture.entries)
+        booking_info = None
+        # A capture that never showed the course bookable ends after its last poll
+        while booking_info is None and (speed or polls < polled):
+            polls += 1
+            booking_info = bot.find_course(client, config, config.user_info.kursnr)
+            if booking_info is None and speed:
+                if transport.started and (time.monotonic() - transport.started) * speed > capture.duration:
+                    break
+                time.sleep(poll_interval)
+        detected = time.perf_counter() - started
+        booked = bool(booking_info) and bot.process_booking(client, config, booking_info)
+    return {
+        'polls': polls,
+        'detected': detected,
+        'booked': booked,
+        'seconds': time.perf_counter() - started,
+        'requests': transport.stats['requests'],
+        'unmatched': transport.stats['unmatched'],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or replay a session capture")
+    parser.add_argument("command", choices=["info", "replay"])
+    parser.add_argument("path")
+    parser.add_argument("--speed", type=float, default=None, help="follow the captured timeline this many times faster")
+    parser.add_argument("--interval", type=float, default=0.05, help="poll interval with --speed (s)")
+    parser.add_argument("--kursnr", default=None)
+    args = parser.parse_args()
+
+    capture = Capture(Path(args.path))
+    if args.command == "info":
+        print(f"{capture.path}: {len(capture)} exchanges, {capture.meta['blobs']} distinct bodies, "
+              f"{capture.duration:.1f}s, started {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(capture.meta['started']))}"
+              + ("" if capture.meta['complete'] else " (run did not finish)"))
+        for entry in capture.entries:
+            outcome = entry.get('status', entry.get('error'))
+            print(f"{entry['t']:10.3f} {entry['method']:<5} {outcome} {entry['url']}")
+        return
+
+    config = load_config()
+    config.target_url = capture.first_url() or config.target_url
+    if args.kursnr:
+        config.user_info.kursnr = args.kursnr
+    result = replay(capture, config, args.speed, args.interval)
+    print(f"{result['polls']} polls, detected after {result['detected']:.3f}s, "
+          f"booked: {result['booked']}, {result['seconds']:.3f}s for a {capture.duration:.1f}s capture "
+          f"({result['unmatched']} of {result['requests']} requests not in the capture)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+'''
+Incremental change detection on the offer page.
+Hashes only the bs_kurse table region (or just the target row's bs_sbuch cell)
+of each poll and runs the full extraction only when that region changed, so
+autoreload timestamps and other noise outside the tables cost no parse.
+The hidden inputs of the form around the tables (BS_Code changes with every
+page load) are not hashed; they are re-read with a regex on every unchanged
+poll and merged into the cached booking info.
+State changes of the target course ("ab ..." -> "Warteliste" -> "buchen")
+are published as ChangeEvents to subscribers.
+'''
+
+
+import re
+import time
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Callable
+import httpx
+from .course_table import CourseTable
+from .html_scan import parse_attrs
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ('table', 'row')
+
+TABLE_START_RE = re.compile(rb"""<table\s+class=["']bs_kurse["']""", re.IGNORECASE)
+TABLE_END = b"</table>"
+FORM_START_RE = re.compile(rb"<form\b", re.IGNORECASE)
+HIDDEN_INPUT_RE = re.compile(rb"""<input\b[^>]*type=["']hidden["'][^>]*>""", re.IGNORECASE)
+
+@dataclass
+class ChangeEvent:
+    kursnr: str
+    old_state: Optional[str]
+    new_state: Optional[str]
+    timestamp: float # time.time() of the poll that saw the change
+    bookable: bool
+
+def table_region(body: bytes) -> bytes:
+    """Bytes from the first table.bs_kurse to the end of the last one."""
+    start = TABLE_START_RE.search(body)
+    if not start:
+        return body
+    end = body.rfind(TABLE_END)
+    return body[start.start():end + len(TABLE_END)] if end > start.start() else body[start.start():]
+
+def form_fields(body: bytes, charset: str = 'iso-8859-1') -> Dict[str, str]:
+    """Hidden inputs between the form enclosing the course tables and the first table."""
+    start = TABLE_START_RE.search(body)
+    if not start:
+        return {}
+    forms = list(FORM_START_RE.finditer(body, 0, start.start()))
+    if not forms:
+        return {}
+    fields = {}
+    for tag in HIDDEN_INPUT_RE.findall(body, forms[-1].start(), start.start()):
+        attrs = parse_attrs(tag, charset)
+        if attrs.get('name'):
+            fields[attrs['name']] = attrs.get('value', '')
+    return fields
+
+def row_region(body: bytes, kursnr: str) -> bytes:
+    """Bytes of the target row's bs_sbuch cell, or the table region if the row is missing."""
+    # Imported here: scanner depends on bot, which imports this module
+    from .scanner import CourseScanner
+    scanner = CourseScanner(kursnr)
+    if scanner.feed(body) and scanner.cell is not None:
+        return scanner.cell
+    return table_region(body)
+
+class ChangeDetector:
+    """
+    Used like ConditionalPoller: observe() tells whether the watched region
+    changed, extract() runs the full extraction and publishes state changes.
+    """
+
+    def __init__(self, kursnr: str, scope: str = 'table'):
+        if scope not in SCOPES:
+            raise ValueError(f"Unknown change detection scope: {scope}")
+        self.kursnr = kursnr
+        self.scope = scope
+        self.region_hash: Optional[bytes] = None
+        self.state: Optional[str] = None
+        self.cached_result: Optional[Dict[str, Any]] = None
+        self.subscribers: List[Callable[[ChangeEvent], None]] = []
+        self.polls = 0
+        self.extractions = 0
+
+    def subscribe(self, callback: Callable[[ChangeEvent], None]) -> None:
+        self.subscribers.append(callback)
+
+    def region(self, body: bytes) -> bytes:
+        return row_region(body, self.kursnr) if self.scope == 'row' else table_region(body)
+
+    def observe(self, response: httpx.Response) -> bool:
+        """
+        Returns True if the watched region changed since the previous poll.
+        Otherwise the form fields of this page are merged into cached_result.
+        """
+        self.polls += 1
+        if response.status_code == 304:
+            return False
+        digest = hashlib.blake2b(self.region(response.content), digest_size=16).digest()
+        if digest == self.region_hash:
+            self.refresh_fields(response)
+            return False
+        self.region_hash = digest
+        return True
+
+    def refresh_fields(self, response: httpx.Response) -> None:
+        """A booking must post the BS_Code of the latest page load, not of the parsed one."""
+        if not self.cached_result or self.cached_result.get('type') != 'form':
+            return
+        fields = form_fields(response.content, response.charset_encoding or 'iso-8859-1')
+        inputs = self.cached_result['inputs']
+        if any(inputs.get(name) != value for name, value in fields.items()):
+            self.cached_result = {**self.cached_result, 'inputs': {**inputs, **fields}}
+
+    def extract(self, html_content: str, base_url: str) -> Optional[Dict[str, Any]]:
+        """Full extraction of the target row; publishes a ChangeEvent if its state moved."""
+        record = CourseTable.from_html(html_content).get(self.kursnr)
+        return self.update(record.state if record else None, record.booking_info(base_url) if record else None)
+
+    def update(self, state: Optional[str], booking_info: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """The second half of extract(), for rows extracted elsewhere (see parse_pool)."""
+        self.extractions += 1
+        if state != self.state:
+            event = ChangeEvent(self.kursnr, self.state, state, time.time(), booking_info is not None)
+            self.state = state
+            self.publish(event)
+        self.cached_result = booking_info
+        return booking_info
+
+    def publish(self, event: ChangeEvent) -> None:
+        logger.info(f"Kursnr {event.kursnr}: {event.old_state!r} -> {event.new_state!r}")
+        for callback in self.subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Change subscriber failed: {e}")
@@ -0,0 +1,119 @@
+'''
+Conditional and compressed polling of the offer page.
+Sends ETag/Last-Modified validators and negotiates compression, and tells the
+caller when a response can skip parsing (304 or unchanged content hash).
+'''
+
+
+import time
+import hashlib
+import logging
+from typing import Optional, Dict, Any
+import httpx
+
+logger = logging.getLogger(__name__)
+
+def _brotli_available() -> bool:
+    """httpx only decodes br when brotli or brotlicffi is installed."""
+    for module in ('brotli', 'brotlicffi'):
+        try:
+            __import__(module)
+            return True
+        except ImportError:
+            continue
+    return False
+
+ACCEPT_ENCODING = "br, gzip, deflate" if _brotli_available() else "gzip, deflate"
+
+class PollStats:
+    """Counters for bytes and parses saved by conditional polling."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.polls = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.wire_bytes = 0
+        self.bytes_saved = 0
+
+    @property
+    def parses_avoided(self) -> int:
+        return self.not_modified + self.unchanged
+
+    def per_minute(self) -> Dict[str, float]:
+        minutes = max((time.monotonic() - self.started) / 60, 1e-9)
+        return {
+            'polls': self.polls / minutes,
+            'bytes_received': self.wire_bytes / minutes,
+            'bytes_saved': self.bytes_saved / minutes,
+            'parses_avoided': self.parses_avoided / minutes,
+        }
+
+class ConditionalPoller:
+    """Track validators and the last parse result for one polled URL."""
+
+    def __init__(self, report_interval: float = 60.0):
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.content_hash: Optional[bytes] = None
+        self.full_size = 0
+        self.cached_result: Optional[Any] = None
+        self.stats = PollStats()
+        self.report_interval = report_interval
+        self._last_report = time.monotonic()
+
+    def request_headers(self) -> Dict[str, str]:
+        """Headers for the next poll."""
+        headers = {'Accept-Encoding': ACCEPT_ENCODING}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def observe(self, response: httpx.Response) -> bool:
+        """
+        Record a poll response.
+        Returns True if the body changed and must be parsed.
+        """
+        stats = self.stats
+        stats.polls += 1
+        wire = response.num_bytes_downloaded
+        stats.wire_bytes += wire
+        self._maybe_report()
+
+        if response.status_code == 304:
+            stats.not_modified += 1
+            stats.bytes_saved += max(self.full_size - wire, 0)
+            return False
+
+        self.etag = response.headers.get('etag', self.etag)
+        self.last_modified = response.headers.get('last-modified', self.last_modified)
+
+        body = response.content
+        self.full_size = len(body)
+        # Savings from content encoding
+        stats.bytes_saved += max(len(body) - wire, 0)
+
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        if digest == self.content_hash:
+            stats.unchanged += 1
+            return False
+        self.content_hash = digest
+        return True
+
+    def remember(self, result: Any) -> None:
+        """Store the parse result reused while the page stays unchanged."""
+        self.cached_result = result
+
+    def _maybe_report(self) -> None:
+        now = time.monotonic()
+        if now - self._last_report < self.report_interval:
+            return
+        self._last_report = now
+        rates = self.stats.per_minute()
+        logger.info(
+            f"Conditional polling: {rates['polls']:.0f} polls/min, "
+            f"{rates['bytes_saved'] / 1024:.1f} KiB saved/min, "
+            f"{rates['parses_avoided']:.0f} parses avoided/min"
+        )
@@ -1,6 +1,7 @@
 import toml
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 @dataclass
 class UserInfo:
@@ -16,12 +17,199 @@ class UserInfo:
     accept_terms: bool
     kursnr: str
 
+@dataclass
+class BookingJob:
+    user_info: UserInfo
+    kursnr: str
+
+@dataclass
+class EngineConfig:
+    mode: str = "sync" # sync, async
+    poll_interval: float = 0.5
+    concurrency: int = 3
+    conditional: bool = False # ETag/Last-Modified polling, skip parsing unchanged pages
+    detector: str = "soup" # soup, stream
+    change_detection: str = "off" # off, table, row: skip parsing while the bs_kurse region is unchanged
+    payload_templates: bool = False # precompiled registration payloads
+    payload_cache_dir: str = "data/payload_cache"
+
+@dataclass
+class SchedulerConfig:
+    enabled: bool = False
+    slow_interval: float = 5.0 # seconds between polls while opening is far away
+    burst_interval: float = 0.1
+    burst_concurrency: int = 4
+    burst_before: float = 3.0 # seconds before the predicted opening
+    burst_after: float = 60.0 # seconds after the predicted opening
+
+@dataclass
+class ConnectionConfig:
+    prewarm: bool = False # open connections to every host of the flow before opening time
+    http2: bool = False # needs the h2 package (httpx[http2])
+    max_connections: int = 10
+    warm_connections: int = 2 # connections opened per host when prewarming
+    keepalive_expiry: float = 120.0
+    keepalive_interval: float = 4.0 # re-warm after this many idle seconds
+    timeouts: dict = field(default_factory=dict) # step -> {connect = ..., read = ...}
+
+@dataclass
+class RateControlConfig:
+    enabled: bool = False # AIMD poll rate, backs off on 429/5xx and Retry-After
+    min_rate: float = 0.2 # polls per second
+    max_rate: float = 20.0
+    increase: float = 0.5 # added per successful poll
+    decrease: float = 0.5 # factor applied on a throttle
+    burst: float = 1.0 # token bucket capacity
+    safety: float = 0.9 # share of the last throttled rate used in the burst window
+    max_retry_after: float = 60.0
+
+@dataclass
+class RacingConfig:
+    enabled: bool = False # async mode only
+    lanes: int = 3 # parallel sessions
+    steps: list = field(default_factory=lambda: ["booking_page"]) # booking_page, buchen, registration
+
+@dataclass
+class BookingConfig:
+    retries: dict = field(default_factory=dict) # attempts per step: bookingPage, buchen, registration
+    backoff: float = 0.2 # seconds before the first retry of a step, doubled per retry
+
+@dataclass
+class DaemonConfig:
+    socket_path: str = "data/bot.sock" # relative to the project root
+    reload_interval: float = 2.0 # seconds between settings.toml mtime checks
+
+@dataclass
+class OfferConfig:
+    url: str
+    title: str = "" # expected bs_head heading, derived from the URL when empty
+    kursnrs: list = field(default_factory=list)
+
+@dataclass
+class WatcherConfig:
+    host_rate: float = 4.0 # polls per second per host, shared by all its offer pages
+    concurrency: int = 4 # polls in flight per host
+    idle_interval: float = 30.0 # pages without a known opening time
+
+@dataclass
+class WaitlistConfig:
+    interval: float = 60.0 # baseline seconds between two polls of a full course's page
+    jitter: float = 0.25 # +-share of the interval drawn at random per poll
+    budget: float = 0.5 # requests per second for all waitlist pages together
+    offers: List[OfferConfig] = field(default_factory=list)
+
+@dataclass
+class SessionConfig:
+    enabled: bool = False # keep cookies and permanent redirects between runs
+    path: str = "data/session.json" # relative to the project root
+    max_age: float = 6 * 3600.0 # seconds after which a stored session is not restored
+    validate_before: float = 30.0 # seconds before the opening to check the session once
+
+@dataclass
+class RecorderConfig:
+    enabled: bool = False # keep recent responses and step events, dump them after each booking
+    responses: int = 32 # ring buffer sizes
+    events: int = 512
+    dump_dir: str = "data/flight"
+    log_interval: float = 30.0 # seconds between repeated INFO lines of the poll loop
+
+@dataclass
+class MemoryConfig:
+    enabled: bool = False # trace allocations of the sync poll loop (slows every allocation down)
+    interval: float = 300.0 # seconds between two snapshots
+    frames: int = 10 # traceback depth, enough to reach the parsing helpers from inside bs4; cost grows with it
+    top: int = 10 # allocation sites listed per snapshot
+    heap_budget: float = 0.0 # MiB traced by tracemalloc before the client is recycled, 0 = no limit
+    rss_budget: float = 0.0 # MiB resident set size, same
+
+@dataclass
+class ParsingConfig:
+    executor: str = "inline" # inline, thread, process: where the async modes parse responses
+    workers: int = 0 # pool size, 0 = one per CPU
+
+@dataclass
+class CaptureConfig:
+    enabled: bool = False # record every request and response of the run to one replayable file
+    dir: str = "data/captures" # relative to the project root
+
+@dataclass
+class HistoryConfig:
+    enabled: bool = False # record course state transitions, size the burst window from them
+    path: str = "data/history.sqlite3" # relative to the project root
+    min_samples: int = 3 # openings needed before the prediction replaces burstBefore/burstAfter
+    low_quantile: float = 0.05 # burst starts at this quantile of the observed offsets
+    high_quantile: float = 0.95 # and ends at this one
+    margin: float = 1.0 # seconds added on both sides
+
+@dataclass
+class MetricsConfig:
+    json_path: str = "" # write span histograms and poll metrics as JSON
+    prometheus_path: str = "" # same in Prometheus text format
+    export_interval: float = 60.0 # seconds between exports while polling
+
 @dataclass
 class Config:
     target_url: str
     kurs_row: int
     user_headers: dict
     user_info: UserInfo
+    engine: EngineConfig = field(default_factory=EngineConfig)
+    scheduler: SchedulerConfig = field(default_factory=SchedulerConfig)
+    connections: ConnectionConfig = field(default_factory=ConnectionConfig)
+    rate_control: RateControlConfig = field(default_factory=RateControlConfig)
+    racing: RacingConfig = field(default_factory=RacingConfig)
+    booking: BookingConfig = field(default_factory=BookingConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    daemon: DaemonConfig = field(default_factory=DaemonConfig)
+    session: SessionConfig = field(default_factory=SessionConfig)
+    recorder: RecorderConfig = field(default_factory=RecorderConfig)
+    capture: CaptureConfig = field(default_factory=CaptureConfig)
+    memory: MemoryConfig = field(default_factory=MemoryConfig)
+    parsing: ParsingConfig = field(default_factory=ParsingConfig)
+    history: HistoryConfig = field(default_factory=HistoryConfig)
+    watcher: WatcherConfig = field(default_factory=WatcherConfig)
+    waitlist: WaitlistConfig = field(default_factory=WaitlistConfig)
+    offers: List[OfferConfig] = field(default_factory=list)
+    jobs: List[BookingJob] = field(default_factory=list)
+
+def booking_jobs(config: Config, kursnr: Optional[str] = None) -> List[BookingJob]:
+    """Configured [[jobs]], or a single job for the [userInfo] person."""
+    if kursnr:
+        return [BookingJob(config.user_info, kursnr)]
+    if config.jobs:
+        return config.jobs
+    return [BookingJob(config.user_info, config.user_info.kursnr)]
+
+def parse_user_info(user_info_data: dict, defaults: Optional[UserInfo] = None) -> UserInfo:
+    """Build UserInfo from the camelCase TOML keys; missing keys fall back to `defaults`."""
+    def get(key: str, attr: str, default):
+        return user_info_data.get(key, getattr(defaults, attr) if defaults else default)
+
+    return UserInfo(
+        gender=get("gender", "gender", ""),
+        first_name=get("firstName", "first_name", ""),
+        last_name=get("lastName", "last_name", ""),
+        address=get("address", "address", ""),
+        zip_city=get("zipCity", "zip_city", ""),
+        status=get("status", "status", ""),
+        student_id=get("studentId", "student_id", ""),
+        email=get("email", "email", ""),
+        phone=get("phone", "phone", ""),
+        accept_terms=get("acceptTerms", "accept_terms", False),
+        kursnr=get("kursnr", "kursnr", "")
+    )
+
+def parse_offers(offers_data: list) -> List[OfferConfig]:
+    """Each [[offers]] entry is one offer page with the Kursnrs to book on it."""
+    offers = []
+    for offer_data in offers_data:
+        kursnrs = offer_data.get("kursnr", [])
+        offers.append(OfferConfig(
+            url=offer_data["url"],
+            title=offer_data.get("title", ""),
+            kursnrs=[str(k) for k in ([kursnrs] if isinstance(kursnrs, (str, int)) else kursnrs)]
+        ))
+    return offers
 
 def load_config(config_path: str = "config/settings.toml") -> Config:
     """Load configuration from a TOML file."""
@@ -33,26 +221,177 @@ def load_config(config_path: str = "config/settings.toml") -> Config:
         
     data = toml.load(config_file)
     
-    user_info_data = data.get("userInfo", {})
-    user_info = UserInfo(
-        gender=user_info_data.get("gender", ""),
-        first_name=user_info_data.get("firstName", ""),
-        last_name=user_info_data.get("lastName", ""),
-        address=user_info_data.get("address", ""),
-        zip_city=user_info_data.get("zipCity", ""),
-        status=user_info_data.get("status", ""),
-        student_id=user_info_data.get("studentId", ""),
-        email=user_info_data.get("email", ""),
-        phone=user_info_data.get("phone", ""),
-        accept_terms=user_info_data.get("acceptTerms", False),
-        kursnr=user_info_data.get("kursnr", "")
+    user_info = parse_user_info(data.get("userInfo", {}))
+
+    # Each [[jobs]] entry overrides [userInfo] fields for one person and Kursnr
+    jobs = []
+    for job_data in data.get("jobs", []):
+        job_user = parse_user_info(job_data, defaults=user_info)
+        jobs.append(BookingJob(user_info=job_user, kursnr=job_user.kursnr))
+    
+    engine_data = data.get("engine", {})
+    engine = EngineConfig(
+        mode=engine_data.get("mode", "sync"),
+        poll_interval=float(engine_data.get("pollInterval", 0.5)),
+        concurrency=int(engine_data.get("concurrency", 3)),
+        conditional=bool(engine_data.get("conditional", False)),
+        detector=engine_data.get("detector", "soup"),
+        change_detection=engine_data.get("changeDetection", "off"),
+        payload_templates=bool(engine_data.get("payloadTemplates", False)),
+        payload_cache_dir=engine_data.get("payloadCacheDir", "data/payload_cache")
+    )
+    
+    scheduler_data = data.get("scheduler", {})
+    scheduler = SchedulerConfig(
+        enabled=bool(scheduler_data.get("enabled", False)),
+        slow_interval=float(scheduler_data.get("slowInterval", 5.0)),
+        burst_interval=float(scheduler_data.get("burstInterval", 0.1)),
+        burst_concurrency=int(scheduler_data.get("burstConcurrency", 4)),
+        burst_before=float(scheduler_data.get("burstBefore", 3.0)),
+        burst_after=float(scheduler_data.get("burstAfter", 60.0))
+    )
+    
+    connection_data = data.get("connections", {})
+    connections = ConnectionConfig(
+        prewarm=bool(connection_data.get("prewarm", False)),
+        http2=bool(connection_data.get("http2", False)),
+        max_connections=int(connection_data.get("maxConnections", 10)),
+        warm_connections=int(connection_data.get("warmConnections", 2)),
+        keepalive_expiry=float(connection_data.get("keepaliveExpiry", 120.0)),
+        keepalive_interval=float(connection_data.get("keepaliveInterval", 4.0)),
+        timeouts=connection_data.get("timeouts", {})
+    )
+    
+    rate_data = data.get("rateControl", {})
+    rate_control = RateControlConfig(
+        enabled=bool(rate_data.get("enabled", False)),
+        min_rate=float(rate_data.get("minRate", 0.2)),
+        max_rate=float(rate_data.get("maxRate", 20.0)),
+        increase=float(rate_data.get("increase", 0.5)),
+        decrease=float(rate_data.get("decrease", 0.5)),
+        burst=float(rate_data.get("burst", 1.0)),
+        safety=float(rate_data.get("safety", 0.9)),
+        max_retry_after=float(rate_data.get("maxRetryAfter", 60.0))
+    )
+    
+    racing_data = data.get("racing", {})
+    racing = RacingConfig(
+        enabled=bool(racing_data.get("enabled", False)),
+        lanes=max(1, int(racing_data.get("lanes", 3))),
+        steps=list(racing_data.get("steps", ["booking_page"]))
+    )
+    
+    # The confirmation is never retried, see booking_flow
+    booking_data = data.get("booking", {})
+    step_names = {"bookingPage": "booking_page", "buchen": "buchen", "registration": "registration"}
+    booking = BookingConfig(
+        retries={step_names[key]: int(value) for key, value in booking_data.get("retries", {}).items()
+                 if key in step_names},
+        backoff=float(booking_data.get("backoff", 0.2))
+    )
+    
+    metrics_data = data.get("metrics", {})
+    metrics = MetricsConfig(
+        json_path=metrics_data.get("jsonPath", ""),
+        prometheus_path=metrics_data.get("prometheusPath", ""),
+        export_interval=float(metrics_data.get("exportInterval", 60.0))
+    )
+    
+    daemon_data = data.get("daemon", {})
+    daemon = DaemonConfig(
+        socket_path=daemon_data.get("socketPath", "data/bot.sock"),
+        reload_interval=float(daemon_data.get("reloadInterval", 2.0))
+    )
+    
+    session_data = data.get("session", {})
+    session = SessionConfig(
+        enabled=bool(session_data.get("enabled", False)),
+        path=session_data.get("path", "data/session.json"),
+        max_age=float(session_data.get("maxAge", 6 * 3600.0)),
+        validate_before=float(session_data.get("validateBefore", 30.0))
+    )
+    
+    recorder_data = data.get("recorder", {})
+    recorder = RecorderConfig(
+        enabled=bool(recorder_data.get("enabled", False)),
+        responses=max(1, int(recorder_data.get("responses", 32))),
+        events=max(1, int(recorder_data.get("events", 512))),
+        dump_dir=recorder_data.get("dumpDir", "data/flight"),
+        log_interval=float(recorder_data.get("logInterval", 30.0))
+    )
+    
+    memory_data = data.get("memory", {})
+    memory = MemoryConfig(
+        enabled=bool(memory_data.get("enabled", False)),
+        interval=float(memory_data.get("interval", 300.0)),
+        frames=max(1, int(memory_data.get("frames", 10))),
+        top=max(1, int(memory_data.get("top", 10))),
+        heap_budget=float(memory_data.get("heapBudget", 0.0)),
+        rss_budget=float(memory_data.get("rssBudget", 0.0))
+    )
+    
+    parsing_data = data.get("parsing", {})
+    parsing = ParsingConfig(
+        executor=parsing_data.get("executor", "inline"),
+        workers=max(0, int(parsing_data.get("workers", 0)))
+    )
+    
+    capture_data = data.get("capture", {})
+    capture = CaptureConfig(
+        enabled=bool(capture_data.get("enabled", False)),
+        dir=capture_data.get("dir", "data/captures")
+    )
+    
+    history_data = data.get("history", {})
+    history = HistoryConfig(
+        enabled=bool(history_data.get("enabled", False)),
+        path=history_data.get("path", "data/history.sqlite3"),
+        min_samples=max(1, int(history_data.get("minSamples", 3))),
+        low_quantile=float(history_data.get("lowQuantile", 0.05)),
+        high_quantile=float(history_data.get("highQuantile", 0.95)),
+        margin=float(history_data.get("margin", 1.0))
+    )
+    
+    watcher_data = data.get("watcher", {})
+    watcher = WatcherConfig(
+        host_rate=float(watcher_data.get("hostRate", 4.0)),
+        concurrency=max(1, int(watcher_data.get("concurrency", 4))),
+        idle_interval=float(watcher_data.get("idleInterval", 30.0))
+    )
+    
+    offers = parse_offers(data.get("offers", []))
+    
+    waitlist_data = data.get("waitlist", {})
+    waitlist = WaitlistConfig(
+        interval=float(waitlist_data.get("interval", 60.0)),
+        jitter=min(max(float(waitlist_data.get("jitter", 0.25)), 0.0), 1.0),
+        budget=float(waitlist_data.get("budget", 0.5)),
+        offers=parse_offers(waitlist_data.get("offers", []))
     )
     
     return Config(
         target_url=data.get("TARGET_URL", ""),
         kurs_row=int(data.get("kursRow", 0)),
         user_headers=data.get("USER_HEADERS", {}),
-        user_info=user_info
+        user_info=user_info,
+        engine=engine,
+        scheduler=scheduler,
+        connections=connections,
+        rate_control=rate_control,
+        racing=racing,
+        booking=booking,
+        metrics=metrics,
+        daemon=daemon,
+        session=session,
+        recorder=recorder,
+        capture=capture,
+        memory=memory,
+        parsing=parsing,
+        history=history,
+        watcher=watcher,
+        waitlist=waitlist,
+        offers=offers,
+        jobs=jobs
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,215 @@
+'''
+Connection management for the booking burst.
+Pre-warms kept-alive (optionally HTTP/2) connections to every host of the flow,
+holds the per-step timeouts and counts how often requests reuse a connection.
+'''
+
+
+import time
+import weakref
+import asyncio
+import logging
+import importlib.util
+from urllib.parse import urlsplit
+from typing import Optional, Dict, List, Union
+import httpx
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Endpoint of every booking step after the offer page
+BOOKING_ENDPOINT = "https://buchung.hsz.rwth-aachen.de/cgi/anmeldung.fcgi"
+
+STEPS = ('poll', 'booking_page', 'buchen', 'registration', 'confirmation')
+
+DEFAULT_STEP_TIMEOUTS = {
+    'poll': httpx.Timeout(3.0, connect=2.0),
+    'booking_page': httpx.Timeout(8.0, connect=2.0),
+    'buchen': httpx.Timeout(8.0, connect=2.0),
+    'registration': httpx.Timeout(8.0, connect=2.0),
+    'confirmation': httpx.Timeout(10.0, connect=2.0),
+}
+
+# Active per-step timeouts, replaced by configure_step_timeouts
+STEP_TIMEOUTS: Dict[str, httpx.Timeout] = dict(DEFAULT_STEP_TIMEOUTS)
+
+def configure_step_timeouts(timeouts: dict) -> None:
+    """Apply [connections.timeouts] on top of the defaults."""
+    STEP_TIMEOUTS.clear()
+    STEP_TIMEOUTS.update(DEFAULT_STEP_TIMEOUTS)
+    for step, values in timeouts.items():
+        if step not in STEPS:
+            logger.warning(f"Unknown step in [connections.timeouts]: {step}")
+            continue
+        default = DEFAULT_STEP_TIMEOUTS[step]
+        read = float(values.get('read', default.read))
+        STEP_TIMEOUTS[step] = httpx.Timeout(read, connect=float(values.get('connect', default.connect)))
+
+def step_timeout(step: str) -> Optional[httpx.Timeout]:
+    return STEP_TIMEOUTS.get(step)
+
+def http2_available() -> bool:
+    return importlib.util.find_spec('h2') is not None
+
+def origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+class ConnectionStats:
+    """Counts requests that opened a new connection vs. reused a pooled one, of one client or all of them."""
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.last_activity = 0.0
+
+    @property
+    def reused(self) -> int:
+        return self.requests - self.new_connections
+
+    @property
+    def reuse_ratio(self) -> float:
+        return self.reused / self.requests if self.requests else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.requests} requests, {self.new_connections} new connections, "
+                f"{self.reuse_ratio:.0%} reused")
+
+class ConnectionManager:
+    """Build pooled clients and keep their connections warm before opening time."""
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.settings = config.connections
+        self.stats = ConnectionStats()
+        # Per-client stats; keep_warm needs the idle time of its own client
+        self.client_stats: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.http2 = self.settings.http2
+        if self.http2 and not http2_available():
+            logger.warning("HTTP/2 requested but the h2 package is not installed, using HTTP/1.1")
+            self.http2 = False
+        configure_step_timeouts(self.settings.timeouts)
+
+    def hosts(self) -> List[str]:
+        """Origins of every host the booking flow talks to."""
+        hosts = []
+        for url in (self.config.target_url, BOOKING_ENDPOINT):
+            if url and origin(url) not in hosts:
+                hosts.append(origin(url))
+        return hosts
+
+    def _client_kwargs(self) -> dict:
+        limits = httpx.Limits(
+            max_connections=self.settings.max_connections,
+            max_keepalive_connections=self.settings.max_connections,
+            keepalive_expiry=self.settings.keepalive_expiry,
+        )
+        return {
+            'headers': self.config.user_headers,
+            'timeout': 30.0,
+            'follow_redirects': True,
+            'limits': limits,
+            'http2': self.http2,
+        }
+
+    def create_client(self) -> httpx.Client:
+        client = httpx.Client(**self._client_kwargs())
+        self.install(client)
+        return client
+
+    def recycle(self, client: httpx.Client) -> httpx.Client:
+        """
+        Replace `client` by a fresh one with the same cookies and event hooks
+        (hooks are installed once and hold no reference to their client), then close it.
+        """
+        fresh = httpx.Client(**self._client_kwargs())
+        fresh.event_hooks = client.event_hooks
+        fresh.cookies = client.cookies
+        if client in self.client_stats:
+            self.client_stats[fresh] = self.client_stats[client]
+        client.close()
+        return fresh
+
+    def create_async_client(self) -> httpx.AsyncClient:
+        client = httpx.AsyncClient(**self._client_kwargs())
+        self.install(client)
+        return client
+
+    def install(self, client: Union[httpx.Client, httpx.AsyncClient]) -> None:
+        """Count new vs. reused connections from the httpcore trace, in total and for `client`."""
+        counters = (self.stats, self.client_stats.setdefault(client, ConnectionStats()))
+
+        def on_response(response: httpx.Response) -> None:
+            now = time.monotonic()
+            new_connection = bool(response.request.extensions.get('new_connection'))
+            for stats in counters:
+                stats.requests += 1
+                stats.last_activity = now
+                stats.new_connections += new_connection
+
+        if isinstance(client, httpx.AsyncClient):
+            async def async_on_request(request: httpx.Request) -> None:
+                previous = request.extensions.get('trace')
+
+                async def trace(event_name: str, info: dict) -> None:
+                    if event_name == 'connection.connect_tcp.complete':
+                        request.extensions['new_connection'] = True
+                    if previous:
+                        await previous(event_name, info)
+                request.extensions['trace'] = trace
+
+            async def async_on_response(response: httpx.Response) -> None:
+                on_response(response)
+
+            client.event_hooks['request'].append(async_on_request)
+            client.event_hooks['response'].append(async_on_response)
+        else:
+            def on_request(request: httpx.Request) -> None:
+                previous = request.extensions.get('trace')
+
+                def trace(event_name: str, info: dict) -> None:
+                    if event_name == 'connection.connect_tcp.complete':
+                        request.extensions['new_connection'] = True
+                    if previous:
+                        previous(event_name, info)
+                request.extensions['trace'] = trace
+
+            client.event_hooks['request'].append(on_request)
+            client.event_hooks['response'].append(on_response)
+
+    def prewarm(self, client: httpx.Client) -> None:
+        """Open one connection per host (DNS + TCP + TLS) ahead of the race."""
+        for host in self.hosts():
+            try:
+                client.head(host + "/", follow_redirects=False, timeout=step_timeout('poll'))
+            except httpx.RequestError as e:
+                logger.warning(f"Prewarm of {host} failed: {e}")
+        logger.debug(f"Connections warm: {self.stats.summary()}")
+
+    async def prewarm_async(self, client: httpx.AsyncClient) -> None:
+        """Open `warm_connections` concurrent connections per host."""
+        async def warm(host: str) -> None:
+            try:
+                await client.head(host + "/", follow_redirects=False, timeout=step_timeout('poll'))
+            except httpx.RequestError as e:
+                logger.warning(f"Prewarm of {host} failed: {e}")
+
+        await asyncio.gather(*(
+            warm(host) for host in self.hosts() for _ in range(max(1, self.settings.warm_connections))
+        ))
+        logger.debug(f"Connections warm: {self.stats.summary()}")
+
+    def idle_for(self, client: Union[httpx.Client, httpx.AsyncClient]) -> float:
+        """Seconds since `client` last got a response; traffic on other clients does not count."""
+        stats = self.client_stats.get(client)
+        return time.monotonic() - (stats.last_activity if stats else 0.0)
+
+    async def keep_warm(self, client: httpx.AsyncClient) -> None:
+        """Re-warm whenever the client sat idle for keepalive_interval seconds. Runs until cancelled."""
+        interval = self.settings.keepalive_interval
+        while True:
+            idle = self.idle_for(client)
+            if idle >= interval:
+                await self.prewarm_async(client)
+                idle = 0.0
+            await asyncio.sleep(interval - idle)
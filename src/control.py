@@ -0,0 +1,69 @@
+'''
+Command-line client for the resident daemon (src/daemon.py).
+Standard library only, so a command costs no bs4/httpx import.
+
+    uv run python -m src.control add 13131849 --set firstName=Erika --set email=erika@example.org
+    uv run python -m src.control list
+    uv run python -m src.control remove 13131849/erika@example.org
+    uv run python -m src.control status | reload | stop
+'''
+
+
+import sys
+import json
+import socket
+import argparse
+from pathlib import Path
+from typing import Dict, Any
+
+DEFAULT_SOCKET_PATH = "data/bot.sock"
+
+def socket_file(socket_path: str) -> Path:
+    """Socket paths are relative to the project root, like config paths."""
+    return Path(__file__).parent.parent / socket_path
+
+def send(request: Dict[str, Any], socket_path: str = DEFAULT_SOCKET_PATH, timeout: float = 10.0) -> Dict[str, Any]:
+    """Send one JSON request line and read the JSON reply line."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(socket_file(socket_path)))
+        sock.sendall(json.dumps(request).encode('utf-8') + b"\n")
+        reply = b""
+        while not reply.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            reply += chunk
+    return json.loads(reply or b'{"ok": false, "error": "no reply"}')
+
+def main():
+    parser = argparse.ArgumentParser(description="Control the booking daemon")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH)
+    commands = parser.add_subparsers(dest="cmd", required=True)
+    add = commands.add_parser("add", help="watch and book a Kursnr")
+    add.add_argument("kursnr")
+    add.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                     help="override a [userInfo] field, e.g. firstName=Erika")
+    remove = commands.add_parser("remove", help="stop watching a job")
+    remove.add_argument("label")
+    for name in ("list", "status", "reload", "stop"):
+        commands.add_parser(name)
+    args = parser.parse_args()
+
+    request: Dict[str, Any] = {'cmd': 'shutdown' if args.cmd == 'stop' else args.cmd}
+    if args.cmd == 'add':
+        request['kursnr'] = args.kursnr
+        request['user'] = dict(item.split("=", 1) for item in args.set)
+    elif args.cmd == 'remove':
+        request['label'] = args.label
+
+    try:
+        reply = send(request, args.socket)
+    except OSError as e:
+        print(f"Daemon not reachable at {socket_file(args.socket)}: {e}", file=sys.stderr)
+        sys.exit(2)
+    print(json.dumps(reply, indent=2, ensure_ascii=False))
+    sys.exit(0 if reply.get('ok') else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+'''
+Compact, indexed model of the course tables (table.bs_kurse) on the offer page.
+Built in a single pass; records hold plain strings only so the soup can be
+dropped right after extraction.
+'''
+
+
+from bs4 import BeautifulSoup
+from urllib.parse import urljoin
+from typing import Optional, Dict, Any, List, Iterator
+from .document import parse_forms
+
+BOOK_BUTTON_CLASS = 'bs_btn_buchen'
+
+class CourseRecord:
+    """One row of a course table."""
+    __slots__ = ('position', 'kursnr', 'day', 'time', 'place', 'state',
+                 'button_name', 'button_value', 'button_class', 'link',
+                 'form_action', 'form_method', 'form_inputs')
+
+    def __init__(self, position: int, kursnr: str):
+        self.position = position
+        self.kursnr = kursnr
+        self.day = ''
+        self.time = ''
+        self.place = ''
+        self.state = ''
+        self.button_name: Optional[str] = None
+        self.button_value: Optional[str] = None
+        self.button_class = ''
+        self.link: Optional[str] = None
+        self.form_action: Optional[str] = None
+        self.form_method = 'get'
+        # Hidden inputs of the enclosing form, shared by all rows of that form
+        self.form_inputs: Dict[str, str] = {}
+
+    @property
+    def bookable(self) -> bool:
+        return BOOK_BUTTON_CLASS in self.button_class.split()
+
+    def booking_info(self, base_url: str) -> Optional[Dict[str, Any]]:
+        """
+        Booking info in the format of bot.extract_booking_info_from_row.
+        Form inputs are the form's hidden fields plus the clicked button.
+        """
+        if self.bookable and self.form_action is not None:
+            action = self.form_action
+            booking_url = urljoin(base_url, action) if not action.startswith('http') else action
+            inputs = dict(self.form_inputs)
+            if self.button_name:
+                inputs[self.button_name] = self.button_value
+            return {'type': 'form', 'url': booking_url, 'method': self.form_method, 'inputs': inputs}
+
+        if self.link:
+            return {'type': 'link', 'url': urljoin(base_url, self.link)}
+        return None
+
+    def __repr__(self) -> str:
+        return f"CourseRecord({self.position}, {self.kursnr!r}, {self.day} {self.time}, {self.state!r})"
+
+def _cell_text(cell: Any) -> str:
+    return " ".join(cell.get_text(strip=True).split()) if cell else ''
+
+def _read_booking_cell(record: CourseRecord, cell: Any) -> None:
+    """Same precedence as bot.extract_button_content: submit button, span, text."""
+    button = cell.find('input', type='submit')
+    if button:
+        record.button_name = button.get('name')
+        record.button_value = button.get('value')
+        record.button_class = " ".join(button.get('class') or [])
+        record.state = record.button_value or ''
+    else:
+        span = cell.find('span')
+        record.state = _cell_text(span or cell)
+
+    link = cell.find('a', href=True)
+    if link:
+        record.link = link['href']
+
+class CourseTable:
+    """Course rows indexed by Kursnr and by row position."""
+    __slots__ = ('records', 'by_kursnr')
+
+    def __init__(self, records: List[CourseRecord]):
+        self.records = records
+        self.by_kursnr = {record.kursnr: record for record in records}
+
+    @classmethod
+    def from_soup(cls, soup: BeautifulSoup) -> "CourseTable":
+        """
+        Extract every body row of every table.bs_kurse in document order.
+        Positions of the first table match the row index of extract_button_content.
+        """
+        records = []
+        form_cache: Dict[int, Dict[str, str]] = {}
+        for table in soup.find_all('table', class_='bs_kurse'):
+            form = table.find_parent('form')
+            if form is not None and id(form) not in form_cache:
+                form_cache[id(form)] = {
+                    input_tag['name']: input_tag.get('value', '')
+                    for input_tag in form.find_all('input', type='hidden')
+                    if input_tag.get('name')
+                }
+
+            tbody = table.find('tbody')
+            rows = tbody.find_all('tr') if tbody else [r for r in table.find_all('tr') if not r.find('th')]
+            for row in rows:
+                cells = {}
+                for cell in row.find_all('td'):
+                    for css_class in cell.get('class') or []:
+                        cells.setdefault(css_class, cell)
+
+                record = CourseRecord(len(records), _cell_text(cells.get('bs_sknr')))
+                record.day = _cell_text(cells.get('bs_stag'))
+                record.time = _cell_text(cells.get('bs_szeit'))
+                record.place = _cell_text(cells.get('bs_sort'))
+                booking_cell = cells.get('bs_sbuch')
+                if booking_cell is not None:
+                    _read_booking_cell(record, booking_cell)
+                if form is not None:
+                    record.form_action = form.get('action', '')
+                    record.form_method = form.get('method', 'get').lower()
+                    record.form_inputs = form_cache[id(form)]
+                records.append(record)
+        return cls(records)
+
+    @classmethod
+    def from_html(cls, html_content: str) -> "CourseTable":
+        """
+        Parse the page, extract the table and drop the soup.
+        The tables sit inside the booking form, so only forms are parsed; a page
+        with its tables outside any form falls back to a full parse.
+        """
+        soup = parse_forms(html_content)
+        table = cls.from_soup(soup)
+        soup.decompose()
+        if not len(table) and 'bs_kurse' in html_content:
+            soup = BeautifulSoup(html_content, 'html.parser')
+            table = cls.from_soup(soup)
+            soup.decompose()
+        return table
+
+    def get(self, kursnr: str) -> Optional[CourseRecord]:
+        return self.by_kursnr.get(kursnr)
+
+    def row(self, position: int) -> Optional[CourseRecord]:
+        if 0 <= position < len(self.records):
+            return self.records[position]
+        return None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[CourseRecord]:
+        return iter(self.records)
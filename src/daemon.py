@@ -0,0 +1,222 @@
+'''
+Resident daemon: one warm BatchBooker that keeps running between bookings.
+Jobs are added, removed and listed over a local Unix socket (src/control.py)
+with newline-delimited JSON, and config/settings.toml is re-read when it
+changes without restarting the poll loop or dropping warm connections.
+'''
+
+
+import os
+import time
+import json
+import asyncio
+import logging
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Set
+from .config import Config, BookingJob, load_config, booking_jobs, parse_user_info
+from .batch import BatchBooker, job_label
+from .connections import ConnectionManager, configure_step_timeouts
+from .control import socket_file
+from .metrics import METRICS
+from .recorder import RECORDER
+from .capture import CAPTURE
+from .parse_pool import PARSE_POOL
+
+logger = logging.getLogger(__name__)
+
+def config_jobs(config: Config) -> List[BookingJob]:
+    """Jobs from settings.toml; an empty [userInfo] kursnr means none."""
+    return [job for job in booking_jobs(config) if job.kursnr]
+
+class Daemon:
+    """Owns the booker, the control socket and the config watcher."""
+
+    def __init__(self, config_path: str = "config/settings.toml", manager: Optional[ConnectionManager] = None):
+        self.config_path = config_path
+        self.config_file = Path(__file__).parent.parent / config_path
+        self.config = load_config(config_path)
+        self.config_mtime = self.config_file.stat().st_mtime
+        RECORDER.configure(self.config.recorder)
+        CAPTURE.configure(self.config.capture)
+        PARSE_POOL.configure(self.config.parsing)
+        self.booker = BatchBooker(self.config, [], manager)
+        self.config_labels: Set[str] = set() # jobs owned by settings.toml, reconciled on reload
+        for job in config_jobs(self.config):
+            if self.booker.add_job(job):
+                self.config_labels.add(job_label(job))
+            else:
+                logger.error(f"Job {job_label(job)} is configured twice, booking it once")
+        self.started = time.time()
+        self.reloaded_at: Optional[float] = None
+        self.stopping = asyncio.Event()
+
+    def add_job(self, job: BookingJob) -> bool:
+        if not self.booker.add_job(job):
+            return False
+        # Before start() the booker warms every session itself
+        if self.config.connections.prewarm and self.booker.poller is not None:
+            self.booker.keep_warm(job_label(job))
+        logger.info(f"Watching {job_label(job)}")
+        return True
+
+    async def reload(self) -> Dict[str, Any]:
+        """Apply settings.toml to the running booker and reconcile its config jobs."""
+        config = load_config(self.config_path)
+        self.config = config
+        self.booker.config = config
+        self.booker.manager.config = config
+        self.booker.manager.settings = config.connections
+        configure_step_timeouts(config.connections.timeouts)
+        for client in [self.booker.poller, *self.booker.sessions.values()]:
+            if client is not None:
+                client.headers.update(config.user_headers)
+
+        wanted = {job_label(job): job for job in config_jobs(config)}
+        current = {job_label(job): job for job in self.booker.jobs}
+        added, removed = [], []
+        # Vanished or edited config jobs go, unless they are booking right now
+        for label in sorted(self.config_labels):
+            if wanted.get(label) == current.get(label):
+                continue
+            if label in self.booker.in_flight:
+                logger.warning(f"Keeping {label} on reload, it is booking right now")
+                continue
+            await self.booker.remove_job(label)
+            self.config_labels.discard(label)
+            removed.append(label)
+        for label, job in wanted.items():
+            if label not in self.config_labels and self.add_job(job):
+                self.config_labels.add(label)
+                added.append(label)
+        self.reloaded_at = time.time()
+        logger.info(f"Reloaded {self.config_file}: +{len(added)} -{len(removed)} jobs")
+        return {'added': added, 'removed': removed}
+
+    async def watch_config(self) -> None:
+        """Reload whenever the mtime of settings.toml changes."""
+        while True:
+            await asyncio.sleep(self.config.daemon.reload_interval)
+            try:
+                mtime = self.config_file.stat().st_mtime
+            except OSError:
+                continue
+            if mtime == self.config_mtime:
+                continue
+            self.config_mtime = mtime
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.error(f"Reload failed, keeping the previous configuration: {e}")
+
+    def job_info(self, job: BookingJob) -> Dict[str, Any]:
+        label = job_label(job)
+        return {
+            'label': label,
+            'kursnr': job.kursnr,
+            'name': f"{job.user_info.first_name} {job.user_info.last_name}".strip(),
+            'status': self.booker.job_status(job),
+            'state': self.booker.states.get(label),
+            'source': 'config' if label in self.config_labels else 'socket',
+        }
+
+    async def cmd_add(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        kursnr = str(request.get('kursnr') or '')
+        if not kursnr:
+            return {'ok': False, 'error': "kursnr is required"}
+        user = dict(request.get('user') or {}, kursnr=kursnr)
+        job = BookingJob(parse_user_info(user, defaults=self.config.user_info), kursnr)
+        if not self.add_job(job):
+            return {'ok': False, 'error': f"{job_label(job)} is already watched"}
+        return {'ok': True, 'job': self.job_info(job)}
+
+    async def cmd_remove(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        label = str(request.get('label') or '')
+        if label in self.booker.in_flight:
+            return {'ok': False, 'error': f"{label} is booking right now"}
+        if not await self.booker.remove_job(label):
+            return {'ok': False, 'error': f"Unknown job {label}"}
+        self.config_labels.discard(label)
+        logger.info(f"Stopped watching {label}")
+        return {'ok': True}
+
+    async def cmd_list(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return {'ok': True, 'jobs': [self.job_info(job) for job in self.booker.jobs]}
+
+    async def cmd_status(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'ok': True,
+            'uptime': round(time.time() - self.started, 1),
+            'reloaded_at': self.reloaded_at,
+            'jobs': len(self.booker.jobs),
+            'pending': len(self.booker.pending),
+            'in_flight': len(self.booker.in_flight),
+            'ticks': self.booker.ticks,
+            'polls_per_second': round(METRICS.polls_per_second(), 3),
+            'error_rate': round(METRICS.error_rate(), 3),
+            'connections': self.booker.manager.stats.summary(),
+        }
+
+    async def cmd_reload(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self.config_mtime = self.config_file.stat().st_mtime
+        return {'ok': True, **(await self.reload())}
+
+    async def cmd_shutdown(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self.stopping.set()
+        return {'ok': True}
+
+    async def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        handler = getattr(self, f"cmd_{request.get('cmd')}", None)
+        if handler is None:
+            return {'ok': False, 'error': f"Unknown command {request.get('cmd')!r}"}
+        try:
+            return await handler(request)
+        except Exception as e:
+            logger.error(f"Command {request.get('cmd')} failed: {e}")
+            return {'ok': False, 'error': str(e)}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """One JSON request per line, one JSON reply per line."""
+        try:
+            while line := await reader.readline():
+                try:
+                    reply = await self.dispatch(json.loads(line))
+                except json.JSONDecodeError as e:
+                    reply = {'ok': False, 'error': f"Invalid request: {e}"}
+                writer.write(json.dumps(reply).encode('utf-8') + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        """Run the booker, the socket and the config watcher until shutdown."""
+        path = socket_file(self.config.daemon.socket_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.unlink(missing_ok=True) # stale socket of a previous run
+        server = await asyncio.start_unix_server(self.handle, path=str(path))
+        os.chmod(path, 0o600)
+        logger.info(f"Daemon listening on {path} with {len(self.booker.jobs)} jobs")
+
+        runner = asyncio.create_task(self.booker.run(forever=True))
+        watcher = asyncio.create_task(self.watch_config())
+        stopping = asyncio.create_task(self.stopping.wait())
+        try:
+            await asyncio.wait([runner, stopping], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            server.close()
+            for task in (runner, watcher, stopping):
+                task.cancel()
+            await asyncio.gather(runner, watcher, stopping, return_exceptions=True)
+            path.unlink(missing_ok=True)
+            logger.info(f"Daemon stopped, connection reuse: {self.booker.manager.stats.summary()}")
+
+async def run(config_path: str = "config/settings.toml") -> None:
+    await Daemon(config_path).serve()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        logger.info("Daemon stopped by user.")
@@ -0,0 +1,150 @@
+'''
+Form-scoped documents for the booking steps.
+Every page of the flow (offer page included, its tables sit inside the booking
+form) only needs its <form> subtrees, so only those are parsed. Action, method,
+named inputs and submit buttons of each form are read in one pass.
+FormDocument reads them straight from the bytes of each form region; a form
+gets a BeautifulSoup tree only when its element is asked for (the registration
+step maps the user onto it). Pages with unclosed or nested forms are parsed
+with a SoupStrainer instead.
+'''
+
+
+import re
+import html
+from urllib.parse import urljoin
+from typing import Optional, Dict, Any, List
+from bs4 import BeautifulSoup, SoupStrainer
+from .html_scan import parse_attrs
+
+FORMS_ONLY = SoupStrainer('form')
+
+FORM_REGION_RE = re.compile(r"<form\b.*?</form\s*>", re.IGNORECASE | re.DOTALL)
+FORM_OPEN_RE = re.compile(r"<form\b", re.IGNORECASE)
+
+FORM_BYTES_RE = re.compile(rb"(<form\b[^>]*>)(.*?)</form\s*>", re.IGNORECASE | re.DOTALL)
+FORM_OPEN_BYTES_RE = re.compile(rb"<form\b", re.IGNORECASE)
+CONTROL_RE = re.compile(rb"<input\b[^>]*>|<button\b[^>]*>(.*?)</button\s*>", re.IGNORECASE | re.DOTALL)
+MARKUP_RE = re.compile(rb"<[^>]*>")
+
+SUCCESS_RE = re.compile(r"erfolgreich|successful", re.IGNORECASE)
+
+def parse_forms(html_content: str) -> BeautifulSoup:
+    """
+    Parse only the <form> subtrees of the page.
+    The form regions are cut out before tokenizing; pages with unclosed or
+    nested forms go through a SoupStrainer over the whole page instead.
+    """
+    regions = FORM_REGION_RE.findall(html_content)
+    if regions and len(regions) == len(FORM_OPEN_RE.findall(html_content)):
+        return BeautifulSoup("".join(regions), 'html.parser')
+    return BeautifulSoup(html_content, 'html.parser', parse_only=FORMS_ONLY)
+
+def contains_success_marker(text: str) -> bool:
+    """Case-insensitive search for the success message without a lowercased copy of the page."""
+    return SUCCESS_RE.search(text) is not None
+
+class FormData:
+    """
+    Action, method, named inputs and submit controls of one form.
+    `submits` holds the attributes of each submit input, `buttons` the text of each <button>.
+    """
+    __slots__ = ('action', 'method', 'inputs', 'submits', 'buttons', '_element', '_markup', '_soup')
+
+    def __init__(self, attrs: Dict[str, Any], element: Any = None, markup: Optional[str] = None):
+        self.action = attrs.get('action') or ''
+        self.method = attrs.get('method', 'get').lower()
+        self.inputs: Dict[str, str] = {}
+        self.submits: List[Dict[str, Any]] = []
+        self.buttons: List[str] = []
+        self._element = element
+        self._markup = markup
+        self._soup: Optional[BeautifulSoup] = None
+
+    @classmethod
+    def from_element(cls, element: Any) -> "FormData":
+        form = cls(element.attrs, element=element)
+        for tag in element.find_all(['input', 'button']):
+            if tag.name == 'button':
+                form.buttons.append(tag.get_text())
+            else:
+                form.add_input(tag.attrs)
+        return form
+
+    @classmethod
+    def from_bytes(cls, start_tag: bytes, body: bytes) -> "FormData":
+        """A form read from its start tag and inner bytes (UTF-8) without a parse tree."""
+        form = cls(parse_attrs(start_tag, 'utf-8'), markup=(start_tag + body + b"</form>").decode('utf-8'))
+        for control in CONTROL_RE.finditer(body):
+            if control.group(1) is not None:
+                form.buttons.append(html.unescape(MARKUP_RE.sub(b"", control.group(1)).decode('utf-8')))
+            else:
+                form.add_input(parse_attrs(control.group(0), 'utf-8'))
+        return form
+
+    def add_input(self, attrs: Dict[str, Any]) -> None:
+        if attrs.get('name'):
+            self.inputs[attrs['name']] = attrs.get('value', '')
+        if attrs.get('type', '').lower() == 'submit':
+            self.submits.append(attrs)
+
+    @property
+    def element(self) -> Any:
+        """The form as a BeautifulSoup element, parsed on first use."""
+        if self._element is None:
+            self._soup = BeautifulSoup(self._markup, 'html.parser')
+            self._element = self._soup.form
+        return self._element
+
+    def has_button(self, text_hint: str) -> bool:
+        """Like find_form_by_button_text: first submit input by value/name, or first <button> by text."""
+        if self.submits:
+            submit = self.submits[0]
+            if text_hint in submit.get('value', '').lower() or text_hint in submit.get('name', '').lower():
+                return True
+        return bool(self.buttons) and text_hint in self.buttons[0].lower()
+
+    def submission(self, base_url: str) -> Dict[str, Any]:
+        """Same shape as extract_form_submission_data."""
+        return {'url': urljoin(base_url, self.action), 'method': self.method, 'data': dict(self.inputs)}
+
+    def close(self) -> None:
+        if self._soup is not None:
+            self._soup.decompose()
+            self._soup = None
+            self._element = None
+
+class FormDocument:
+    """The forms of one page, read once."""
+
+    def __init__(self, html_content: str):
+        self.soup: Optional[BeautifulSoup] = None
+        raw = html_content.encode('utf-8')
+        regions = FORM_BYTES_RE.findall(raw)
+        if len(regions) == len(FORM_OPEN_BYTES_RE.findall(raw)):
+            self.forms = [FormData.from_bytes(start_tag, body) for start_tag, body in regions]
+        else:
+            self.soup = BeautifulSoup(html_content, 'html.parser', parse_only=FORMS_ONLY)
+            self.forms = [FormData.from_element(form) for form in self.soup.find_all('form')]
+
+    @property
+    def first_form(self) -> Optional[FormData]:
+        return self.forms[0] if self.forms else None
+
+    def form_with_button(self, text_hint: str) -> Optional[FormData]:
+        for form in self.forms:
+            if form.has_button(text_hint):
+                return form
+        return None
+
+    def close(self) -> None:
+        for form in self.forms:
+            form.close()
+        if self.soup is not None:
+            self.soup.decompose()
+
+    def __enter__(self) -> "FormDocument":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,188 @@
+'''
+Asyncio polling engine.
+Keeps several staggered probes of config.target_url in flight so the booking
+button is detected within a fraction of the poll interval.
+'''
+
+
+import asyncio
+import logging
+from dataclasses import replace
+from typing import Optional, Dict, Any, Tuple
+import httpx
+from .config import Config
+from .conditional import ConditionalPoller
+from .change_detector import ChangeDetector
+from .scanner import find_course_streaming_async
+from .scheduler import ClockSync, BurstScheduler
+from .connections import ConnectionManager
+from .async_bot import find_course, fetch_course_state, process_booking
+from .metrics import METRICS
+from .rate_control import RateController
+from .racing import RacingBooker
+from .booking_flow import CONFIRMATIONS, job_key
+from .session_store import SessionStore
+from .history import OpeningHistory, OpeningPredictor
+
+logger = logging.getLogger(__name__)
+
+class PollingEngine:
+    """
+    Run `concurrency` probe lanes, each offset by interval / concurrency.
+    With a BurstScheduler, interval and the number of active lanes follow the
+    time left until the course opens.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, config: Config, kursnr: str,
+                 concurrency: Optional[int] = None, interval: Optional[float] = None,
+                 scheduler: Optional[BurstScheduler] = None):
+        self.client = client
+        self.config = config
+        self.kursnr = kursnr
+        self.concurrency = max(1, concurrency or config.engine.concurrency)
+        self.interval = interval if interval is not None else config.engine.poll_interval
+        self.scheduler = scheduler
+        self.controller: Optional[RateController] = None
+        self.probes = 0
+        self.poller = ConditionalPoller() if config.engine.conditional else None
+        self.detector = None
+        if config.engine.change_detection != "off":
+            self.detector = ChangeDetector(kursnr, config.engine.change_detection)
+
+    def pacing(self) -> Tuple[float, int]:
+        """Current (interval, active lanes)."""
+        if self.scheduler:
+            pacing = self.scheduler.pacing()
+            if pacing:
+                return pacing
+        return self.interval, self.concurrency
+
+    def target_rate(self) -> float:
+        """Polls per second all active lanes together aim for."""
+        interval, concurrency = self.pacing()
+        return concurrency / interval if interval > 0 else float('inf')
+
+    async def wait_for_course(self) -> Dict[str, Any]:
+        """Poll until one lane finds booking info, then stop all lanes."""
+        found = asyncio.get_running_loop().create_future()
+        lane_count = self.concurrency
+        if self.scheduler:
+            lane_count = max(lane_count, self.scheduler.settings.burst_concurrency)
+        lanes = [asyncio.create_task(self._lane(i, found)) for i in range(lane_count)]
+        try:
+            return await found
+        finally:
+            for lane in lanes:
+                lane.cancel()
+            await asyncio.gather(*lanes, return_exceptions=True)
+
+    async def _detect(self) -> Optional[Dict[str, Any]]:
+        if self.config.engine.detector == "stream":
+            return await find_course_streaming_async(self.client, self.config, self.kursnr, self.detector)
+        return await find_course(self.client, self.config, self.kursnr, self.poller, self.detector)
+
+    async def _lane(self, lane: int, found: asyncio.Future) -> None:
+        active = False
+        while not found.done():
+            interval, concurrency = self.pacing()
+            if lane >= concurrency:
+                active = False
+                await asyncio.sleep(interval)
+                continue
+            if not active:
+                # Stagger lanes whenever they (re)start
+                active = True
+                await asyncio.sleep(lane * interval / concurrency)
+
+            if self.controller:
+                # All lanes draw from one bucket, so the total rate stays what the server tolerates
+                await self.controller.wait_async()
+            self.probes += 1
+            try:
+                booking_info = await self._detect()
+            except Exception as e:
+                logger.error(f"Probe {lane} failed: {e}")
+                await asyncio.sleep(self.controller.error_delay() if self.controller else 1)
+                continue
+
+            if booking_info:
+                if not found.done():
+                    METRICS.record_detection(self.scheduler.opening_lag() if self.scheduler else None)
+                    logger.info(f"Probe {lane} found booking info after {self.probes} probes")
+                    found.set_result(booking_info)
+                return
+            METRICS.maybe_export(self.config.metrics)
+            await asyncio.sleep(interval)
+
+async def create_scheduler(client: httpx.AsyncClient, config: Config, kursnr: str) -> BurstScheduler:
+    """Sync the server clock on the client and read the opening time of the course."""
+    clock = ClockSync()
+    clock.install(client)
+    scheduler = BurstScheduler(config.scheduler, clock)
+    state = await fetch_course_state(client, config, kursnr)
+    scheduler.set_opening_from_state(state)
+    if not scheduler.opening:
+        logger.warning(f"No opening time in booking cell ({state!r}), using the regular poll interval")
+    return scheduler
+
+async def run(config: Config, kursnr: str) -> bool:
+    """Poll with the async engine and book as soon as the course opens."""
+    manager = ConnectionManager(config)
+    async with manager.create_async_client() as client:
+        clients = [client]
+        racer = None
+        if config.racing.enabled:
+            clients += [manager.create_async_client() for _ in range(config.racing.lanes - 1)]
+            racer = RacingBooker(clients, config)
+        store = None
+        if config.session.enabled:
+            store = SessionStore(config.session)
+            store.install(client)
+            for c in clients:
+                store.restore(c)
+            config = replace(config, target_url=store.resolve(config.target_url))
+        history = OpeningHistory(config.history) if config.history.enabled else None
+        keep_warm = []
+        if config.connections.prewarm:
+            await asyncio.gather(*(manager.prewarm_async(c) for c in clients))
+            keep_warm = [asyncio.create_task(manager.keep_warm(c)) for c in clients]
+        try:
+            scheduler = await create_scheduler(client, config, kursnr) if config.scheduler.enabled else None
+            engine = PollingEngine(client, config, kursnr, scheduler=scheduler)
+            if config.rate_control.enabled:
+                engine.controller = RateController(config.rate_control, engine.target_rate, scheduler)
+                engine.controller.install(client)
+            if history:
+                if scheduler:
+                    OpeningPredictor(history).apply(scheduler, config.target_url, kursnr)
+                engine.detector = engine.detector or ChangeDetector(kursnr, 'table')
+                engine.detector.subscribe(history.subscriber(config.target_url, scheduler.clock if scheduler else None))
+            if store:
+                keep_warm.append(asyncio.create_task(store.validate_before_opening(client, config.target_url, scheduler)))
+            while True:
+                booking_info = await engine.wait_for_course()
+                logger.info(f"Booking Info found: {booking_info}")
+                if racer:
+                    success = await racer.process_booking(config, booking_info)
+                else:
+                    success = await process_booking(client, config, booking_info)
+                if success:
+                    logger.info("Process completed successfully.")
+                    return True
+                guard = racer.guard if racer else CONFIRMATIONS
+                if job_key(config) in guard.claimed:
+                    # The confirmation may have gone through, a second booking could double-book
+                    return False
+                logger.error("Process failed during booking. Retrying...")
+        finally:
+            for task in keep_warm:
+                task.cancel()
+            if store:
+                store.save(client)
+            if history:
+                history.close()
+            await asyncio.gather(*(c.aclose() for c in clients[1:]))
+            if racer:
+                logger.info(f"Race wins: {racer.stats.summary()}")
+            logger.info(f"Connection reuse: {manager.stats.summary()}")
+            METRICS.export(config.metrics)
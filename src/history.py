@@ -0,0 +1,145 @@
+'''
+Opening history and open-latency predictor.
+Every observed state change of a watched course ("ab 03.12., 19:30" ->
+"buchen") is appended to a local SQLite table with the server time it was seen
+at and the opening time the page advertised. The predictor turns the observed
+offsets (seen - advertised) into the burst window of the scheduler, so the
+burst covers the span the slot historically opened in instead of a fixed
+burstBefore/burstAfter guess.
+
+Show the recorded offsets with:
+    uv run python -m src.history
+'''
+
+
+import sqlite3
+import logging
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, List, Callable, Tuple, Dict
+from .config import HistoryConfig
+from .change_detector import ChangeEvent
+from .scheduler import ClockSync, BurstScheduler, parse_opening_time, SERVER_TZ
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS transitions (
+    id INTEGER PRIMARY KEY,
+    offer_url TEXT NOT NULL,
+    kursnr TEXT NOT NULL,
+    old_state TEXT,
+    new_state TEXT,
+    bookable INTEGER NOT NULL,
+    advertised REAL, -- opening time the page announced, Unix time
+    observed REAL NOT NULL -- server time the change was seen at
+);
+CREATE INDEX IF NOT EXISTS transitions_course ON transitions (offer_url, kursnr);
+'''
+
+def quantile(values: List[float], q: float) -> float:
+    """Linear interpolation between the closest ranks of sorted `values`."""
+    position = (len(values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+class OpeningHistory:
+    """Append-only store of course state transitions."""
+
+    def __init__(self, settings: HistoryConfig):
+        self.settings = settings
+        path = Path(__file__).parent.parent / settings.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        # Last advertised opening per course, carried to the transition that opens it
+        self.advertised: Dict[Tuple[str, str], float] = {}
+
+    def close(self) -> None:
+        self.db.close()
+
+    def record(self, offer_url: str, kursnr: str, old_state: Optional[str], new_state: Optional[str],
+               bookable: bool, observed: float) -> None:
+        now = datetime.fromtimestamp(observed, SERVER_TZ)
+        key = (offer_url, kursnr)
+        opening = parse_opening_time(new_state or '', now) or parse_opening_time(old_state or '', now)
+        if opening:
+            self.advertised[key] = opening.timestamp()
+        with self.db:
+            self.db.execute(
+                "INSERT INTO transitions (offer_url, kursnr, old_state, new_state, bookable, advertised, observed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (offer_url, kursnr, old_state, new_state, int(bookable), self.advertised.get(key), observed))
+
+    def subscriber(self, offer_url: str, clock: Optional[ClockSync] = None) -> Callable[[ChangeEvent], None]:
+        """ChangeDetector callback recording its events in server time."""
+        def on_change(event: ChangeEvent) -> None:
+            offset = clock.offset if clock else 0.0
+            self.record(offer_url, event.kursnr, event.old_state, event.new_state, event.bookable,
+                        event.timestamp + offset)
+        return on_change
+
+    def offsets(self, offer_url: Optional[str] = None, kursnr: Optional[str] = None) -> List[float]:
+        """Seconds between advertised and observed opening of every recorded opening, sorted."""
+        query = ("SELECT observed - advertised FROM transitions "
+                 "WHERE bookable = 1 AND advertised IS NOT NULL AND old_state IS NOT NULL AND old_state LIKE 'ab %'")
+        args: list = []
+        if offer_url is not None:
+            query += " AND offer_url = ?"
+            args.append(offer_url)
+        if kursnr is not None:
+            query += " AND kursnr = ?"
+            args.append(kursnr)
+        return sorted(row[0] for row in self.db.execute(query, args))
+
+class OpeningPredictor:
+    """Burst window from the offsets of past openings, most specific history first."""
+
+    def __init__(self, history: OpeningHistory):
+        self.history = history
+        self.settings = history.settings
+
+    def samples(self, offer_url: str, kursnr: str) -> List[float]:
+        """Offsets of this course, else of its offer page, else of every course."""
+        for scope in ((offer_url, kursnr), (offer_url, None), (None, None)):
+            offsets = self.history.offsets(*scope)
+            if len(offsets) >= self.settings.min_samples:
+                return offsets
+        return []
+
+    def window(self, offer_url: str, kursnr: str) -> Optional[Tuple[float, float]]:
+        """(burst_before, burst_after) in seconds around the advertised opening, None without enough history."""
+        offsets = self.samples(offer_url, kursnr)
+        if not offsets:
+            return None
+        earliest = quantile(offsets, self.settings.low_quantile)
+        latest = quantile(offsets, self.settings.high_quantile)
+        margin = self.settings.margin
+        return max(margin - earliest, 0.0), max(latest + margin, margin)
+
+    def apply(self, scheduler: BurstScheduler, offer_url: str, kursnr: str) -> bool:
+        """Replace the scheduler's burst window with the predicted one."""
+        window = self.window(offer_url, kursnr)
+        if window is None:
+            return False
+        before, after = window
+        scheduler.settings = replace(scheduler.settings, burst_before=before, burst_after=after)
+        logger.info(f"Burst window from history: {before:.1f}s before to {after:.1f}s after the advertised opening")
+        return True
+
+def main():
+    history = OpeningHistory(HistoryConfig())
+    rows = history.db.execute("SELECT DISTINCT offer_url, kursnr FROM transitions ORDER BY offer_url, kursnr")
+    for offer_url, kursnr in rows.fetchall():
+        offsets = history.offsets(offer_url, kursnr)
+        if not offsets:
+            continue
+        print(f"{kursnr} {offer_url}")
+        print(f"  {len(offsets)} openings, offset min {offsets[0]:+.1f}s, "
+              f"median {quantile(offsets, 0.5):+.1f}s, max {offsets[-1]:+.1f}s")
+    history.close()
+
+if __name__ == "__main__":
+    main()
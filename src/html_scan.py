@@ -0,0 +1,19 @@
+'''
+Small byte-level helpers for reading tags without building a parse tree.
+'''
+
+
+import re
+import html
+from typing import Dict
+
+ATTR_RE = re.compile(rb"""([\w-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""")
+
+def parse_attrs(tag: bytes, charset: str = 'iso-8859-1') -> Dict[str, str]:
+    """Parse the attributes of a single start tag."""
+    attrs = {}
+    for match in ATTR_RE.finditer(tag):
+        name = match.group(1).decode('ascii', 'replace').lower()
+        raw = next((g for g in match.groups()[1:] if g is not None), b'')
+        attrs[name] = html.unescape(raw.decode(charset, 'replace'))
+    return attrs
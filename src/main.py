@@ -1,53 +1,179 @@
 import sys
 import time
+import asyncio
 import logging
-from src.config import load_config
+from src.config import load_config, booking_jobs
 import src.bot
+import src.engine
+import src.batch
+import src.watcher
+import src.waitlist
+from src.conditional import ConditionalPoller
+from src.change_detector import ChangeDetector
+from src.scanner import find_course_streaming
+from src.scheduler import ClockSync, BurstScheduler
+from src.connections import ConnectionManager
+from src.metrics import METRICS
+from src.rate_control import RateController
+from src.session_store import SessionStore
+from src.recorder import RECORDER, HOT_LOG
+from src.capture import CAPTURE
+from src.parse_pool import PARSE_POOL
+from src.history import OpeningHistory, OpeningPredictor
+from src.memory import MemoryGuard
+from src.booking_flow import CONFIRMATIONS, job_key
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def next_interval(config, scheduler) -> float:
+    """Sleep between two polls; the scheduler slows down while opening is far away."""
+    pacing = scheduler.pacing() if scheduler else None
+    return pacing[0] if pacing else config.engine.poll_interval
+
 def main():
     try:
         config = load_config()
     except Exception as e:
         logger.error(f"Configuration error: {e}")
         return
+    RECORDER.configure(config.recorder)
+    CAPTURE.configure(config.capture)
+    PARSE_POOL.configure(config.parsing)
+
+    if config.offers and len(sys.argv) == 1:
+        try:
+            asyncio.run(src.watcher.run(config))
+        except KeyboardInterrupt:
+            logger.info("Bot stopped by user.")
+        return
+
+    if config.waitlist.offers and len(sys.argv) == 1:
+        try:
+            asyncio.run(src.waitlist.run(config))
+        except KeyboardInterrupt:
+            logger.info("Bot stopped by user.")
+        return
 
     # Allow overriding Kursnr from command line
-    kursnr = config.user_info.kursnr
-    if len(sys.argv) > 1:
-        kursnr = sys.argv[1]
+    jobs = booking_jobs(config, sys.argv[1] if len(sys.argv) > 1 else None)
+    if len(jobs) > 1:
+        try:
+            asyncio.run(src.batch.run(config, jobs))
+        except KeyboardInterrupt:
+            logger.info("Bot stopped by user.")
+        return
 
+    kursnr = jobs[0].kursnr
     if not kursnr:
         logger.error("No Kursnr provided in config or command line")
         return
 
     logger.info(f"Starting bot for Kursnr: {kursnr}")
+
+    if config.engine.mode == "async":
+        try:
+            asyncio.run(src.engine.run(config, kursnr))
+        except KeyboardInterrupt:
+            logger.info("Bot stopped by user.")
+        return
     
-    with src.bot.create_client(config) as client:
+    if config.racing.enabled:
+        logger.warning("[racing] needs mode = \"async\" in [engine], booking on a single session")
+    if config.parsing.executor != "inline":
+        logger.warning("[parsing] applies to the async modes, the sync loop parses inline")
+        PARSE_POOL.close()
+
+    poller = ConditionalPoller() if config.engine.conditional else None
+    detector = ChangeDetector(kursnr, config.engine.change_detection) if config.engine.change_detection != "off" else None
+    manager = ConnectionManager(config)
+    with manager.create_client() as client:
+        store = None
+        if config.session.enabled:
+            store = SessionStore(config.session)
+            store.install(client)
+            if store.restore(client):
+                config.target_url = store.resolve(config.target_url)
+
+        if config.connections.prewarm:
+            manager.prewarm(client)
+
+        scheduler = None
+        if config.scheduler.enabled:
+            clock = ClockSync()
+            clock.install(client)
+            scheduler = BurstScheduler(config.scheduler, clock)
+            scheduler.set_opening_from_state(src.bot.fetch_course_state(client, config, kursnr))
+
+        history = OpeningHistory(config.history) if config.history.enabled else None
+        if history:
+            if scheduler:
+                OpeningPredictor(history).apply(scheduler, config.target_url, kursnr)
+            detector = detector or ChangeDetector(kursnr, 'table')
+            detector.subscribe(history.subscriber(config.target_url, scheduler.clock if scheduler else None))
+
+        controller = None
+        if config.rate_control.enabled:
+            controller = RateController(config.rate_control, lambda: 1 / next_interval(config, scheduler), scheduler)
+            controller.install(client)
+
+        guard = None
+        if config.memory.enabled:
+            guard = MemoryGuard(config.memory)
+            guard.start()
+
         while True:
             try:
-                booking_info = src.bot.find_course(client, config, kursnr)
+                if guard:
+                    guard.pause(bool(scheduler and scheduler.in_burst()))
+                    if guard.due() and guard.check():
+                        client = manager.recycle(client)
+                        guard.collect()
+                        if config.connections.prewarm:
+                            manager.prewarm(client)
+                if store and store.due_for_validation(scheduler):
+                    store.validate(client, config.target_url)
+                if config.engine.detector == "stream":
+                    booking_info = find_course_streaming(client, config, kursnr, detector)
+                else:
+                    booking_info = src.bot.find_course(client, config, kursnr, poller, detector)
                 if booking_info:
+                    METRICS.record_detection(scheduler.opening_lag() if scheduler else None)
                     logger.info(f"Booking Info found: {booking_info}")
                     success = src.bot.process_booking(client, config, booking_info)
                     if success:
                         logger.info("Process completed successfully.")
                         break # Exit loop on success
+                    elif job_key(config) in CONFIRMATIONS.claimed:
+                        # The confirmation may have gone through, a second booking could double-book
+                        break
                     else:
                         logger.error("Process failed during booking. Retrying...")
                 else:
-                    logger.info("Course not yet available or booking info not found. Waiting...")
+                    skipped = HOT_LOG.allow('waiting')
+                    if skipped is not None:
+                        logger.info(f"Course not yet available or booking info not found. Waiting... ({skipped} polls since last message)")
                 
-                time.sleep(0.5)
+                METRICS.maybe_export(config.metrics)
+                time.sleep(controller.delay() if controller else next_interval(config, scheduler))
             except KeyboardInterrupt:
                 logger.info("Bot stopped by user.")
                 break
             except Exception as e:
                 logger.error(f"An unexpected error occurred: {e}")
-                time.sleep(1) # Wait a bit longer on error before retrying
+                time.sleep(controller.error_delay() if controller else 1) # Wait a bit longer on error before retrying
+
+        if store:
+            store.save(client)
+        if history:
+            history.close()
+        if guard:
+            guard.stop()
+        # A recycled client is not the one this block opened
+        client.close()
+
+    METRICS.export(config.metrics)
 
 if __name__ == "__main__":
     main()
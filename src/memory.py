@@ -0,0 +1,127 @@
+'''
+Memory budget guard for the long-running poll loop.
+With [memory] enabled, tracemalloc traces every allocation. Every interval
+seconds a snapshot is compared with the one taken at start and the sites that
+grew most are logged, attributed to the innermost frame in find_course and the
+parsing helpers (a BeautifulSoup tree shows up at the bot.py line that built
+it, not somewhere inside bs4). When the traced heap or the resident set size
+exceeds its budget, the loop recycles its HTTP client and collects garbage.
+Tracing makes parsing several times slower, so it pauses during the burst.
+'''
+
+
+import os
+import gc
+import time
+import logging
+import tracemalloc
+from typing import Optional, Dict, List, Tuple, Callable
+from .config import MemoryConfig
+
+logger = logging.getLogger(__name__)
+
+MIB = 1024 * 1024
+
+# Allocations are reported at their innermost frame in one of these modules
+WATCHED_FILES = tuple(os.path.join('src', name) for name in (
+    'bot.py', 'async_bot.py', 'course_table.py', 'document.py', 'change_detector.py', 'scanner.py',
+    'conditional.py', 'main.py', 'engine.py',
+))
+
+def rss_bytes() -> Optional[int]:
+    """Resident set size of this process; None where /proc is not available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def allocation_sites(snapshot: tracemalloc.Snapshot) -> Dict[str, Tuple[int, int]]:
+    """'src/bot.py:210' -> (bytes, blocks) of the live allocations made below that line."""
+    sites: Dict[str, Tuple[int, int]] = {}
+    # Grouped by whole traceback first: a few hundred groups instead of every block
+    for stat in snapshot.statistics('traceback'):
+        # Frames run from the oldest to the most recent call
+        for frame in reversed(stat.traceback):
+            if frame.filename.endswith(WATCHED_FILES):
+                site = f"{os.path.join(*frame.filename.rsplit(os.sep, 2)[-2:])}:{frame.lineno}"
+                size, count = sites.get(site, (0, 0))
+                sites[site] = (size + stat.size, count + stat.count)
+                break
+    return sites
+
+class MemoryGuard:
+    """Periodic tracemalloc report and budget check."""
+
+    def __init__(self, settings: MemoryConfig, clock: Callable[[], float] = time.monotonic):
+        self.settings = settings
+        self.clock = clock
+        self.baseline: Dict[str, Tuple[int, int]] = {}
+        self.next_check = clock() + settings.interval
+        self.checks = 0
+        self.recycles = 0
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.settings.frames)
+        self.baseline = allocation_sites(tracemalloc.take_snapshot())
+        logger.info(f"Memory guard: snapshots every {self.settings.interval:.0f}s, "
+                    f"heap budget {self.settings.heap_budget or '-'} MiB, RSS budget {self.settings.rss_budget or '-'} MiB")
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+
+    def pause(self, paused: bool) -> None:
+        """
+        Stop tracing while `paused` and start again afterwards: a traced parse is
+        several times slower, too slow for the burst around an opening.
+        The RSS budget is still checked meanwhile.
+        """
+        if paused and tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("Memory guard: tracing paused around the opening")
+        elif not paused and not tracemalloc.is_tracing():
+            self.start()
+
+    def due(self) -> bool:
+        return self.clock() >= self.next_check
+
+    def growth(self) -> List[Tuple[str, int, int]]:
+        """(site, bytes, blocks) grown since start, largest first."""
+        current = allocation_sites(tracemalloc.take_snapshot())
+        grown = []
+        for site, (size, count) in current.items():
+            base_size, base_count = self.baseline.get(site, (0, 0))
+            if size > base_size:
+                grown.append((site, size - base_size, count - base_count))
+        return sorted(grown, key=lambda item: item[1], reverse=True)[:self.settings.top]
+
+    def check(self) -> bool:
+        """Log a snapshot report. True when a budget is exceeded and the client should be recycled."""
+        self.checks += 1
+        self.next_check = self.clock() + self.settings.interval
+        heap, peak = tracemalloc.get_traced_memory()
+        rss = rss_bytes()
+        rss_text = f"{rss / MIB:.1f} MiB" if rss is not None else "n/a"
+        logger.info(f"Memory: heap {heap / MIB:.1f} MiB (peak {peak / MIB:.1f} MiB), RSS {rss_text}")
+        # Without tracing (an RSS budget alone) there are no allocation sites to list
+        for site, size, count in self.growth() if tracemalloc.is_tracing() else []:
+            logger.info(f"  +{size / 1024:.1f} KiB in {count:+d} blocks at {site}")
+
+        over = []
+        if self.settings.heap_budget and heap > self.settings.heap_budget * MIB:
+            over.append(f"heap {heap / MIB:.1f} > {self.settings.heap_budget} MiB")
+        if self.settings.rss_budget and rss is not None and rss > self.settings.rss_budget * MIB:
+            over.append(f"RSS {rss / MIB:.1f} > {self.settings.rss_budget} MiB")
+        if over:
+            logger.warning(f"Memory budget exceeded ({', '.join(over)}), recycling the client")
+        return bool(over)
+
+    def collect(self) -> None:
+        """Run after a recycle: collect garbage and log what it freed."""
+        self.recycles += 1
+        before, _ = tracemalloc.get_traced_memory()
+        unreachable = gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+        logger.info(f"Recycle {self.recycles}: {unreachable} unreachable objects, heap "
+                    f"{before / MIB:.1f} -> {after / MIB:.1f} MiB")
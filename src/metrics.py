@@ -0,0 +1,227 @@
+'''
+Latency instrumentation for the booking pipeline.
+Timing spans (fetch connect/TTFB/body, parsing, find_course and every booking
+step) are aggregated into fixed-bucket histograms next to the poll-loop
+counters, and exported as JSON or Prometheus text format.
+'''
+
+
+import json
+import time
+import bisect
+import asyncio
+import logging
+import functools
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Optional, Dict, List, Callable
+from .config import MetricsConfig
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, from a local parse to a slow booking step
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Cumulative-bucket histogram like Prometheus keeps it."""
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'buckets': {str(bound): count for bound, count in zip(self.buckets + ('+Inf',), self.cumulative())},
+        }
+
+    def cumulative(self) -> List[int]:
+        total, result = 0, []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+class Metrics:
+    """Span histograms plus poll-loop counters."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.spans: Dict[str, Histogram] = {}
+        self.detection_lag = Histogram()
+        self.polls = 0
+        self.poll_errors = 0
+        self.started = time.monotonic()
+        self.last_export = self.started
+        self.last_poll: Optional[float] = None
+        self.previous_poll: Optional[float] = None
+
+    def observe(self, name: str, seconds: float) -> None:
+        histogram = self.spans.get(name)
+        if histogram is None:
+            histogram = self.spans[name] = Histogram()
+        histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def record_poll(self) -> None:
+        self.polls += 1
+        self.previous_poll, self.last_poll = self.last_poll, time.monotonic()
+
+    def record_poll_error(self) -> None:
+        self.poll_errors += 1
+
+    def record_detection(self, opening_lag: Optional[float] = None) -> None:
+        """
+        Seconds between the course opening and its detection.
+        Without a known opening time, the gap since the previous poll bounds the lag.
+        """
+        if opening_lag is None and self.previous_poll is not None:
+            opening_lag = time.monotonic() - self.previous_poll
+        if opening_lag is not None:
+            self.detection_lag.observe(max(opening_lag, 0.0))
+
+    def polls_per_second(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.polls / elapsed if elapsed > 0 else 0.0
+
+    def error_rate(self) -> float:
+        return self.poll_errors / self.polls if self.polls else 0.0
+
+    def trace(self) -> Callable:
+        """httpcore trace callback recording connect, TTFB and body time of one request."""
+        started: Dict[str, float] = {}
+
+        def trace(event_name: str, info: dict) -> None:
+            now = time.perf_counter()
+            if event_name == 'connection.connect_tcp.started':
+                started['connect'] = now
+            elif event_name.endswith('send_request_headers.started'):
+                if 'connect' in started:
+                    self.observe('connect', now - started.pop('connect'))
+                started['ttfb'] = now
+            elif event_name.endswith('receive_response_headers.complete') and 'ttfb' in started:
+                self.observe('ttfb', now - started.pop('ttfb'))
+            elif event_name.endswith('receive_response_body.started'):
+                started['body'] = now
+            elif event_name.endswith('receive_response_body.complete') and 'body' in started:
+                self.observe('body', now - started.pop('body'))
+        return trace
+
+    def async_trace(self) -> Callable:
+        trace = self.trace()
+
+        async def async_trace(event_name: str, info: dict) -> None:
+            trace(event_name, info)
+        return async_trace
+
+    def to_dict(self) -> dict:
+        return {
+            'uptime': time.monotonic() - self.started,
+            'polls': self.polls,
+            'poll_errors': self.poll_errors,
+            'polls_per_second': self.polls_per_second(),
+            'error_rate': self.error_rate(),
+            'detection_lag': self.detection_lag.to_dict(),
+            'spans': {name: histogram.to_dict() for name, histogram in sorted(self.spans.items())},
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        lines = []
+
+        def histogram_lines(metric: str, histogram: Histogram, labels: str = "") -> None:
+            bounds = [str(bound) for bound in histogram.buckets] + ['+Inf']
+            for bound, count in zip(bounds, histogram.cumulative()):
+                lines.append(f'{metric}_bucket{{{labels}le="{bound}"}} {count}')
+            suffix = f"{{{labels.rstrip(',')}}}" if labels else ""
+            lines.append(f"{metric}_sum{suffix} {histogram.sum}")
+            lines.append(f"{metric}_count{suffix} {histogram.count}")
+
+        lines.append("# TYPE bot_span_seconds histogram")
+        for name, histogram in sorted(self.spans.items()):
+            histogram_lines("bot_span_seconds", histogram, f'span="{name}",')
+        lines.append("# TYPE bot_detection_lag_seconds histogram")
+        histogram_lines("bot_detection_lag_seconds", self.detection_lag)
+        lines.append("# TYPE bot_polls_total counter")
+        lines.append(f"bot_polls_total {self.polls}")
+        lines.append("# TYPE bot_poll_errors_total counter")
+        lines.append(f"bot_poll_errors_total {self.poll_errors}")
+        lines.append("# TYPE bot_polls_per_second gauge")
+        lines.append(f"bot_polls_per_second {self.polls_per_second()}")
+        lines.append("# TYPE bot_poll_error_ratio gauge")
+        lines.append(f"bot_poll_error_ratio {self.error_rate()}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        parts = [f"{self.polls} polls ({self.polls_per_second():.1f}/s, {self.error_rate():.0%} errors)"]
+        for name, histogram in sorted(self.spans.items()):
+            parts.append(f"{name} {histogram.sum / histogram.count * 1000:.1f}ms")
+        return ", ".join(parts)
+
+    def export(self, settings: MetricsConfig) -> None:
+        """Write the configured export files; empty paths are skipped."""
+        self.last_export = time.monotonic()
+        for path, render in ((settings.json_path, self.to_json), (settings.prometheus_path, self.to_prometheus)):
+            if path:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                Path(path).write_text(render(), encoding='utf-8')
+        logger.info(f"Metrics: {self.summary()}")
+
+    def maybe_export(self, settings: MetricsConfig) -> None:
+        """Export once export_interval seconds passed since the last export."""
+        if time.monotonic() - self.last_export >= settings.export_interval:
+            self.export(settings)
+
+# Process-wide registry used by bot.py, async_bot.py and the poll loops
+METRICS = Metrics()
+
+def timed(name: str) -> Callable:
+    """Decorator recording the call duration of a sync or async function as span `name`."""
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with METRICS.span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with METRICS.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,277 @@
+'''
+Local stand-in for the HSZ booking system.
+Serves the captured pages in data/ as a stateful booking flow:
+offer page -> Buchen popup (page1.html) -> registration form (3.html)
+-> final confirmation (page3.html) -> success page.
+Supports latency, jitter, error injection and a scripted opening time
+(announced as "ab ..." or, for a full course, shown as Warteliste).
+
+Run standalone with:
+    uv run python -m src.mock_server --opens-in 30
+'''
+
+
+import re
+import sys
+import time
+import gzip
+import random
+import hashlib
+import secrets
+import argparse
+import threading
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Dict, Tuple
+from zoneinfo import ZoneInfo
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+LIVE_ORIGIN = b"https://buchung.hsz.rwth-aachen.de"
+OFFER_PATH = "/angebote/aktueller_zeitraum/_Basketball_Spielbetrieb.html"
+BOOKING_PATH = "/cgi/anmeldung.fcgi"
+
+SUCCESS_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Anmeldung</title></head>
+<body><div id="bs_form_main"><div class="bs_text_big">Ihre Buchung war erfolgreich.</div>
+<div class="bs_form_entext">Your booking was successful.</div></div></body></html>
+""".encode('utf-8')
+
+ERROR_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Anmeldung</title></head>
+<body><div class="bs_text_red">Fehler: Sitzung abgelaufen oder Angaben unvollst&auml;ndig.</div></body></html>
+""".encode('utf-8')
+
+REQUIRED_FIELDS = ('vorname', 'name', 'email', 'tnbed')
+
+# Order of the steps a session (fid) goes through
+SESSION_STEPS = ('buchen', 'registration', 'confirmation', 'done')
+
+FID_RE = re.compile(rb'(name="fid"\s+value=")[^"]*(")')
+
+def booking_cell_re(kursnr: str) -> re.Pattern:
+    return re.compile(
+        rb"(<td class='bs_sknr'>" + re.escape(kursnr.encode()) + rb"</td>.*?<td class='bs_sbuch'>)(.*?)(</td>)",
+        re.DOTALL
+    )
+
+class MockBookingServer:
+    """Threaded HTTP server; start() returns the base URL."""
+
+    def __init__(self, kursnr: str = "13131849", opening_at: Optional[float] = None,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 seed: Optional[int] = None, port: int = 0, waitlist: bool = False):
+        self.kursnr = kursnr
+        self.opening_at = opening_at
+        self.waitlist = waitlist # full until opening_at instead of "ab ..."
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.port = port
+        self.sessions: Dict[str, str] = {} # fid -> next expected step
+        self.stats = {'requests': 0, 'polls': 0, 'not_modified': 0, 'errors_injected': 0, 'confirmations': 0}
+        self.lock = threading.Lock()
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+        self.base_url = ""
+
+    # Pages
+
+    def _load(self, name: str) -> bytes:
+        return (DATA_DIR / name).read_bytes().replace(LIVE_ORIGIN, self.base_url.encode())
+
+    def _prepare_pages(self) -> None:
+        offer = self._load("1.html")
+        cell_re = booking_cell_re(self.kursnr)
+        if not cell_re.search(offer):
+            raise ValueError(f"Kursnr {self.kursnr} not found in data/1.html")
+
+        button = b'<a id="K' + self.kursnr.encode() + b'"></a><input type="submit" value="buchen" title="booking" name="BS_Kursid_223193" class="bs_btn_buchen">'
+        self.open_page = cell_re.sub(lambda m: m.group(1) + button + m.group(3), offer, count=1)
+        if self.opening_at is not None and self.waitlist:
+            button = b'<a id="K' + self.kursnr.encode() + b'"></a><input type="submit" value="Warteliste" name="BS_Kursid_223193" class="bs_btn_warteliste">'
+            self.closed_page = cell_re.sub(lambda m: m.group(1) + button + m.group(3), offer, count=1)
+        elif self.opening_at is not None:
+            opening = datetime.fromtimestamp(self.opening_at, ZoneInfo("Europe/Berlin"))
+            span = f'<a id="K{self.kursnr}"></a><span class=\'bs_btn_autostart\'>ab {opening:%d.%m.}, {opening:%H:%M}</span>'.encode()
+            self.closed_page = cell_re.sub(lambda m: m.group(1) + span + m.group(3), offer, count=1)
+        else:
+            self.closed_page = self.open_page
+
+        self.variants = {}
+        for key, page in (('open', self.open_page), ('closed', self.closed_page)):
+            self.variants[key] = (page, gzip.compress(page), '"' + hashlib.sha1(page).hexdigest()[:16] + '"')
+
+        self.popup_page = self._load("page1.html")
+        self.registration_page = self._load("3.html")
+        self.confirmation_page = self._load("page3.html")
+
+    def is_open(self) -> bool:
+        return self.opening_at is None or time.time() >= self.opening_at
+
+    def new_session(self) -> str:
+        fid = secrets.token_hex(28)
+        with self.lock:
+            self.sessions[fid] = 'buchen'
+        return fid
+
+    def advance(self, fields: Dict[str, str]) -> Tuple[int, bytes]:
+        """The booking endpoint's state machine. Returns (status, page)."""
+        if any(name.startswith('BS_Kursid_') for name in fields):
+            if not self.is_open():
+                return 200, ERROR_PAGE
+            fid = self.new_session()
+            return 200, FID_RE.sub(lambda m: m.group(1) + fid.encode() + m.group(2), self.popup_page, count=1)
+
+        fid = fields.get('fid', '')
+        if any(name.startswith('BS_Termin_') for name in fields):
+            step, page = 'buchen', self.registration_page
+        elif fields.get('Phase') == 'final':
+            step, page = 'confirmation', SUCCESS_PAGE
+        elif all(fields.get(name) for name in REQUIRED_FIELDS):
+            step, page = 'registration', self.confirmation_page
+        else:
+            return 200, ERROR_PAGE
+
+        with self.lock:
+            current = self.sessions.get(fid)
+            # Steps the session has not reached are rejected; re-submitting a passed step re-renders its answer
+            if current is None or SESSION_STEPS.index(current) < SESSION_STEPS.index(step):
+                return 200, ERROR_PAGE
+            if step == 'confirmation':
+                # Every final submit books, duplicates included
+                self.stats['confirmations'] += 1
+            next_step = SESSION_STEPS[SESSION_STEPS.index(step) + 1]
+            if SESSION_STEPS.index(next_step) > SESSION_STEPS.index(current):
+                self.sessions[fid] = next_step
+        return 200, FID_RE.sub(lambda m: m.group(1) + fid.encode() + m.group(2), page, count=1)
+
+    # Server lifecycle
+
+    def start(self) -> str:
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _delay_and_maybe_fail(self) -> bool:
+                with mock.lock:
+                    mock.stats['requests'] += 1
+                    delay = mock.latency + mock.random.uniform(0, mock.jitter)
+                    fail = mock.random.random() < mock.error_rate
+                if delay:
+                    time.sleep(delay)
+                if fail:
+                    with mock.lock:
+                        mock.stats['errors_injected'] += 1
+                    self._send(503, b"Service Unavailable", {'Retry-After': '1'})
+                return fail
+
+            def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None,
+                      content_type: str = "text/html; charset=utf-8") -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    try:
+                        self.wfile.write(body)
+                    except (BrokenPipeError, ConnectionResetError):
+                        # The streaming scanner hangs up once it has seen the target row
+                        self.close_connection = True
+
+            def do_HEAD(self):
+                self._send(200, b"")
+
+            def do_GET(self):
+                if self._delay_and_maybe_fail():
+                    return
+                if urlsplit(self.path).path != OFFER_PATH:
+                    self._send(404, b"Not Found")
+                    return
+
+                with mock.lock:
+                    mock.stats['polls'] += 1
+                page, compressed, etag = mock.variants['open' if mock.is_open() else 'closed']
+                if self.headers.get('If-None-Match') == etag:
+                    with mock.lock:
+                        mock.stats['not_modified'] += 1
+                    self._send(304, b"", {'ETag': etag})
+                    return
+
+                headers = {'ETag': etag}
+                body = page
+                if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    headers['Content-Encoding'] = 'gzip'
+                    body = compressed
+                self._send(200, body, headers, "text/html; charset=iso-8859-1")
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                raw = self.rfile.read(length)
+                if self._delay_and_maybe_fail():
+                    return
+                if urlsplit(self.path).path != BOOKING_PATH:
+                    self._send(404, b"Not Found")
+                    return
+                fields = {name: values[-1] for name, values in parse_qs(raw.decode('utf-8'), keep_blank_values=True).items()}
+                status, page = mock.advance(fields)
+                self._send(status, page)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._prepare_pages()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    @property
+    def offer_url(self) -> str:
+        return self.base_url + OFFER_PATH
+
+    def stop(self) -> None:
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self) -> "MockBookingServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in booking server")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--kursnr", default="13131849")
+    parser.add_argument("--opens-in", type=float, default=None, help="seconds until the course opens")
+    parser.add_argument("--waitlist", action="store_true", help="show Warteliste instead of the opening time until then")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    opening_at = time.time() + args.opens_in if args.opens_in is not None else None
+    server = MockBookingServer(args.kursnr, opening_at, args.latency, args.jitter, args.error_rate, port=args.port,
+                               waitlist=args.waitlist)
+    server.start()
+    print(f"Serving {server.offer_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
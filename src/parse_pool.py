@@ -0,0 +1,117 @@
+'''
+Parsing off the event loop.
+In the async modes (engine, batch and daemon, watcher, waitlist) a BeautifulSoup parse
+runs on the loop thread and holds up every other request in flight. With
+[parsing] executor = "thread" or "process", PARSE_POOL hands the raw response
+body and its encoding to a worker, which returns a small picklable record:
+the state and booking info of the watched rows, or what the booking flow needs
+from a step's answer (see booking_flow.read_step). Logging of the results,
+RECORDER events and change detection stay on the loop; workers only parse.
+
+A thread pool keeps the loop responsive but shares the GIL with it; a process
+pool also spreads parsing over the cores. The sync loop always parses inline,
+it waits for each result anyway.
+'''
+
+
+import os
+import atexit
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Optional, Dict, Any, Tuple, Iterable, Callable
+import httpx
+from .config import Config, ParsingConfig, UserInfo
+from .course_table import CourseTable
+from .booking_flow import read_step
+from .payload_template import get_template_cache
+from .metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+EXECUTORS = ('inline', 'thread', 'process')
+
+# (state, booking info) of one Kursnr; (None, None) when the page has no such row
+RowState = Tuple[Optional[str], Optional[Dict[str, Any]]]
+
+def decode(body: bytes, encoding: Optional[str]) -> str:
+    """The text httpx would have returned as response.text."""
+    return body.decode(encoding or 'utf-8', errors='replace')
+
+def course_states(body: bytes, encoding: Optional[str], base_url: str, kursnrs: Tuple[str, ...],
+                  bookable_only: bool = False) -> Dict[str, RowState]:
+    """
+    Worker side: state and booking info of every Kursnr on an offer page.
+    With `bookable_only`, rows without a bookable button (a mere link) have no booking info.
+    """
+    table = CourseTable.from_html(decode(body, encoding))
+    states = {}
+    for kursnr in kursnrs:
+        record = table.get(kursnr)
+        if record is None:
+            states[kursnr] = (None, None)
+        elif bookable_only and not record.bookable:
+            states[kursnr] = (record.state, None)
+        else:
+            states[kursnr] = (record.state, record.booking_info(base_url))
+    return states
+
+def booking_step(step: str, body: bytes, encoding: Optional[str], url: str, user: UserInfo,
+                 payload_cache_dir: Optional[str]) -> Dict[str, Any]:
+    """Worker side: booking_flow.read_step on a raw answer."""
+    templates = get_template_cache(payload_cache_dir) if payload_cache_dir else None
+    return read_step(step, decode(body, encoding), url, user, templates)
+
+def _ready() -> bool:
+    return True
+
+class ParsePool:
+    """Runs the extractors above inline, in a thread pool or in a process pool."""
+
+    def __init__(self, settings: Optional[ParsingConfig] = None):
+        self.executor: Optional[Executor] = None
+        self.configure(settings or ParsingConfig())
+        atexit.register(self.close)
+
+    def configure(self, settings: ParsingConfig) -> None:
+        if settings.executor not in EXECUTORS:
+            raise ValueError(f"Unknown parsing executor: {settings.executor}")
+        self.close()
+        self.settings = settings
+        workers = settings.workers or os.cpu_count() or 1
+        if settings.executor == 'thread':
+            self.executor = ThreadPoolExecutor(workers, thread_name_prefix='parse')
+        elif settings.executor == 'process':
+            # Spawned, not forked: a fork would copy the event loop's threads and locks mid-use
+            self.executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+            # Start the workers and import bs4 there now, not on the first poll after the opening
+            for _ in range(workers):
+                self.executor.submit(_ready)
+        if self.executor is not None:
+            logger.info(f"Parsing in a {settings.executor} pool of {workers} workers")
+
+    async def run(self, func: Callable, *args) -> Any:
+        """func(*args) in the pool; the span includes the wait for a free worker."""
+        with METRICS.span('parse'):
+            if self.executor is None:
+                return func(*args)
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def course_states(self, response: httpx.Response, kursnrs: Iterable[str],
+                            bookable_only: bool = False) -> Dict[str, RowState]:
+        return await self.run(course_states, response.content, response.encoding, str(response.url), tuple(kursnrs),
+                              bookable_only)
+
+    async def booking_step(self, step: str, response: httpx.Response, config: Config) -> Dict[str, Any]:
+        payload_cache_dir = config.engine.payload_cache_dir if config.engine.payload_templates else None
+        return await self.run(booking_step, step, response.content, response.encoding, str(response.url),
+                              config.user_info, payload_cache_dir)
+
+    def close(self) -> None:
+        if self.executor is None:
+            return
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.executor = None
+
+PARSE_POOL = ParsePool()
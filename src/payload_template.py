@@ -0,0 +1,130 @@
+'''
+Precompiled registration payloads.
+The registration form (see data/3.html) has the same structure on every booking,
+only the hidden fid/Phase/Termin fields change. The output of
+map_user_to_form_fields is compiled once per form fingerprint and UserInfo,
+cached on disk, and merged with the volatile fields at booking time without
+building a parse tree.
+
+Precompile from a captured registration page with:
+    uv run python -m src.payload_template data/3.html
+'''
+
+
+import re
+import sys
+import json
+import hashlib
+import logging
+from dataclasses import asdict
+from pathlib import Path
+from urllib.parse import urljoin
+from typing import Optional, Dict, Any, List, Tuple
+from .config import UserInfo
+from .html_scan import parse_attrs
+
+logger = logging.getLogger(__name__)
+
+VOLATILE_FIELDS = ('fid', 'Phase', 'Termin')
+
+FORM_RE = re.compile(rb"<form\b[^>]*>(.*?)</form\s*>", re.IGNORECASE | re.DOTALL)
+FIELD_RE = re.compile(rb"<(input|select|textarea|option)\b[^>]*>", re.IGNORECASE)
+
+class FormScan:
+    """Action, method and field tags of the first form, read from raw bytes."""
+    __slots__ = ('action', 'method', 'fields', 'fingerprint')
+
+    def __init__(self, action: str, method: str, fields: List[Tuple[str, Dict[str, str]]]):
+        self.action = action
+        self.method = method
+        self.fields = fields
+        structure = [
+            (tag, attrs.get('id', ''), attrs.get('name', ''), attrs.get('type', ''),
+             attrs.get('value', '') if tag == 'option' else '')
+            for tag, attrs in fields
+        ]
+        self.fingerprint = hashlib.sha256(json.dumps(structure).encode()).hexdigest()[:16]
+
+    def volatile_values(self) -> Dict[str, str]:
+        return {
+            attrs['name']: attrs.get('value', '')
+            for tag, attrs in self.fields
+            if tag == 'input' and attrs.get('type', '').lower() == 'hidden' and attrs.get('name') in VOLATILE_FIELDS
+        }
+
+def scan_form(html_content: str) -> Optional[FormScan]:
+    """Read the first form of the page without BeautifulSoup."""
+    raw = html_content.encode('utf-8', 'replace')
+    match = FORM_RE.search(raw)
+    if not match:
+        return None
+    form_attrs = parse_attrs(raw[match.start():match.start(1)], 'utf-8')
+    fields = [
+        (field.group(1).decode('ascii').lower(), parse_attrs(field.group(0), 'utf-8'))
+        for field in FIELD_RE.finditer(match.group(1))
+    ]
+    return FormScan(form_attrs.get('action', ''), form_attrs.get('method', 'get').lower(), fields)
+
+def user_digest(user: UserInfo) -> str:
+    return hashlib.sha256(json.dumps(asdict(user), sort_keys=True).encode()).hexdigest()[:16]
+
+class PayloadTemplateCache:
+    """Compiled payloads keyed by form fingerprint and user, in memory and on disk."""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self.templates: Dict[str, Dict[str, str]] = {}
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def lookup(self, scan: FormScan, user: UserInfo) -> Optional[Dict[str, str]]:
+        key = f"{scan.fingerprint}-{user_digest(user)}"
+        template = self.templates.get(key)
+        if template is None and self._path(key).exists():
+            template = json.loads(self._path(key).read_text(encoding='utf-8'))
+            self.templates[key] = template
+        return template
+
+    def store(self, scan: FormScan, user: UserInfo, data: Dict[str, str]) -> None:
+        """Keep the non-volatile part of a mapped payload for this form structure and user."""
+        template = {name: value for name, value in data.items() if name not in VOLATILE_FIELDS}
+        key = f"{scan.fingerprint}-{user_digest(user)}"
+        self.templates[key] = template
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._path(key).write_text(json.dumps(template, ensure_ascii=False), encoding='utf-8')
+        logger.info(f"Compiled registration payload template {key}")
+
+    def render(self, html_content: str, user: UserInfo, base_url: str) -> Optional[Dict[str, Any]]:
+        """
+        Submission data for the registration form from the cached template.
+        Returns None on a cache miss; the caller maps the form and stores it then.
+        """
+        scan = scan_form(html_content)
+        if scan is None:
+            return None
+        template = self.lookup(scan, user)
+        if template is None:
+            return None
+        data = dict(template)
+        data.update(scan.volatile_values())
+        return {'url': urljoin(base_url, scan.action), 'method': 'post', 'data': data}
+
+_caches: Dict[str, PayloadTemplateCache] = {}
+
+def get_template_cache(cache_dir: str) -> PayloadTemplateCache:
+    """One shared cache per directory, so the in-memory layer survives between bookings."""
+    if cache_dir not in _caches:
+        root_dir = Path(__file__).parent.parent
+        _caches[cache_dir] = PayloadTemplateCache(root_dir / cache_dir)
+    return _caches[cache_dir]
+
+if __name__ == "__main__":
+    from .config import load_config
+    from .bot import prepare_registration_submission
+
+    config = load_config()
+    page = Path(sys.argv[1] if len(sys.argv) > 1 else "data/3.html")
+    cache = get_template_cache(config.engine.payload_cache_dir)
+    if not prepare_registration_submission(page.read_text(encoding='utf-8'), config.user_info, "", cache):
+        logger.error(f"No form found in {page}")
@@ -0,0 +1,126 @@
+'''
+Speculative first-wins racing of the booking flow.
+Step 1 (and optionally the Buchen and registration submissions) is fired over
+several sessions at once; the first successful response is carried through the
+flow on its session and the other requests are cancelled. The final
+confirmation is never raced: a guard makes sure it is submitted at most once
+per job.
+'''
+
+
+import time
+import asyncio
+import logging
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable
+import httpx
+from .config import Config
+from .connections import step_timeout
+from .metrics import METRICS
+from .recorder import recorded
+from .bot import request_kwargs
+from .async_bot import fetch_url
+from .booking_flow import BookingFlow, ConfirmationGuard
+from .parse_pool import PARSE_POOL
+
+logger = logging.getLogger(__name__)
+
+# Steps that may be raced; the confirmation is always sent once on the winning session
+RACEABLE_STEPS = ('booking_page', 'buchen', 'registration')
+
+class RaceStats:
+    """Wins and winning latency per step and lane."""
+
+    def __init__(self):
+        self.wins: Dict[str, Dict[int, int]] = {}
+        self.latency: Dict[str, List[float]] = {}
+        self.lost: Dict[str, int] = {}
+
+    def record_win(self, step: str, lane: int, seconds: float) -> None:
+        lanes = self.wins.setdefault(step, {})
+        lanes[lane] = lanes.get(lane, 0) + 1
+        self.latency.setdefault(step, []).append(seconds)
+
+    def record_loss(self, step: str) -> None:
+        """Every lane failed."""
+        self.lost[step] = self.lost.get(step, 0) + 1
+
+    def summary(self) -> str:
+        parts = []
+        for step, lanes in self.wins.items():
+            wins = ", ".join(f"lane {lane}: {count}" for lane, count in sorted(lanes.items()))
+            fastest = min(self.latency[step]) * 1000
+            parts.append(f"{step} [{wins}; fastest {fastest:.0f}ms; all failed {self.lost.get(step, 0)}x]")
+        return "; ".join(parts) or "no races"
+
+class RacingBooker:
+    """Runs process_booking with racing over `clients`; clients[0] is the primary session."""
+
+    def __init__(self, clients: List[httpx.AsyncClient], config: Config, guard: Optional[ConfirmationGuard] = None):
+        self.clients = clients
+        self.config = config
+        self.steps = set(config.racing.steps) & set(RACEABLE_STEPS)
+        self.guard = guard or ConfirmationGuard()
+        self.stats = RaceStats()
+
+    async def race(self, step: str, send: Callable[[httpx.AsyncClient], Awaitable[Optional[httpx.Response]]],
+                   clients: List[httpx.AsyncClient]) -> Optional[Tuple[httpx.AsyncClient, httpx.Response]]:
+        """Send on every client at once; return the first successful (client, response)."""
+        start = time.perf_counter()
+        tasks = {asyncio.create_task(send(client)): lane for lane, client in enumerate(clients)}
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None or task.result() is None:
+                        continue
+                    lane = tasks[task]
+                    self.stats.record_win(step, lane, time.perf_counter() - start)
+                    logger.info(f"Lane {lane} won {step} after {(time.perf_counter() - start) * 1000:.0f}ms")
+                    return clients[lane], task.result()
+            self.stats.record_loss(step)
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def submit(self, step: str, client: httpx.AsyncClient, submission: Dict[str, Any]) -> Optional[Tuple[httpx.AsyncClient, httpx.Response]]:
+        """Send one form submission, raced over all sessions if the step is configured for it."""
+        async def send(lane_client: httpx.AsyncClient) -> Optional[httpx.Response]:
+            return await fetch_url(lane_client, submission['url'],
+                                   **request_kwargs(submission['method'], submission['data']),
+                                   timeout=step_timeout(step))
+
+        with METRICS.span(step):
+            if step not in self.steps or len(self.clients) < 2:
+                response = await send(client)
+                return (client, response) if response else None
+            # Later steps continue the winner's session on every lane
+            for other in self.clients:
+                if other is not client:
+                    other.cookies.update(client.cookies)
+            return await self.race(step, send, [client] + [c for c in self.clients if c is not client])
+
+    @recorded('booking', dump=True)
+    async def process_booking(self, config: Config, booking_info: Dict[str, Any]) -> bool:
+        """The booking flow of async_bot.process_booking, with racing."""
+        flow = BookingFlow(config, booking_info, self.guard)
+        client = self.clients[0]
+        while (request := flow.next_request()) is not None:
+            step, submission = request
+            delay = flow.retry_delay()
+            if delay:
+                await asyncio.sleep(delay)
+            # Later steps continue on the session that won the previous one
+            result = await self.submit(step, client, submission)
+            response = None
+            if result:
+                client, response = result
+            reading = await PARSE_POOL.booking_step(step, response, config) if response else None
+            flow.on_response(step, response, reading)
+        booked = flow.finish()
+        if booked:
+            # A booked job stays booked for this booker
+            self.guard.claim(flow.key)
+        return booked
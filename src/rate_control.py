@@ -0,0 +1,156 @@
+'''
+Adaptive poll rate.
+A token bucket paces the polls; its rate follows AIMD: it creeps up towards
+the rate the poll loop asks for while the server answers normally and is cut
+on 429/5xx. Retry-After blocks polling for the given time. Inside the
+scheduler's burst window the rate jumps back to just below the highest rate
+the server tolerated, so the last seconds before opening are not spent in
+backoff.
+'''
+
+
+import time
+import asyncio
+import logging
+from email.utils import parsedate_to_datetime
+from typing import Optional, Callable, Union
+import httpx
+from .config import RateControlConfig
+from .scheduler import BurstScheduler
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = (429, 500, 502, 503, 504)
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(date.timestamp() - (now if now is not None else time.time()), 0.0)
+
+class TokenBucket:
+    """Reserving token bucket: delay() takes one token and returns how long to wait for it."""
+
+    def __init__(self, rate: float, capacity: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        self._refill()
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def try_take(self) -> bool:
+        """Take a token only if one is available right now."""
+        self._refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def wait_time(self) -> float:
+        """Seconds until try_take() can succeed."""
+        self._refill()
+        return max(1 - self.tokens, 0.0) / self.rate
+
+class RateController:
+    """
+    AIMD-controlled token bucket for the poll loop.
+    `target_rate` returns the polls per second the loop would like right now.
+    """
+
+    def __init__(self, settings: RateControlConfig, target_rate: Callable[[], float],
+                 scheduler: Optional[BurstScheduler] = None, clock: Callable[[], float] = time.monotonic):
+        self.settings = settings
+        self.target_rate = target_rate
+        self.scheduler = scheduler
+        self.clock = clock
+        self.rate = min(settings.max_rate, target_rate())
+        self.bucket = TokenBucket(self.rate, settings.burst, clock)
+        self.tolerated_rate: Optional[float] = None # rate at the last throttle
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self.tightened = False
+
+    def _set_rate(self, rate: float) -> None:
+        self.rate = max(self.settings.min_rate, min(rate, self.settings.max_rate))
+        self.bucket.rate = self.rate
+
+    def on_success(self) -> None:
+        """Additive increase towards the requested rate."""
+        target = min(self.target_rate(), self.settings.max_rate)
+        if self.rate < target:
+            self._set_rate(min(target, self.rate + self.settings.increase))
+        elif self.rate > target:
+            self._set_rate(target)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """Multiplicative decrease; Retry-After also blocks all polls for its duration."""
+        self.throttled += 1
+        self.tolerated_rate = self.rate
+        self.tightened = False
+        self._set_rate(self.rate * self.settings.decrease)
+        if retry_after is not None:
+            retry_after = min(retry_after, self.settings.max_retry_after)
+            self.blocked_until = max(self.blocked_until, self.clock() + retry_after)
+        logger.warning(f"Throttled by server, poll rate now {self.rate:.2f}/s"
+                       + (f", pausing {retry_after:.1f}s" if retry_after else ""))
+
+    def observe(self, response: httpx.Response) -> None:
+        if response.status_code in THROTTLE_STATUSES:
+            self.on_throttle(parse_retry_after(response.headers.get('Retry-After')))
+        elif response.status_code < 400:
+            self.on_success()
+
+    def _tighten(self) -> None:
+        """Inside the burst window, go straight back to just below the tolerated rate."""
+        if self.tightened or not self.scheduler or not self.scheduler.in_burst():
+            return
+        self.tightened = True
+        target = min(self.target_rate(), self.settings.max_rate)
+        if self.tolerated_rate:
+            target = min(target, self.tolerated_rate * self.settings.safety)
+        if target > self.rate:
+            logger.info(f"Opening close, poll rate {self.rate:.2f}/s -> {target:.2f}/s")
+            self._set_rate(target)
+
+    def delay(self) -> float:
+        """Seconds to wait before the next poll."""
+        self._tighten()
+        blocked = max(self.blocked_until - self.clock(), 0.0)
+        return blocked + self.bucket.delay()
+
+    def wait(self) -> None:
+        time.sleep(self.delay())
+
+    async def wait_async(self) -> None:
+        await asyncio.sleep(self.delay())
+
+    def error_delay(self) -> float:
+        """Delay after a failed poll (connection error, unexpected exception)."""
+        self.on_throttle()
+        return self.delay()
+
+    def install(self, client: Union[httpx.Client, httpx.AsyncClient]) -> None:
+        """Feed every response of the client into the controller."""
+        if isinstance(client, httpx.AsyncClient):
+            async def async_on_response(response: httpx.Response) -> None:
+                self.observe(response)
+            client.event_hooks['response'].append(async_on_response)
+        else:
+            client.event_hooks['response'].append(self.observe)
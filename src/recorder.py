@@ -0,0 +1,149 @@
+'''
+In-memory flight recorder.
+Keeps the last responses (zlib-compressed body, status, timing, headers) and
+step events in bounded ring buffers and writes them to data/flight/ when a
+booking finishes, successful or not, so a failed booking can be debugged
+without re-running src/fetcher.py. Identical poll bodies share one
+compressed copy, so recording a quiet poll loop costs a bytes comparison.
+Also holds LogThrottle, which rate-limits INFO lines of the poll loop.
+'''
+
+
+import json
+import time
+import zlib
+import asyncio
+import logging
+import functools
+from collections import deque
+from pathlib import Path
+from typing import Optional, Dict, Any, Callable, Deque
+import httpx
+from .config import RecorderConfig
+
+logger = logging.getLogger(__name__)
+
+class LogThrottle:
+    """Lets one message per key through every `interval` seconds and counts the others."""
+
+    def __init__(self, interval: float = 30.0):
+        self.interval = interval
+        self.last: Dict[str, float] = {}
+        self.suppressed: Dict[str, int] = {}
+
+    def allow(self, key: str) -> Optional[int]:
+        """Number of suppressed messages since the last one if this one may be logged, else None."""
+        now = time.monotonic()
+        if now - self.last.get(key, float('-inf')) < self.interval:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            return None
+        self.last[key] = now
+        return self.suppressed.pop(key, 0)
+
+class FlightRecorder:
+    """Ring buffers of recent responses and events, dumped to disk on demand."""
+
+    def __init__(self, settings: Optional[RecorderConfig] = None):
+        self.configure(settings or RecorderConfig())
+
+    def configure(self, settings: RecorderConfig) -> None:
+        self.settings = settings
+        self.enabled = settings.enabled
+        self.responses: Deque[Dict[str, Any]] = deque(maxlen=settings.responses)
+        self.events: Deque[tuple] = deque(maxlen=settings.events)
+        self._last_body: Optional[bytes] = None
+        self._last_blob = b""
+        self.dumps = 0
+        HOT_LOG.interval = settings.log_interval
+
+    def event(self, kind: str, **fields: Any) -> None:
+        if self.enabled:
+            self.events.append((time.time(), kind, fields))
+
+    def record_response(self, response: httpx.Response) -> None:
+        """Keep a read response; the body is compressed only when it differs from the previous one."""
+        if not self.enabled:
+            return
+        body = response.content
+        if body != self._last_body:
+            self._last_body = body
+            self._last_blob = zlib.compress(body, 1)
+        try:
+            elapsed = response.elapsed.total_seconds()
+        except RuntimeError:
+            elapsed = None
+        self.responses.append({
+            't': time.time(),
+            'method': response.request.method,
+            'url': str(response.url),
+            'status': response.status_code,
+            'elapsed': elapsed,
+            'headers': response.headers.multi_items(),
+            'size': len(body),
+            'body': self._last_blob,
+        })
+
+    def dump(self, reason: str) -> Optional[Path]:
+        """Write events, response index and response bodies to a new directory under dumpDir."""
+        if not self.enabled:
+            return None
+        root = Path(__file__).parent.parent / self.settings.dump_dir
+        self.dumps += 1
+        target = root / f"{time.strftime('%Y%m%d-%H%M%S')}-{self.dumps:03d}-{reason}"
+        target.mkdir(parents=True, exist_ok=True)
+
+        with open(target / "events.jsonl", "w", encoding="utf-8") as f:
+            for t, kind, fields in self.events:
+                f.write(json.dumps({'t': t, 'event': kind, **fields}, default=str) + "\n")
+        index = []
+        for number, entry in enumerate(self.responses):
+            name = f"{number:03d}-{entry['method']}-{entry['status']}.html"
+            (target / name).write_bytes(zlib.decompress(entry['body']))
+            index.append({key: value for key, value in entry.items() if key != 'body'} | {'file': name})
+        (target / "responses.json").write_text(json.dumps(index, indent=1), encoding="utf-8")
+        logger.info(f"Flight recorder: {len(index)} responses, {len(self.events)} events written to {target}")
+        return target
+
+# Poll-loop INFO lines go through this throttle
+HOT_LOG = LogThrottle()
+
+RECORDER = FlightRecorder()
+
+def recorded(step: str, dump: bool = False) -> Callable:
+    """Record start and end of a step; with dump=True write the recorder out when it finishes."""
+    def finish(result: Any) -> None:
+        RECORDER.event(step, phase='end', ok=bool(result))
+        if dump:
+            RECORDER.dump(f"{step}-{'success' if result else 'failure'}")
+
+    def fail(error: Exception) -> None:
+        RECORDER.event(step, phase='error', error=repr(error))
+        if dump:
+            RECORDER.dump(f"{step}-error")
+
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                RECORDER.event(step, phase='start')
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    fail(e)
+                    raise
+                finish(result)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            RECORDER.event(step, phase='start')
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                fail(e)
+                raise
+            finish(result)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,251 @@
+'''
+Streaming early-exit scanner for the offer page.
+Scans raw response bytes for the bs_sknr cell of the target Kursnr and the
+bs_sbuch cell after it, and stops reading as soon as the booking cell is known.
+BeautifulSoup (bot.parse_booking_info) stays the fallback. With a
+ChangeDetector the scanned state is published to its subscribers (history)
+like a soup extraction; the detector does not skip any polls here.
+With [capture] enabled the whole page is read before the scan, a replay needs
+it; the early exit then saves no transfer time. The [recorder] only keeps the
+bytes the scanner read.
+'''
+
+
+import re
+import html
+import logging
+from urllib.parse import urljoin
+from typing import Optional, Dict, Any
+import httpx
+from .config import Config
+from .bot import BUTTON_TEXTS, parse_booking_info
+from .change_detector import ChangeDetector
+from .connections import step_timeout
+from .html_scan import parse_attrs
+from .metrics import METRICS, timed
+from .capture import CAPTURE
+from .recorder import RECORDER
+
+logger = logging.getLogger(__name__)
+
+# The offer page declares iso-8859-1 (see data/1.html)
+DEFAULT_CHARSET = 'iso-8859-1'
+
+# Bytes kept from the previous scan so constructs split across chunks are seen whole
+OVERLAP = 512
+
+TAG_RE = re.compile(rb"<form\b[^>]*>|</form\s*>|<input\b[^>]*>", re.IGNORECASE)
+SBUCH_RE = re.compile(rb"""<td\s+class=["']bs_sbuch["'][^>]*>(.*?)</td\s*>""", re.IGNORECASE | re.DOTALL)
+ROW_END_RE = re.compile(rb"</tr\s*>", re.IGNORECASE)
+LINK_RE = re.compile(rb"<a\b[^>]*\bhref\s*=[^>]*>", re.IGNORECASE)
+SPAN_TEXT_RE = re.compile(rb"<[^>]*>")
+
+class CourseScanner:
+    """
+    Incremental scanner fed with response chunks.
+    feed() returns True once the booking cell of the target row has been read.
+    """
+
+    def __init__(self, kursnr: str, charset: str = DEFAULT_CHARSET):
+        self.kursnr = kursnr
+        self.charset = charset
+        self.buffer = bytearray()
+        self.form_attrs: Optional[Dict[str, str]] = None
+        self.hidden_inputs: Dict[str, str] = {}
+        self.row_end: Optional[int] = None
+        self.cell: Optional[bytes] = None
+        self._scan_from = 0
+        self._last_tag = -1
+        self._sknr_re = re.compile(
+            rb"""<td\s+class=["']bs_sknr["'][^>]*>\s*""" + re.escape(kursnr.encode('ascii')) + rb"""\s*</td\s*>""",
+            re.IGNORECASE
+        )
+
+    @property
+    def done(self) -> bool:
+        return self.cell is not None
+
+    def feed(self, chunk: bytes) -> bool:
+        """Add a chunk and continue scanning. Returns True when the booking cell is known."""
+        if self.done:
+            return True
+        self.buffer += chunk
+        if self.row_end is None:
+            self._scan_for_row()
+        if self.row_end is not None:
+            self._scan_for_cell()
+        return self.done
+
+    def _scan_for_row(self) -> None:
+        buffer = self.buffer
+        row = self._sknr_re.search(buffer, self._scan_from)
+        limit = row.start() if row else len(buffer)
+
+        # Track the enclosing form and its hidden inputs up to the row
+        for match in TAG_RE.finditer(buffer, self._scan_from, limit):
+            if match.start() <= self._last_tag:
+                continue
+            self._last_tag = match.start()
+            tag = match.group(0)
+            lowered = tag[:6].lower()
+            if lowered.startswith(b'</form'):
+                self.form_attrs = None
+                self.hidden_inputs = {}
+            elif lowered.startswith(b'<form'):
+                self.form_attrs = parse_attrs(tag, self.charset)
+                self.hidden_inputs = {}
+            elif self.form_attrs is not None:
+                attrs = parse_attrs(tag, self.charset)
+                if attrs.get('type', '').lower() == 'hidden' and attrs.get('name'):
+                    self.hidden_inputs[attrs['name']] = attrs.get('value', '')
+
+        if row:
+            self.row_end = row.end()
+        else:
+            self._scan_from = max(len(buffer) - OVERLAP, 0)
+
+    def _scan_for_cell(self) -> None:
+        cell = SBUCH_RE.search(self.buffer, self.row_end)
+        if not cell:
+            return
+        row_close = ROW_END_RE.search(self.buffer, self.row_end, cell.start())
+        if row_close:
+            # The row ended without a booking cell
+            self.cell = b''
+            return
+        self.cell = bytes(cell.group(1))
+
+    def state(self) -> Optional[str]:
+        """Button value or visible text of the booking cell, like extract_button_content."""
+        if self.cell is None:
+            return None
+        for tag in TAG_RE.finditer(self.cell):
+            attrs = parse_attrs(tag.group(0), self.charset)
+            if attrs.get('type', '').lower() == 'submit':
+                return attrs.get('value')
+        text = html.unescape(SPAN_TEXT_RE.sub(b' ', self.cell).decode(self.charset, 'replace'))
+        return " ".join(text.split())
+
+    def booking_info(self, base_url: str) -> Optional[Dict[str, Any]]:
+        """
+        Build the booking-info dict extract_booking_info_from_row returns.
+        Form inputs are the form's hidden fields plus the clicked button.
+        """
+        if not self.cell:
+            logger.error("Found row but no booking cell (.bs_sbuch)")
+            return None
+
+        for tag in TAG_RE.finditer(self.cell):
+            attrs = parse_attrs(tag.group(0), self.charset)
+            if BUTTON_TEXTS['book_button_class'] in attrs.get('class', '').split() and self.form_attrs is not None:
+                action = self.form_attrs.get('action', '')
+                method = self.form_attrs.get('method', 'get').lower()
+                booking_url = urljoin(base_url, action) if not action.startswith('http') else action
+                inputs = dict(self.hidden_inputs)
+                if attrs.get('name'):
+                    inputs[attrs['name']] = attrs.get('value')
+                logger.info(f"Found booking form. Action: {booking_url}")
+                return {'type': 'form', 'url': booking_url, 'method': method, 'inputs': inputs}
+
+        link = LINK_RE.search(self.cell)
+        if link:
+            full_url = urljoin(base_url, parse_attrs(link.group(0), self.charset)['href'])
+            logger.info(f"Found booking link: {full_url}")
+            return {'type': 'link', 'url': full_url}
+
+        logger.warning("Row found but no recognized booking button or link")
+        return None
+
+def record(response: httpx.Response) -> None:
+    RECORDER.record_response(response)
+    CAPTURE.record(response)
+
+def record_scanned(response: httpx.Response, scanner: CourseScanner) -> None:
+    """Keep the part of a streamed page the scanner read; captured pages are recorded in full."""
+    if RECORDER.enabled and not CAPTURE.enabled:
+        RECORDER.record_response(httpx.Response(response.status_code, headers=response.headers,
+                                                content=bytes(scanner.buffer), request=response.request))
+
+def record_error(url: str, error: httpx.RequestError) -> None:
+    RECORDER.event('request_error', url=url, error=repr(error))
+    CAPTURE.record_error(error)
+
+def report(scanner: CourseScanner, base_url: str, detector: Optional[ChangeDetector]) -> Optional[Dict[str, Any]]:
+    booking_info = scanner.booking_info(base_url)
+    return detector.update(scanner.state(), booking_info) if detector else booking_info
+
+def fall_back(scanner: CourseScanner, base_url: str, detector: Optional[ChangeDetector]) -> Optional[Dict[str, Any]]:
+    logger.warning(f"Streaming scan did not find Kursnr {scanner.kursnr}, falling back to BeautifulSoup")
+    html_content = bytes(scanner.buffer).decode(scanner.charset, 'replace')
+    if detector:
+        return detector.extract(html_content, base_url)
+    return parse_booking_info(html_content, base_url, scanner.kursnr)
+
+@timed('find_course')
+def find_course_streaming(client: httpx.Client, config: Config, kursnr: str,
+                          detector: Optional[ChangeDetector] = None) -> Optional[Dict[str, Any]]:
+    """
+    Like bot.find_course, but stops reading the page once the target row is scanned.
+    State changes are published through `detector` if given.
+    """
+    scanner = CourseScanner(kursnr)
+    METRICS.record_poll()
+    try:
+        with client.stream('GET', config.target_url, timeout=step_timeout('poll'),
+                           extensions={'trace': METRICS.trace()}) as response:
+            if CAPTURE.enabled:
+                response.read()
+                record(response)
+            try:
+                response.raise_for_status()
+                base_url = str(response.url)
+                scanner.charset = response.charset_encoding or scanner.charset
+                for chunk in response.iter_bytes():
+                    if scanner.feed(chunk):
+                        return report(scanner, base_url, detector)
+            finally:
+                record_scanned(response, scanner)
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Request for {config.target_url} returned HTTP {e.response.status_code}")
+        METRICS.record_poll_error()
+        return None
+    except httpx.RequestError as e:
+        record_error(config.target_url, e)
+        logger.error(f"Request failed for {config.target_url}: {e}")
+        METRICS.record_poll_error()
+        return None
+
+    return fall_back(scanner, base_url, detector)
+
+@timed('find_course')
+async def find_course_streaming_async(client: httpx.AsyncClient, config: Config, kursnr: str,
+                                     detector: Optional[ChangeDetector] = None) -> Optional[Dict[str, Any]]:
+    """Async version of find_course_streaming."""
+    scanner = CourseScanner(kursnr)
+    METRICS.record_poll()
+    try:
+        async with client.stream('GET', config.target_url, timeout=step_timeout('poll'),
+                                 extensions={'trace': METRICS.async_trace()}) as response:
+            if CAPTURE.enabled:
+                await response.aread()
+                record(response)
+            try:
+                response.raise_for_status()
+                base_url = str(response.url)
+                scanner.charset = response.charset_encoding or scanner.charset
+                async for chunk in response.aiter_bytes():
+                    if scanner.feed(chunk):
+                        return report(scanner, base_url, detector)
+            finally:
+                record_scanned(response, scanner)
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Request for {config.target_url} returned HTTP {e.response.status_code}")
+        METRICS.record_poll_error()
+        return None
+    except httpx.RequestError as e:
+        record_error(config.target_url, e)
+        logger.error(f"Request failed for {config.target_url}: {e}")
+        METRICS.record_poll_error()
+        return None
+
+    return fall_back(scanner, base_url, detector)
@@ -0,0 +1,175 @@
+'''
+Server-clock-synchronized burst scheduler.
+Turns the booking cell text ("ab 03.12., 19:30") into an opening time, estimates
+the offset to the server clock from HTTP Date headers and paces polling:
+slow while the opening is far away, a tight concurrent burst around it.
+'''
+
+
+import re
+import time
+import logging
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from zoneinfo import ZoneInfo
+from typing import Optional, Tuple, Union
+import httpx
+from .config import SchedulerConfig
+
+logger = logging.getLogger(__name__)
+
+# Opening times on the offer page are local time in Aachen
+SERVER_TZ = ZoneInfo("Europe/Berlin")
+
+OPENING_RE = re.compile(r"ab\s+(\d{1,2})\.(\d{1,2})\.(\d{2,4})?,?\s*(\d{1,2})[:.](\d{2})")
+
+def parse_opening_time(text: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Parse "ab 03.12., 19:30" into an aware datetime.
+    The page omits the year, so the year closest to `now` is used.
+    """
+    match = OPENING_RE.search(text or '')
+    if not match:
+        return None
+
+    day, month, year, hour, minute = match.groups()
+    now = (now or datetime.now(SERVER_TZ)).astimezone(SERVER_TZ)
+    if year:
+        years = [int(year) + 2000 if len(year) == 2 else int(year)]
+    else:
+        years = [now.year - 1, now.year, now.year + 1]
+
+    candidates = []
+    for y in years:
+        try:
+            candidates.append(datetime(y, int(month), int(day), int(hour), int(minute), tzinfo=SERVER_TZ))
+        except ValueError:
+            continue
+    if not candidates:
+        return None
+    return min(candidates, key=lambda candidate: abs(candidate - now))
+
+class ClockSync:
+    """
+    Estimate server clock minus local clock.
+    A Date header D seen on a request sent at t0 and answered at t1 means the
+    server clock was in [D, D + 1) at some point in [t0, t1], so the offset lies in
+    [D - t1, D + 1 - t0]. Intersecting these intervals narrows the estimate.
+    """
+
+    def __init__(self):
+        self.low: Optional[float] = None
+        self.high: Optional[float] = None
+        self.samples = 0
+
+    def observe(self, sent_at: float, received_at: float, date_header: Optional[str]) -> None:
+        """Add one sample; times are local time.time() values."""
+        if not date_header:
+            return
+        try:
+            server_time = parsedate_to_datetime(date_header).timestamp()
+        except (TypeError, ValueError):
+            return
+
+        low, high = server_time - received_at, server_time + 1.0 - sent_at
+        self.samples += 1
+        if self.low is None or low > self.high or high < self.low:
+            # First sample, or the clocks drifted apart: start over
+            self.low, self.high = low, high
+        else:
+            self.low, self.high = max(self.low, low), min(self.high, high)
+
+    @property
+    def offset(self) -> float:
+        if self.low is None:
+            return 0.0
+        return (self.low + self.high) / 2
+
+    @property
+    def uncertainty(self) -> float:
+        if self.low is None:
+            return float('inf')
+        return (self.high - self.low) / 2
+
+    def server_time(self) -> float:
+        """Current server time as a Unix timestamp."""
+        return time.time() + self.offset
+
+    def install(self, client: Union[httpx.Client, httpx.AsyncClient]) -> None:
+        """Feed every response of the client into the estimate."""
+        def on_request(request: httpx.Request) -> None:
+            request.extensions['sent_at'] = time.time()
+
+        def on_response(response: httpx.Response) -> None:
+            sent_at = response.request.extensions.get('sent_at')
+            if sent_at is not None:
+                self.observe(sent_at, time.time(), response.headers.get('date'))
+
+        if isinstance(client, httpx.AsyncClient):
+            async def async_on_request(request: httpx.Request) -> None:
+                on_request(request)
+
+            async def async_on_response(response: httpx.Response) -> None:
+                on_response(response)
+
+            client.event_hooks['request'].append(async_on_request)
+            client.event_hooks['response'].append(async_on_response)
+        else:
+            client.event_hooks['request'].append(on_request)
+            client.event_hooks['response'].append(on_response)
+
+class BurstScheduler:
+    """Pick poll interval and concurrency from the time left until opening."""
+
+    def __init__(self, settings: SchedulerConfig, clock: ClockSync, opening: Optional[datetime] = None):
+        self.settings = settings
+        self.clock = clock
+        self.opening = opening
+
+    def set_opening_from_state(self, state: Optional[str]) -> None:
+        """Update the opening time from the booking cell text."""
+        now = datetime.fromtimestamp(self.clock.server_time(), SERVER_TZ)
+        opening = parse_opening_time(state or '', now)
+        if opening and opening != self.opening:
+            logger.info(f"Opening time {opening:%d.%m. %H:%M}, server clock offset {self.clock.offset:+.3f}s")
+            self.opening = opening
+
+    def seconds_until_opening(self) -> Optional[float]:
+        if not self.opening:
+            return None
+        return self.opening.timestamp() - self.clock.server_time()
+
+    def opening_lag(self) -> Optional[float]:
+        """Seconds since the opening time (server clock), None without one."""
+        remaining = self.seconds_until_opening()
+        return -remaining if remaining is not None else None
+
+    def in_burst(self) -> bool:
+        remaining = self.seconds_until_opening()
+        if remaining is None:
+            return False
+        # Widen the window by the clock uncertainty, capped so a single sample still helps
+        slack = min(self.clock.uncertainty, 1.0)
+        return -self.settings.burst_after <= remaining <= self.settings.burst_before + slack
+
+    def pacing(self) -> Optional[Tuple[float, int]]:
+        """
+        Return (interval, concurrency) for the next poll.
+        None if no opening time is known; the caller keeps its own pacing then.
+        """
+        if self.opening is None:
+            return None
+        if self.in_burst():
+            return self.settings.burst_interval, self.settings.burst_concurrency
+
+        remaining = self.seconds_until_opening()
+        if remaining > 0:
+            # Never sleep past the start of the burst window
+            wake_in = remaining - self.settings.burst_before - min(self.clock.uncertainty, 1.0)
+            return max(min(self.settings.slow_interval, wake_in), self.settings.burst_interval), 1
+        return self.settings.slow_interval, 1
+
+    def burst_start(self) -> Optional[datetime]:
+        if not self.opening:
+            return None
+        return self.opening - timedelta(seconds=self.settings.burst_before)
@@ -0,0 +1,173 @@
+'''
+Persistent session store shared across runs.
+Cookies, permanent redirects and the User-Agent they were issued to are saved
+atomically to data/session.json and restored into the next run's clients, so
+the first request of a run needs no warm-up round trips. Shortly before the
+opening the restored session is checked once against the offer page.
+'''
+
+
+import os
+import json
+import time
+import asyncio
+import logging
+import tempfile
+from http.cookiejar import Cookie
+from pathlib import Path
+from typing import Optional, Dict, Any, Union
+import httpx
+from .config import SessionConfig
+from .scheduler import BurstScheduler
+
+logger = logging.getLogger(__name__)
+
+# Only redirects the server declares permanent are replayed from the store
+PERMANENT_REDIRECTS = (301, 308)
+
+def cookie_to_dict(cookie: Cookie) -> Dict[str, Any]:
+    return {
+        'name': cookie.name,
+        'value': cookie.value,
+        'domain': cookie.domain,
+        'path': cookie.path,
+        'expires': cookie.expires,
+        'secure': cookie.secure,
+    }
+
+def cookie_from_dict(data: Dict[str, Any]) -> Cookie:
+    domain = data['domain']
+    return Cookie(
+        version=0, name=data['name'], value=data['value'],
+        port=None, port_specified=False,
+        domain=domain, domain_specified=bool(domain), domain_initial_dot=domain.startswith('.'),
+        path=data['path'], path_specified=True,
+        secure=data['secure'], expires=data['expires'], discard=data['expires'] is None,
+        comment=None, comment_url=None, rest={},
+    )
+
+class SessionStore:
+    """Cookie jar and redirect map of one client, persisted between runs."""
+
+    def __init__(self, settings: SessionConfig):
+        self.settings = settings
+        self.path = Path(__file__).parent.parent / settings.path
+        self.redirects: Dict[str, str] = {}
+        self.validated_at: Optional[float] = None
+
+    def load(self, user_agent: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The stored session, or None if missing, unreadable, expired or issued to another User-Agent."""
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        age = time.time() - data.get('saved_at', 0)
+        if age > self.settings.max_age:
+            logger.info(f"Stored session is {age / 60:.0f} min old, starting a new one")
+            return None
+        if user_agent is not None and data.get('user_agent') != user_agent:
+            logger.info("Stored session belongs to another User-Agent, starting a new one")
+            return None
+        return data
+
+    def restore(self, client: Union[httpx.Client, httpx.AsyncClient]) -> int:
+        """Put the stored cookies and redirects into the client. Returns the number of cookies."""
+        data = self.load(client.headers.get('user-agent'))
+        if not data:
+            return 0
+        now = time.time()
+        restored = 0
+        for item in data.get('cookies', []):
+            if item.get('expires') is not None and item['expires'] <= now:
+                continue
+            client.cookies.jar.set_cookie(cookie_from_dict(item))
+            restored += 1
+        self.redirects = dict(data.get('redirects', {}))
+        logger.info(f"Restored session: {restored} cookies, {len(self.redirects)} redirects")
+        return restored
+
+    def save(self, client: Union[httpx.Client, httpx.AsyncClient]) -> None:
+        """Write cookies and redirects atomically (temp file + rename), readable by the owner only."""
+        data = {
+            'saved_at': time.time(),
+            'user_agent': client.headers.get('user-agent'),
+            'cookies': [cookie_to_dict(cookie) for cookie in client.cookies.jar],
+            'redirects': self.redirects,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.chmod(tmp, 0o600)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def resolve(self, url: str) -> str:
+        """Final URL of a stored permanent redirect chain starting at `url`."""
+        seen = set()
+        while url in self.redirects and url not in seen:
+            seen.add(url)
+            url = self.redirects[url]
+        return url
+
+    def record_redirect(self, response: httpx.Response) -> None:
+        if response.status_code in PERMANENT_REDIRECTS and 'location' in response.headers:
+            source = str(response.request.url)
+            self.redirects[source] = str(response.request.url.join(response.headers['location']))
+
+    def install(self, client: Union[httpx.Client, httpx.AsyncClient]) -> None:
+        """Learn permanent redirects from every response of the client."""
+        if isinstance(client, httpx.AsyncClient):
+            async def async_on_response(response: httpx.Response) -> None:
+                self.record_redirect(response)
+
+            client.event_hooks['response'].append(async_on_response)
+        else:
+            client.event_hooks['response'].append(self.record_redirect)
+
+    def due_for_validation(self, scheduler: Optional[BurstScheduler]) -> bool:
+        """True once per run, within validateBefore seconds of the opening."""
+        if self.validated_at is not None or scheduler is None:
+            return False
+        remaining = scheduler.seconds_until_opening()
+        return remaining is not None and 0 < remaining <= self.settings.validate_before
+
+    def _check(self, client: Union[httpx.Client, httpx.AsyncClient], response: Optional[httpx.Response]) -> bool:
+        self.validated_at = time.time()
+        if response is not None and response.status_code == 200:
+            self.save(client)
+            logger.info("Session pre-validated before opening")
+            return True
+        # A rejected session is worse than none: drop it and let the site set a new one
+        logger.warning("Stored session was rejected, starting a new one")
+        client.cookies.clear()
+        self.redirects.clear()
+        return False
+
+    def validate(self, client: httpx.Client, url: str) -> bool:
+        try:
+            response = client.get(self.resolve(url))
+        except httpx.RequestError as e:
+            logger.warning(f"Session validation failed: {e}")
+            response = None
+        return self._check(client, response)
+
+    async def validate_async(self, client: httpx.AsyncClient, url: str) -> bool:
+        try:
+            response = await client.get(self.resolve(url))
+        except httpx.RequestError as e:
+            logger.warning(f"Session validation failed: {e}")
+            response = None
+        return self._check(client, response)
+
+    async def validate_before_opening(self, client: httpx.AsyncClient, url: str,
+                                      scheduler: Optional[BurstScheduler]) -> None:
+        """Sleep until validateBefore seconds before the opening, then validate once."""
+        remaining = scheduler.seconds_until_opening() if scheduler else None
+        if remaining is None or remaining <= 0:
+            return
+        await asyncio.sleep(max(remaining - self.settings.validate_before, 0))
+        await self.validate_async(client, url)
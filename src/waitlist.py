@@ -0,0 +1,86 @@
+'''
+Waitlist monitor: long-running watch of full courses ("Warteliste").
+A freed slot turns the row's button from Warteliste back to buchen at an
+unannounced time, so there is no opening to burst around. Every page is polled
+at a low baseline interval with random jitter, all pages together stay within
+one global request budget, and unchanged pages cost no parse. As soon as a
+watched row becomes bookable the booking flow starts on the same tick.
+Courses that still show "ab ..." keep the burst around their opening.
+
+Run with:
+    uv run python -m src.waitlist
+'''
+
+
+import random
+import asyncio
+import logging
+from typing import Optional, Dict, List
+from .config import Config, OfferConfig, load_config
+from .rate_control import TokenBucket
+from .recorder import RECORDER
+from .capture import CAPTURE
+from .parse_pool import PARSE_POOL
+from .watcher import OfferWatcher, OfferPage
+
+logger = logging.getLogger(__name__)
+
+class WaitlistMonitor(OfferWatcher):
+    """OfferWatcher with a jittered baseline interval and a global request budget."""
+
+    def __init__(self, config: Config, offers: Optional[List[OfferConfig]] = None,
+                 rng: Optional[random.Random] = None):
+        super().__init__(config, offers if offers is not None else config.waitlist.offers)
+        self.settings = config.waitlist
+        self.budget = TokenBucket(self.settings.budget)
+        self.random = rng or random.Random()
+
+    def admit(self, page: OfferPage) -> bool:
+        # Peek first: a host refusing the poll must not spend the global budget
+        if self.budget.wait_time() > 0:
+            return False
+        return super().admit(page) and self.budget.try_take()
+
+    def baseline(self) -> float:
+        """The configured interval, stretched so that every watched page fits into the budget."""
+        active = sum(not page.done for page in self.pages)
+        return max(self.settings.interval, active / self.settings.budget)
+
+    def interval(self, page: OfferPage) -> float:
+        scheduler = page.scheduler
+        remaining = scheduler.seconds_until_opening()
+        if scheduler.in_burst() or (remaining is not None and remaining > 0):
+            return super().interval(page)
+        # Jitter keeps the polls of many pages from lining up
+        jitter = self.settings.jitter
+        return self.baseline() * self.random.uniform(1 - jitter, 1 + jitter)
+
+    def wait_time(self) -> float:
+        return min(max(super().wait_time(), self.budget.wait_time()), 1.0)
+
+    async def run(self) -> Dict[str, bool]:
+        courses = sum(len(page.kursnrs) for page in self.pages)
+        logger.info(f"Waitlist monitor: {courses} courses on {len(self.pages)} pages, "
+                    f"polled every {self.baseline():.1f}s +-{self.settings.jitter:.0%} "
+                    f"within {self.settings.budget} requests/s")
+        return await super().run()
+
+async def run(config: Config) -> Dict[str, bool]:
+    """Monitor and book all [[waitlist.offers]]."""
+    return await WaitlistMonitor(config).run()
+
+def main():
+    config = load_config()
+    RECORDER.configure(config.recorder)
+    CAPTURE.configure(config.capture)
+    PARSE_POOL.configure(config.parsing)
+    if not config.waitlist.offers:
+        logger.error("No [[waitlist.offers]] configured")
+        return
+    try:
+        asyncio.run(run(config))
+    except KeyboardInterrupt:
+        logger.info("Waitlist monitor stopped by user.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+'''
+Multi-offer watcher: many HSZ offer pages from one process.
+Offer pages on the same host share one pooled client, one server clock
+estimate and one poll budget. A priority scheduler hands that budget to the
+pages whose opening time is nearest; pages far from their opening (or without
+one) are polled every idleInterval. Unchanged pages (304 or identical course
+tables) cost no parse, so CPU follows changes instead of the number of pages.
+'''
+
+
+import re
+import time
+import asyncio
+import hashlib
+import logging
+from dataclasses import replace
+from datetime import datetime
+from urllib.parse import urlsplit, unquote
+from typing import Optional, Dict, List, Set
+import httpx
+from .config import Config, OfferConfig, SchedulerConfig
+from .conditional import ConditionalPoller
+from .change_detector import table_region
+from .connections import ConnectionManager, origin, step_timeout
+from .async_bot import fetch_url, process_booking
+from .parse_pool import PARSE_POOL
+from .booking_flow import CONFIRMATIONS, job_key
+from .scheduler import ClockSync, BurstScheduler, parse_opening_time, SERVER_TZ
+from .rate_control import TokenBucket
+from .metrics import METRICS
+from .history import OpeningHistory, OpeningPredictor
+
+logger = logging.getLogger(__name__)
+
+HEAD_RE = re.compile(r"""<div[^>]*class=["']bs_head["'][^>]*>(.*?)</div>""", re.IGNORECASE | re.DOTALL)
+TAG_RE = re.compile(r"<[^>]+>")
+
+def title_from_url(url: str) -> str:
+    """'.../_Basketball_Spielbetrieb.html' -> 'Basketball Spielbetrieb'."""
+    name = unquote(urlsplit(url).path.rsplit('/', 1)[-1], encoding='iso-8859-1')
+    return name.removesuffix('.html').strip('_').replace('_', ' ')
+
+def page_title(html_content: str) -> Optional[str]:
+    """Text of the bs_head heading, without parsing the page."""
+    match = HEAD_RE.search(html_content)
+    return TAG_RE.sub('', match.group(1)).strip() if match else None
+
+class HostPool:
+    """Client, server clock and poll budget shared by all offer pages of one host."""
+
+    def __init__(self, config: Config, url: str):
+        self.manager = ConnectionManager(replace(config, target_url=url))
+        self.client = self.manager.create_async_client()
+        self.clock = ClockSync()
+        self.clock.install(self.client)
+        self.bucket = TokenBucket(config.watcher.host_rate)
+        self.concurrency = config.watcher.concurrency
+        self.in_flight = 0
+
+class OfferPage:
+    """One watched offer page and the Kursnrs to book on it."""
+
+    def __init__(self, settings: OfferConfig, host: HostPool, scheduler_settings: SchedulerConfig):
+        self.url = settings.url
+        self.title = settings.title or title_from_url(settings.url)
+        self.kursnrs = list(settings.kursnrs)
+        self.host = host
+        self.poller = ConditionalPoller()
+        self.scheduler = BurstScheduler(scheduler_settings, host.clock)
+        self.region_hash: Optional[bytes] = None
+        self.verified: Optional[bool] = None # None until the first page was seen
+        self.states: Dict[str, Optional[str]] = {}
+        self.booked: Set[str] = set()
+        self.in_flight: Dict[str, asyncio.Task] = {}
+        self.spare: Optional[httpx.AsyncClient] = None # warm booking session for the burst
+        self.predicted = False # burst window sized from the opening history
+        self.polling = False
+        self.due = 0.0 # time.monotonic() of the next poll
+        self.polls = 0
+        self.parses = 0
+
+    @property
+    def done(self) -> bool:
+        return self.verified is False or all(k in self.booked for k in self.kursnrs)
+
+    def priority(self) -> tuple:
+        """
+        Sort key of due pages: burst windows first, then the longest overdue,
+        then the nearest opening. Near openings also come due more often
+        (see interval), so they get most of the budget without starving the rest.
+        """
+        remaining = self.scheduler.seconds_until_opening()
+        return (not self.scheduler.in_burst(), self.due, abs(remaining) if remaining is not None else float('inf'))
+
+    def interval(self, idle_interval: float) -> float:
+        """Burst interval around the opening, idle_interval otherwise, never sleeping into the burst."""
+        scheduler = self.scheduler
+        remaining = scheduler.seconds_until_opening()
+        if remaining is None:
+            return idle_interval
+        if scheduler.in_burst():
+            return scheduler.settings.burst_interval
+        if remaining > 0:
+            wake_in = remaining - scheduler.settings.burst_before - min(scheduler.clock.uncertainty, 1.0)
+            return max(min(idle_interval, wake_in), scheduler.settings.burst_interval)
+        return idle_interval
+
+    def update_opening(self) -> None:
+        """Earliest opening time among the Kursnrs still to book."""
+        now = datetime.fromtimestamp(self.host.clock.server_time(), SERVER_TZ)
+        openings = [parse_opening_time(state, now) for kursnr, state in self.states.items()
+                    if state and kursnr not in self.booked]
+        openings = [opening for opening in openings if opening]
+        if openings and min(openings) != self.scheduler.opening:
+            self.scheduler.opening = min(openings)
+            logger.info(f"{self.title}: opening at {self.scheduler.opening:%d.%m. %H:%M}")
+
+    def forget(self) -> None:
+        """Drop validators and hashes so the next poll is parsed again."""
+        self.region_hash = None
+        self.poller.etag = self.poller.last_modified = None
+        self.poller.content_hash = None
+
+class OfferWatcher:
+    """Polls every configured offer page by priority and books their Kursnrs."""
+
+    def __init__(self, config: Config, offers: Optional[List[OfferConfig]] = None):
+        self.config = config
+        self.hosts: Dict[str, HostPool] = {}
+        self.pages: List[OfferPage] = []
+        for settings in offers if offers is not None else config.offers:
+            host = origin(settings.url)
+            if host not in self.hosts:
+                self.hosts[host] = HostPool(config, settings.url)
+            self.pages.append(OfferPage(settings, self.hosts[host], config.scheduler))
+        self.history = OpeningHistory(config.history) if config.history.enabled else None
+        self.results: Dict[str, bool] = {}
+        self.tasks: Set[asyncio.Task] = set()
+        self.wake = asyncio.Event()
+
+    def job_config(self, page: OfferPage, kursnr: str) -> Config:
+        return replace(self.config, target_url=page.url, user_info=replace(self.config.user_info, kursnr=kursnr))
+
+    def next_pages(self, now: float) -> List[OfferPage]:
+        """Pages due for a poll, most urgent first."""
+        due = [page for page in self.pages if not page.done and not page.polling and page.due <= now]
+        return sorted(due, key=OfferPage.priority)
+
+    def tick(self) -> None:
+        """Start polls for due pages while their host has budget left."""
+        for page in self.next_pages(time.monotonic()):
+            host = page.host
+            if not self.admit(page):
+                continue # the budget is spent, less urgent pages wait
+            if self.config.connections.prewarm and page.spare is None and page.scheduler.in_burst():
+                page.spare = host.manager.create_async_client()
+                self._spawn(host.manager.prewarm_async(page.spare))
+            host.in_flight += 1
+            page.polling = True
+            self._spawn(self.poll(page))
+
+    def admit(self, page: OfferPage) -> bool:
+        """Take one poll from the budget of the page's host."""
+        host = page.host
+        return host.in_flight < host.concurrency and host.bucket.try_take()
+
+    def interval(self, page: OfferPage) -> float:
+        return page.interval(self.config.watcher.idle_interval)
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def poll(self, page: OfferPage) -> None:
+        try:
+            METRICS.record_poll()
+            response = await fetch_url(page.host.client, page.url, headers=page.poller.request_headers(),
+                                       timeout=step_timeout('poll'))
+            if not response:
+                METRICS.record_poll_error()
+                return
+            page.polls += 1
+            if not page.poller.observe(response):
+                return
+            digest = hashlib.blake2b(table_region(response.content), digest_size=16).digest()
+            if digest == page.region_hash:
+                return
+            page.region_hash = digest
+            await self.inspect(page, response)
+        finally:
+            page.host.in_flight -= 1
+            page.polling = False
+            page.due = time.monotonic() + self.interval(page)
+            self.wake.set()
+
+    async def inspect(self, page: OfferPage, response: httpx.Response) -> None:
+        """Verify the page once, then record course states and start bookings."""
+        page.parses += 1
+        if page.verified is None:
+            title = page_title(response.text)
+            page.verified = title is not None and page.title in title
+            if not page.verified:
+                logger.error(f"{page.url}: expected offer {page.title!r}, page shows {title!r}. Not watching it")
+                return
+            logger.info(f"Page identity verified: {page.title}")
+
+        states = await PARSE_POOL.course_states(response, page.kursnrs, bookable_only=True)
+        for kursnr in page.kursnrs:
+            if kursnr in page.booked or kursnr in page.in_flight:
+                continue
+            state, booking_info = states[kursnr]
+            if state != page.states.get(kursnr):
+                logger.info(f"{page.title} {kursnr}: {state!r}")
+                if self.history:
+                    self.history.record(page.url, kursnr, page.states.get(kursnr), state, booking_info is not None,
+                                        page.host.clock.server_time())
+            page.states[kursnr] = state
+            if booking_info:
+                METRICS.record_detection(page.scheduler.opening_lag())
+                page.in_flight[kursnr] = asyncio.create_task(self.book(page, kursnr, booking_info))
+        page.update_opening()
+        if self.history and page.scheduler.opening and not page.predicted:
+            page.predicted = True
+            OpeningPredictor(self.history).apply(page.scheduler, page.url, page.kursnrs[0])
+
+    async def book(self, page: OfferPage, kursnr: str, booking_info: dict) -> bool:
+        label = f"{page.title}/{kursnr}"
+        session, page.spare = page.spare or page.host.manager.create_async_client(), None
+        job_config = self.job_config(page, kursnr)
+        try:
+            success = await process_booking(session, job_config, booking_info)
+        except Exception as e:
+            logger.error(f"Booking {label} failed: {e}")
+            success = False
+        finally:
+            await session.aclose()
+            page.in_flight.pop(kursnr, None)
+        if success:
+            logger.info(f"Booked {label}")
+            page.booked.add(kursnr)
+            self.results[label] = True
+        elif job_key(job_config) in CONFIRMATIONS.claimed:
+            # The confirmation may have gone through, a second booking could double-book
+            logger.error(f"Booking {label} has an unknown outcome, not retrying")
+            page.booked.add(kursnr)
+            self.results[label] = False
+        else:
+            logger.error(f"Booking {label} failed. Retrying...")
+            # The unchanged page would not be parsed again otherwise
+            page.forget()
+            page.due = 0.0
+        self.wake.set()
+        return success
+
+    def wait_time(self) -> float:
+        """Until the next page is due or its host has budget again, at most one second."""
+        now = time.monotonic()
+        waits = []
+        for page in self.pages:
+            if page.done or page.polling:
+                continue
+            if page.due > now:
+                waits.append(page.due - now)
+            elif page.host.in_flight < page.host.concurrency:
+                waits.append(page.host.bucket.wait_time())
+        return min(max(min(waits, default=1.0), 0.001), 1.0)
+
+    async def run(self) -> Dict[str, bool]:
+        """Watch until every Kursnr of every verified offer is booked."""
+        logger.info(f"Watching {len(self.pages)} offer pages on {len(self.hosts)} hosts")
+        if self.config.connections.prewarm:
+            await asyncio.gather(*(host.manager.prewarm_async(host.client) for host in self.hosts.values()))
+        try:
+            while not all(page.done for page in self.pages):
+                self.wake.clear()
+                self.tick()
+                METRICS.maybe_export(self.config.metrics)
+                # asyncio.timeout, unlike wait_for on 3.11, never swallows a cancel that races the wake-up
+                try:
+                    async with asyncio.timeout(self.wait_time()):
+                        await self.wake.wait()
+                except TimeoutError:
+                    pass
+        finally:
+            await self.close()
+        return self.results
+
+    async def close(self) -> None:
+        bookings = [task for page in self.pages for task in page.in_flight.values()]
+        for task in [*self.tasks, *bookings]:
+            task.cancel()
+        await asyncio.gather(*self.tasks, *bookings, return_exceptions=True)
+        clients = [host.client for host in self.hosts.values()] + [page.spare for page in self.pages if page.spare]
+        await asyncio.gather(*(client.aclose() for client in clients))
+        logger.info(f"{sum(p.polls for p in self.pages)} polls, {sum(p.parses for p in self.pages)} parses "
+                    f"for {len(self.pages)} offer pages")
+        if self.history:
+            self.history.close()
+        METRICS.export(self.config.metrics)
+
+async def run(config: Config) -> Dict[str, bool]:
+    """Watch and book all [[offers]]."""
+    return await OfferWatcher(config).run()
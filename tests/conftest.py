@@ -0,0 +1,31 @@
+import pytest
+from pathlib import Path
+from src.config import Config, UserInfo
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+OFFER_URL = "https://buchung.hsz.rwth-aachen.de/angebote/aktueller_zeitraum/_Basketball_Spielbetrieb.html"
+
+@pytest.fixture
+def read_data():
+    """Return a loader for the captured pages in data/."""
+    def load(name: str) -> bytes:
+        return (DATA_DIR / name).read_bytes()
+    return load
+
+@pytest.fixture
+def offline_config():
+    """Config that does not need config/settings.toml."""
+    user_info = UserInfo(
+        gender="männlich",
+        first_name="Max",
+        last_name="Mustermann",
+        address="Musterstraße 123",
+        zip_city="52062 Aachen",
+        status="S-RWTH",
+        student_id="123456",
+        email="max.mustermann@rwth-aachen.de",
+        phone="0123456789",
+        accept_terms=True,
+        kursnr="13131849"
+    )
+    return Config(target_url=OFFER_URL, kurs_row=3, user_headers={}, user_info=user_info)
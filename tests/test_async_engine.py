@@ -0,0 +1,39 @@
+"""
+Offline tests for the asyncio polling engine, served from data/1.html via httpx.MockTransport.
+"""
+import asyncio
+import httpx
+from src.engine import PollingEngine
+from src.async_bot import find_course
+
+def make_client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+def test_async_find_course(offline_config, read_data):
+    async def run():
+        async with make_client(lambda request: httpx.Response(200, content=read_data("1.html"))) as client:
+            return await find_course(client, offline_config, "13131849")
+
+    booking_info = asyncio.run(run())
+    assert booking_info['type'] == 'form'
+    assert booking_info['url'] == "https://buchung.hsz.rwth-aachen.de/cgi/anmeldung.fcgi"
+    assert booking_info['inputs']['BS_Kursid_223193'] == 'buchen'
+
+def test_engine_keeps_polling_until_course_appears(offline_config, read_data):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        # The course only shows up from the fourth probe on
+        if len(calls) < 4:
+            return httpx.Response(200, content=b"<html><table class='bs_kurse'></table></html>")
+        return httpx.Response(200, content=read_data("1.html"))
+
+    async def run():
+        async with make_client(handler) as client:
+            engine = PollingEngine(client, offline_config, "13131849", concurrency=3, interval=0.01)
+            return await engine.wait_for_course()
+
+    booking_info = asyncio.run(run())
+    assert booking_info['inputs']['BS_Kursid_223193'] == 'buchen'
+    assert len(calls) >= 4
@@ -0,0 +1,108 @@
+"""
+Offline test for batch booking: one poll per tick fans out to per-job pipelines.
+"""
+import asyncio
+import httpx
+from dataclasses import replace
+from src.batch import BatchBooker, job_label
+from src.config import BookingJob
+from src.connections import ConnectionManager
+
+class MockManager(ConnectionManager):
+    """Hands out clients that talk to a MockTransport."""
+
+    def __init__(self, config, handler):
+        super().__init__(config)
+        self.handler = handler
+        self.clients = []
+
+    def create_async_client(self) -> httpx.AsyncClient:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+        self.install(client)
+        self.clients.append(client)
+        return client
+
+def test_one_poll_per_tick_for_all_jobs(offline_config, read_data, monkeypatch):
+    offline_config.engine.poll_interval = 0.01
+    polls = []
+
+    def handler(request):
+        polls.append(request)
+        return httpx.Response(200, content=read_data("1.html"))
+
+    booked = []
+
+    async def fake_process_booking(client, config, booking_info):
+        booked.append((client, config.user_info.first_name, booking_info['inputs']['BS_Kursid_223193']))
+        return True
+
+    monkeypatch.setattr("src.batch.process_booking", fake_process_booking)
+
+    # Same last name: jobs are told apart by their e-mail address
+    erika = replace(offline_config.user_info, first_name="Erika", email="erika.mustermann@rwth-aachen.de")
+    jobs = [BookingJob(offline_config.user_info, "13131849"), BookingJob(erika, "13131849")]
+    manager = MockManager(offline_config, handler)
+    results = asyncio.run(BatchBooker(offline_config, jobs, manager).run())
+
+    assert results == {job_label(jobs[0]): True, job_label(jobs[1]): True}
+    assert len(polls) == 1
+    assert sorted(name for _, name, _ in booked) == ["Erika", "Max"]
+    # Every job books on its own session
+    assert booked[0][0] is not booked[1][0]
+
+def test_duplicate_job_is_reported(offline_config, caplog):
+    job = BookingJob(offline_config.user_info, "13131849")
+    booker = BatchBooker(offline_config, [job, BookingJob(offline_config.user_info, "13131849")],
+                         MockManager(offline_config, lambda request: httpx.Response(404)))
+    assert booker.jobs == [job]
+    assert "configured twice" in caplog.text
+    asyncio.run(booker.close())
+
+def test_sessions_are_kept_warm(offline_config, read_data):
+    offline_config.engine.poll_interval = 0.02
+    offline_config.connections.prewarm = True
+    offline_config.connections.warm_connections = 1
+    offline_config.connections.keepalive_interval = 0.1
+    # Never bookable: the sessions sit idle while the poller works
+    booker = BatchBooker(offline_config, [BookingJob(offline_config.user_info, "13131817")],
+                         MockManager(offline_config, lambda request: httpx.Response(200, content=read_data("1.html"))))
+    session, = booker.sessions.values()
+
+    async def run():
+        runner = asyncio.create_task(booker.run(forever=True))
+        await asyncio.sleep(0.5)
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+    asyncio.run(run())
+    # Prewarmed at start, then re-warmed after every idle interval
+    assert booker.manager.client_stats[session].requests >= 3
+    assert booker.manager.client_stats[booker.poller].requests > 5
+    assert not booker.warmers
+
+def test_jobs_override_user_info(tmp_path):
+    from src.config import load_config, booking_jobs
+
+    settings = tmp_path / "settings.toml"
+    settings.write_text('''
+TARGET_URL = "https://example.org/offer.html"
+
+[userInfo]
+firstName = "Max"
+email = "max@example.org"
+kursnr = "1"
+
+[[jobs]]
+kursnr = "2"
+
+[[jobs]]
+kursnr = "3"
+firstName = "Erika"
+''', encoding='utf-8')
+    config = load_config(str(settings))
+    jobs = booking_jobs(config)
+    assert [(j.kursnr, j.user_info.first_name, j.user_info.email) for j in jobs] == [
+        ("2", "Max", "max@example.org"),
+        ("3", "Erika", "max@example.org"),
+    ]
+    assert [j.kursnr for j in booking_jobs(config, "9")] == ["9"]
@@ -0,0 +1,78 @@
+"""
+Resumable booking flow: per-step retries, the confirmation is sent at most once.
+"""
+import httpx
+import pytest
+from src import bot
+from src.booking_flow import CONFIRMATIONS, job_key
+from src.config import BookingConfig
+from src.mock_server import MockBookingServer
+
+class FlakyTransport(httpx.HTTPTransport):
+    """Fails the first request whose body contains `marker`, before or after the server saw it."""
+
+    def __init__(self, marker: bytes, exc: Exception, after_send: bool = False):
+        super().__init__()
+        self.marker = marker
+        self.exc = exc
+        self.after_send = after_send
+        self.failed = False
+        self.bodies = []
+
+    def handle_request(self, request):
+        body = request.read()
+        self.bodies.append(body)
+        if self.failed or self.marker not in body:
+            return super().handle_request(request)
+        self.failed = True
+        if self.after_send:
+            super().handle_request(request).close()
+        raise self.exc
+
+    def count(self, marker: bytes, unless: bytes = b"\0") -> int:
+        return sum(marker in body and unless not in body for body in self.bodies)
+
+@pytest.fixture
+def config(offline_config):
+    offline_config.booking = BookingConfig(backoff=0.0)
+    yield offline_config
+    CONFIRMATIONS.release(job_key(offline_config))
+
+def book(server, config, transport) -> bool:
+    config.target_url = server.offer_url
+    with httpx.Client(transport=transport) as client:
+        booking_info = bot.find_course(client, config, "13131849")
+        return bot.process_booking(client, config, booking_info)
+
+def test_failed_step_is_resent_alone(config):
+    # The confirmation form repeats the registration fields, with Phase=final
+    transport = FlakyTransport(b"tnbed=", httpx.ConnectError("connection reset"))
+    with MockBookingServer() as server:
+        assert book(server, config, transport)
+        assert server.stats['confirmations'] == 1
+    # Only the registration went out twice; the flow did not restart at the booking page
+    assert transport.count(b"BS_Kursid_") == 1
+    assert transport.count(b"tnbed=", unless=b"Phase=final") == 2
+    assert job_key(config) not in CONFIRMATIONS.claimed
+
+def test_lost_confirmation_is_not_resent(config):
+    transport = FlakyTransport(b"Phase=final", httpx.ReadTimeout("timed out"), after_send=True)
+    with MockBookingServer() as server:
+        assert not book(server, config, transport)
+        # The server booked, the client cannot know
+        assert server.stats['confirmations'] == 1
+    assert transport.count(b"Phase=final") == 1
+    # Retrying the job must not submit a second confirmation
+    assert job_key(config) in CONFIRMATIONS.claimed
+
+def test_retries_are_bounded(config):
+    config.booking.retries = {'booking_page': 2}
+    attempts = []
+
+    def handler(request):
+        attempts.append(request.url)
+        return httpx.Response(503)
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        assert not bot.process_booking(client, config, {'url': "https://example.org/cgi", 'type': 'link'})
+    assert len(attempts) == 2
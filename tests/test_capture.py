@@ -0,0 +1,88 @@
+"""
+Session capture against the mock server, replayed offline.
+"""
+import os
+import time
+import asyncio
+import httpx
+import pytest
+from src import bot, async_bot
+from src.capture import CAPTURE, Capture, ReplayTransport, replay
+from src.config import CaptureConfig
+from src.mock_server import MockBookingServer
+
+OPENS_AFTER = 0.4
+
+@pytest.fixture
+def capture_file(tmp_path, offline_config):
+    CAPTURE.configure(CaptureConfig(enabled=True, dir=str(tmp_path)))
+    try:
+        with MockBookingServer(opening_at=time.time() + OPENS_AFTER) as server, httpx.Client() as client:
+            offline_config.target_url = server.offer_url
+            while not (booking_info := bot.find_course(client, offline_config, "13131849")):
+                time.sleep(0.05)
+            assert bot.process_booking(client, offline_config, booking_info)
+    finally:
+        path = CAPTURE.close()
+        CAPTURE.configure(CaptureConfig())
+    return path, server.offer_url
+
+def test_capture_is_indexed_and_deduplicated(capture_file):
+    path, offer_url = capture_file
+    capture = Capture(path)
+    polls = [entry for entry in capture.entries if entry['url'] == offer_url]
+    assert len(polls) > 3 and all(entry['status'] == 200 for entry in polls)
+    assert [entry['method'] for entry in capture.entries[len(polls):]] == ['POST'] * 4
+    # Closed and open offer page, plus one body per booking step
+    assert capture.meta['blobs'] == 2 + 4
+    assert capture.entries == sorted(capture.entries, key=lambda entry: entry['t'])
+    assert bot.is_booking_successful(capture.body(capture.entries[-1]).decode('utf-8'))
+
+def test_unfinished_run_is_readable_and_private(tmp_path, offline_config):
+    CAPTURE.configure(CaptureConfig(enabled=True, dir=str(tmp_path)))
+    try:
+        path, work = CAPTURE.path, CAPTURE.work
+        assert os.stat(work).st_mode & 0o777 == 0o700
+        with MockBookingServer(opening_at=time.time() + 3600) as server, httpx.Client() as client:
+            offline_config.target_url = server.offer_url
+            for _ in range(3):
+                bot.find_course(client, offline_config, "13131849")
+        # What a killed run leaves behind
+        capture = Capture(work)
+        assert len(capture) == 3 and not capture.meta['complete'] and capture.meta['started']
+        assert b"bs_kurse" in capture.body(capture.entries[-1])
+    finally:
+        CAPTURE.close()
+        CAPTURE.configure(CaptureConfig())
+    assert not work.exists()
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    assert len(Capture(path)) == 3
+
+def test_replay_in_order_books_offline(capture_file, offline_config):
+    path, offer_url = capture_file
+    capture = Capture(path)
+    offline_config.target_url = offer_url
+    result = replay(capture, offline_config)
+    assert result['booked'] and result['unmatched'] == 0
+    assert result['requests'] == len(capture)
+    assert result['seconds'] < capture.duration
+
+def test_accelerated_replay_follows_the_timeline(capture_file, offline_config):
+    path, offer_url = capture_file
+    capture = Capture(path)
+    offline_config.target_url = offer_url
+    polls = [entry for entry in capture.entries if entry['url'] == offer_url]
+    opened = polls[-1]['t'] - polls[0]['t']
+
+    async def poll_until_open():
+        transport = ReplayTransport(capture, speed=10.0)
+        async with httpx.AsyncClient(transport=transport) as client:
+            started = time.perf_counter()
+            while not await async_bot.find_course(client, offline_config, "13131849"):
+                await asyncio.sleep(0.005)
+            return transport.stats['requests'], time.perf_counter() - started
+
+    requests, seconds = asyncio.run(poll_until_open())
+    # The closed page was served first, the open one once the replayed timeline reached it
+    assert requests >= 2
+    assert seconds < opened
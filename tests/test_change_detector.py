@@ -0,0 +1,68 @@
+"""
+Offline tests for incremental change detection on the bs_kurse region.
+"""
+import httpx
+import pytest
+from src import bot
+from src.change_detector import ChangeDetector
+
+BUTTON = b'<a id="K13131849"></a><input type="submit" value="buchen"'
+WAITLIST = b'<a id="K13131849"></a><input type="submit" value="Warteliste"'
+
+def with_noise(page: bytes, stamp: int) -> bytes:
+    """The autoreload timestamp changes on every poll, outside the course tables."""
+    return page.replace(b"</head>", b"<!-- autoreload=%d --></head>" % stamp, 1)
+
+@pytest.mark.parametrize("scope", ["table", "row"])
+def test_noise_outside_region_skips_extraction(offline_config, read_data, scope):
+    pages = iter([with_noise(read_data("1.html"), stamp) for stamp in range(3)])
+    detector = ChangeDetector("13131849", scope)
+
+    def handler(request):
+        return httpx.Response(200, content=next(pages))
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        results = [bot.find_course(client, offline_config, "13131849", detector=detector) for _ in range(3)]
+
+    assert results[0]['inputs']['BS_Kursid_223193'] == 'buchen'
+    assert results[1] == results[2] == results[0]
+    assert detector.polls == 3 and detector.extractions == 1
+
+def test_state_changes_are_published(offline_config, read_data):
+    page = read_data("1.html")
+    assert BUTTON in page
+    pages = iter([page, with_noise(page, 1), page.replace(BUTTON, WAITLIST)])
+    detector = ChangeDetector("13131849", "row")
+    events = []
+    detector.subscribe(events.append)
+
+    def handler(request):
+        return httpx.Response(200, content=next(pages))
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        for _ in range(3):
+            bot.find_course(client, offline_config, "13131849", detector=detector)
+
+    assert [(e.old_state, e.new_state) for e in events] == [(None, 'buchen'), ('buchen', 'Warteliste')]
+    assert events[0].bookable
+    assert detector.extractions == 2
+
+@pytest.mark.parametrize("scope", ["table", "row"])
+def test_new_form_token_skips_extraction(offline_config, read_data, scope):
+    page = read_data("1.html")
+    token = b'name="BS_Code" value="13b12aaa-d076-11f0-ba0a-005056852170"'
+    assert token in page
+    pages = iter([page, page.replace(token, b'name="BS_Code" value="df1b6e51-ce20-11f0-bc45-005056852170"')])
+    detector = ChangeDetector("13131849", scope)
+
+    def handler(request):
+        return httpx.Response(200, content=next(pages))
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        results = [bot.find_course(client, offline_config, "13131849", detector=detector) for _ in range(2)]
+
+    # A retried booking must post the BS_Code of the latest page load, without a new parse
+    assert results[0]['inputs']['BS_Code'] == "13b12aaa-d076-11f0-ba0a-005056852170"
+    assert results[1]['inputs']['BS_Code'] == "df1b6e51-ce20-11f0-bc45-005056852170"
+    assert results[1]['inputs']['BS_Kursid_223193'] == 'buchen'
+    assert detector.polls == 2 and detector.extractions == 1
@@ -0,0 +1,39 @@
+"""
+Offline tests for conditional polling of the offer page.
+"""
+import gzip
+import httpx
+from src.bot import find_course
+from src.conditional import ConditionalPoller
+
+def test_not_modified_skips_parsing(offline_config, read_data):
+    body = gzip.compress(read_data("1.html"))
+
+    def handler(request):
+        if request.headers.get('If-None-Match') == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=body, headers={'ETag': '"v1"', 'Content-Encoding': 'gzip'})
+
+    poller = ConditionalPoller()
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        first = find_course(client, offline_config, "13131849", poller)
+        second = find_course(client, offline_config, "13131849", poller)
+
+    assert first == second
+    assert first['inputs']['BS_Kursid_223193'] == 'buchen'
+    assert poller.stats.not_modified == 1
+    assert poller.stats.parses_avoided == 1
+    # Compression on the first poll plus the full body on the 304
+    assert poller.stats.bytes_saved > len(read_data("1.html"))
+
+def test_unchanged_hash_skips_parsing(offline_config, read_data):
+    handler = lambda request: httpx.Response(200, content=read_data("1.html"))
+
+    poller = ConditionalPoller()
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        for _ in range(3):
+            booking_info = find_course(client, offline_config, "13131849", poller)
+
+    assert booking_info['type'] == 'form'
+    assert poller.stats.unchanged == 2
+    assert poller.stats.per_minute()['parses_avoided'] > 0
@@ -0,0 +1,89 @@
+"""
+Tests for the connection manager against a local keep-alive HTTP server.
+"""
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import httpx
+import pytest
+import src.connections
+from src.connections import ConnectionManager, step_timeout, configure_step_timeouts, DEFAULT_STEP_TIMEOUTS
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/page.html"
+    server.shutdown()
+    server.server_close()
+
+def test_prewarm_makes_polls_reuse_the_connection(offline_config, server_url, monkeypatch):
+    offline_config.target_url = server_url
+    monkeypatch.setattr(src.connections, 'BOOKING_ENDPOINT', server_url.replace('page.html', 'cgi/anmeldung.fcgi'))
+    manager = ConnectionManager(offline_config)
+    with manager.create_client() as client:
+        manager.prewarm(client)
+        assert manager.hosts() == [server_url.rsplit('/', 1)[0]]
+        assert manager.stats.new_connections == 1
+        for _ in range(3):
+            client.get(server_url)
+
+    assert manager.stats.requests == 4
+    assert manager.stats.reused == 3
+
+def test_keep_warm_tracks_each_client(offline_config, server_url, monkeypatch):
+    offline_config.target_url = server_url
+    offline_config.connections.keepalive_interval = 0.2
+    offline_config.connections.warm_connections = 1
+    monkeypatch.setattr(src.connections, 'BOOKING_ENDPOINT', server_url)
+    manager = ConnectionManager(offline_config)
+    warmed = []
+
+    async def prewarm_async(client):
+        warmed.append(client)
+        await client.head(server_url)
+    monkeypatch.setattr(manager, 'prewarm_async', prewarm_async)
+
+    async def run():
+        async with manager.create_async_client() as busy, manager.create_async_client() as idle:
+            await asyncio.gather(busy.get(server_url), idle.get(server_url))
+            tasks = [asyncio.create_task(manager.keep_warm(client)) for client in (busy, idle)]
+            # The busy client polls more often than the interval, the idle one sends nothing
+            for _ in range(10):
+                await busy.get(server_url)
+                await asyncio.sleep(0.05)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            return busy, idle
+
+    busy, idle = asyncio.run(run())
+    assert idle in warmed and busy not in warmed
+    assert manager.stats.requests == sum(manager.client_stats[c].requests for c in (busy, idle))
+
+def test_step_timeouts_from_config():
+    configure_step_timeouts({'registration': {'connect': 0.5, 'read': 4.0}})
+    try:
+        assert step_timeout('registration') == httpx.Timeout(4.0, connect=0.5)
+        assert step_timeout('poll') == DEFAULT_STEP_TIMEOUTS['poll']
+    finally:
+        configure_step_timeouts({})
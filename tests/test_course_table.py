@@ -0,0 +1,49 @@
+"""
+Offline tests for the indexed course table model against the captured offer pages.
+"""
+from bs4 import BeautifulSoup
+from src.bot import extract_button_content, find_row_by_kursnr
+from src.course_table import CourseTable
+
+BASE_URL = "https://buchung.hsz.rwth-aachen.de/angebote/aktueller_zeitraum/_Basketball_Spielbetrieb.html"
+
+def test_index_by_kursnr_and_position(read_data):
+    table = CourseTable.from_html(read_data("1.html").decode('iso-8859-1'))
+
+    record = table.get("13131817")
+    assert (record.day, record.time, record.place) == ("Mo", "21:00-22:25", "Sportkomplex Eckertweg")
+    assert record.state == "ab 07.12., 21:00"
+    assert not record.bookable
+    assert table.row(record.position) is record
+
+    # Rows of the second course table are indexed as well
+    assert len(table) > 10
+    assert all(type(r.kursnr) is str and type(r.state) is str for r in table)
+
+def test_bookable_record(read_data):
+    table = CourseTable.from_html(read_data("1.html").decode('iso-8859-1'))
+    record = table.get("13131849")
+    assert record.bookable
+    assert (record.button_name, record.button_value) == ("BS_Kursid_223193", "buchen")
+    # The form around the table posts the hidden BS_Code plus the clicked button
+    assert record.booking_info(BASE_URL) == {
+        'type': 'form',
+        'url': "https://buchung.hsz.rwth-aachen.de/cgi/anmeldung.fcgi",
+        'method': 'post',
+        'inputs': {'BS_Code': "13b12aaa-d076-11f0-ba0a-005056852170", 'BS_Kursid_223193': "buchen"},
+    }
+
+def test_extract_button_content_positions(read_data):
+    soup = BeautifulSoup(read_data("debug_page.html"), 'html.parser')
+    table = CourseTable.from_soup(soup)
+    for record in table:
+        assert extract_button_content(soup, record.position) == record.state
+    assert extract_button_content(soup, len(table)) is None
+
+def test_find_row_matches_kursnr_cell_only():
+    html = """<table class='bs_kurse'><tbody>
+        <tr><td class='bs_sknr'>1000</td><td class='bs_sdet'>see 2000</td></tr>
+        <tr><td class='bs_sknr'>2000</td><td class='bs_sdet'></td></tr>
+    </tbody></table>"""
+    rows = BeautifulSoup(html, 'html.parser').find_all('tr')
+    assert find_row_by_kursnr(rows, "2000") is rows[1]
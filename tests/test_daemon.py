@@ -0,0 +1,104 @@
+"""
+Daemon control over the Unix socket against the local stand-in server.
+"""
+import time
+import asyncio
+from src import control
+from src.daemon import Daemon
+from src.mock_server import MockBookingServer
+
+SETTINGS = '''
+TARGET_URL = "{url}"
+
+[userInfo]
+firstName = "Max"
+lastName = "Mustermann"
+email = "max@example.org"
+kursnr = ""
+
+[engine]
+pollInterval = 0.02
+
+[daemon]
+socketPath = "{socket}"
+reloadInterval = 0.05
+'''
+
+def write_settings(path, url, socket, jobs=""):
+    path.write_text(SETTINGS.format(url=url, socket=socket) + jobs, encoding='utf-8')
+
+def test_add_list_reload_remove_shutdown(tmp_path):
+    settings = tmp_path / "settings.toml"
+    socket = tmp_path / "bot.sock"
+
+    with MockBookingServer(opening_at=time.time() + 3600) as server:
+        write_settings(settings, server.offer_url, socket)
+
+        async def session():
+            daemon = Daemon(str(settings))
+            serving = asyncio.create_task(daemon.serve())
+            while not socket.exists():
+                await asyncio.sleep(0.01)
+
+            async def send(**request):
+                return await asyncio.to_thread(control.send, request, str(socket))
+
+            erika = {'firstName': "Erika", 'email': "erika@example.org"}
+            added = await send(cmd='add', kursnr="13131849", user=erika)
+            assert added['ok'] and added['job']['label'] == "13131849/erika@example.org"
+            assert not (await send(cmd='add', kursnr="13131849", user=erika))['ok']
+
+            # The watched course is not open yet, its cell shows the opening time
+            for _ in range(100):
+                jobs = (await send(cmd='list'))['jobs']
+                if jobs[0]['state']:
+                    break
+                await asyncio.sleep(0.02)
+            assert jobs[0]['status'] == 'watching' and jobs[0]['state'].startswith("ab ")
+
+            # Editing settings.toml adds its [[jobs]] without a restart
+            write_settings(settings, server.offer_url, socket, '\n[[jobs]]\nkursnr = "13131849"\n')
+            for _ in range(100):
+                jobs = (await send(cmd='list'))['jobs']
+                if len(jobs) == 2:
+                    break
+                await asyncio.sleep(0.02)
+            assert {job['source'] for job in jobs} == {'socket', 'config'}
+
+            assert (await send(cmd='remove', label="13131849/erika@example.org"))['ok']
+            status = await send(cmd='status')
+            assert status['jobs'] == 1 and status['ticks'] > 0 and status['reloaded_at']
+
+            assert (await send(cmd='shutdown'))['ok']
+            await asyncio.wait_for(serving, 5)
+
+        asyncio.run(session())
+        assert server.stats['confirmations'] == 0
+    assert not socket.exists()
+
+def test_added_sessions_are_kept_warm(tmp_path):
+    settings = tmp_path / "settings.toml"
+    socket = tmp_path / "bot.sock"
+    warm = '\n[connections]\nprewarm = true\nwarmConnections = 1\nkeepaliveInterval = 0.1\n'
+
+    with MockBookingServer(opening_at=time.time() + 3600) as server:
+        write_settings(settings, server.offer_url, socket, warm)
+
+        async def session():
+            daemon = Daemon(str(settings))
+            serving = asyncio.create_task(daemon.serve())
+            while not socket.exists():
+                await asyncio.sleep(0.01)
+            added = await asyncio.to_thread(control.send, {'cmd': 'add', 'kursnr': "13131849"}, str(socket))
+            label = added['job']['label']
+            warmer = daemon.booker.warmers[label]
+            session = daemon.booker.sessions[label]
+            await asyncio.sleep(0.4)
+            # Warmed when added, then again after every idle interval
+            assert daemon.booker.manager.client_stats[session].requests >= 2
+
+            await asyncio.to_thread(control.send, {'cmd': 'shutdown'}, str(socket))
+            await asyncio.wait_for(serving, 5)
+            assert warmer.cancelled() and not daemon.booker.warmers
+
+        asyncio.run(session())
@@ -0,0 +1,76 @@
+"""
+Form-scoped documents: form regions, the SoupStrainer fallback, buttons and submissions.
+"""
+from src.document import FormDocument, parse_forms, contains_success_marker
+
+ACTION = "https://buchung.hsz.rwth-aachen.de/cgi/anmeldung.fcgi"
+FID = "8ca99193b7546b1962eadf2581e156f8dca3b7d203eadeadafdee3c3"
+
+NESTED = """<html><body><p>before
+<form action="/outer" method="POST"><input type="hidden" name="a" value="1">
+  <form action="/inner"><input type="submit" name="go" value="Weiter"></form>
+</form></body></html>"""
+
+UNCLOSED = """<html><body>
+<form action="/first"><input type="submit" name="go" value="Weiter"></form>
+<form action="/last"><button>Jetzt buchen</button><input name="b" value="2">
+</body></html>"""
+
+BUTTONS = """<html><body><p>Kurs &amp; mehr</p>
+<form action="/search"><input name="q" value="a&amp;b"><input type="submit" value="Suchen"></form>
+<form action="/book" method="post"><input type="hidden" name="fid" value="7"><button><b>Jetzt</b> buchen</button></form>
+</body></html>"""
+
+def test_buchen_page(read_data):
+    with FormDocument(read_data("2.html").decode('utf-8')) as document:
+        assert len(document.forms) == 1
+        form = document.form_with_button("buchen")
+        assert form is document.first_form
+        submission = form.submission("https://example.org/")
+    assert submission['url'] == ACTION and submission['method'] == 'post'
+    assert submission['data']['fid'] == FID
+    assert submission['data']['BS_Termin_2025-12-04'] == "buchen"
+
+def test_registration_page(read_data):
+    with FormDocument(read_data("3.html").decode('utf-8')) as document:
+        form = document.first_form
+        assert not form.has_button("buchen") and form.has_button("weiter")
+        assert form.inputs['fid'] == FID and form.inputs['Termin'] == "2025-12-04"
+        assert {'vorname', 'name', 'email', 'tnbed'} <= set(form.inputs)
+        assert [submit.get('value') for submit in form.submits] == ["weiter zur Buchung"]
+
+def test_closed_forms_are_read_without_a_tree():
+    with FormDocument(BUTTONS) as document:
+        assert document.soup is None
+        search, book = document.forms
+        assert search.inputs == {'q': "a&b"} and [submit['value'] for submit in search.submits] == ["Suchen"]
+        assert book.buttons == ["Jetzt buchen"] and document.form_with_button("buchen") is book
+        assert book.submission("https://example.org/x/") == {'url': "https://example.org/book", 'method': 'post',
+                                                             'data': {'fid': "7"}}
+        # The tree is built only when asked for
+        assert book.element.find('input')['name'] == "fid"
+    with FormDocument("<html><body>Keine Formulare</body></html>") as document:
+        assert document.forms == [] and document.first_form is None
+
+def test_nested_forms_use_the_strainer():
+    soup = parse_forms(NESTED)
+    # Only form subtrees are kept, the text before them is dropped
+    assert "before" not in soup.get_text()
+    with FormDocument(NESTED) as document:
+        assert [form.action for form in document.forms][:1] == ["/outer"]
+        outer = document.first_form
+        assert outer.method == 'post' and outer.inputs['a'] == "1"
+        assert outer.has_button("weiter")
+
+def test_unclosed_form_uses_the_strainer():
+    with FormDocument(UNCLOSED) as document:
+        assert [form.action for form in document.forms] == ["/first", "/last"]
+        last = document.form_with_button("buchen")
+        assert last is document.forms[1] and last.inputs == {'b': "2"}
+        assert last.submission("https://example.org/x/") == {'url': "https://example.org/last", 'method': 'get',
+                                                             'data': {'b': "2"}}
+
+def test_success_marker():
+    assert contains_success_marker("Ihre Buchung war ERFOLGREICH.")
+    assert contains_success_marker("Booking successful")
+    assert not contains_success_marker("Die Buchung ist fehlgeschlagen")
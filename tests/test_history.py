@@ -0,0 +1,72 @@
+"""
+Opening history store and the burst window predicted from it.
+"""
+import time
+import httpx
+import pytest
+from datetime import datetime
+from src import bot
+from src.change_detector import ChangeDetector
+from src.config import HistoryConfig, SchedulerConfig
+from src.history import OpeningHistory, OpeningPredictor
+from src.mock_server import MockBookingServer
+from src.scanner import find_course_streaming
+from src.scheduler import ClockSync, BurstScheduler, SERVER_TZ
+
+OFFER = "https://buchung.hsz.rwth-aachen.de/angebote/aktueller_zeitraum/_Basketball_Spielbetrieb.html"
+OTHER = "https://buchung.hsz.rwth-aachen.de/angebote/aktueller_zeitraum/_Volleyball.html"
+
+@pytest.fixture
+def history(tmp_path):
+    store = OpeningHistory(HistoryConfig(enabled=True, path=str(tmp_path / "history.sqlite3")))
+    yield store
+    store.close()
+
+def opening(history, url, kursnr, day, offset):
+    advertised = datetime(2025, 12, day, 19, 30, tzinfo=SERVER_TZ).timestamp()
+    history.record(url, kursnr, None, f"ab {day:02d}.12., 19:30", False, advertised - 3600)
+    history.record(url, kursnr, f"ab {day:02d}.12., 19:30", "buchen", True, advertised + offset)
+
+def test_offsets_and_window(history):
+    for day, offset in zip(range(1, 5), [0.5, 1.5, 2.0, -0.5]):
+        opening(history, OFFER, "13131849", day, offset)
+    opening(history, OTHER, "1", 9, 30.0)
+
+    assert history.offsets(OFFER, "13131849") == [-0.5, 0.5, 1.5, 2.0]
+    predictor = OpeningPredictor(history)
+    before, after = predictor.window(OFFER, "13131849")
+    assert before == pytest.approx(1.0 + 0.5 - 0.15 * 1.0)
+    assert after == pytest.approx(1.0 + 2.0 - 0.15 * 0.5)
+    # Too little history of its own: fall back to the offer page, then to every course
+    assert predictor.samples(OFFER, "999") == [-0.5, 0.5, 1.5, 2.0]
+    assert len(predictor.samples(OTHER, "1")) == 5
+    history.settings.min_samples = 6
+    assert predictor.window(OFFER, "13131849") is None
+
+def test_predicted_window_replaces_burst_settings(history):
+    for day, offset in zip(range(1, 4), [4.0, 5.0, 6.0]):
+        opening(history, OFFER, "13131849", day, offset)
+    settings = SchedulerConfig(enabled=True, burst_before=3.0, burst_after=60.0)
+    scheduler = BurstScheduler(settings, ClockSync())
+    assert OpeningPredictor(history).apply(scheduler, OFFER, "13131849")
+    # The slot always opened 4-6 s late: no burst before the opening, none long after it
+    assert scheduler.settings.burst_before == 0.0
+    assert scheduler.settings.burst_after == pytest.approx(6.9)
+    assert settings.burst_after == 60.0
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_detector_events_are_recorded(history, offline_config, stream):
+    with MockBookingServer(opening_at=time.time() + 0.3) as server, httpx.Client() as client:
+        offline_config.target_url = server.offer_url
+        detector = ChangeDetector("13131849", "table")
+        detector.subscribe(history.subscriber(server.offer_url))
+        find = find_course_streaming if stream else bot.find_course
+        while not find(client, offline_config, "13131849", detector=detector):
+            time.sleep(0.05)
+
+    rows = history.db.execute("SELECT old_state, new_state, bookable, advertised FROM transitions").fetchall()
+    assert [row[2] for row in rows] == [0, 1]
+    assert rows[1][0].startswith("ab ") and rows[1][3] is not None
+    offset, = history.offsets(server.offer_url, "13131849")
+    # The page announces the opening to the minute
+    assert 0 <= offset < 61
@@ -0,0 +1,37 @@
+"""
+Memory guard: allocation sites, budget check and client recycling.
+"""
+from src import bot
+from src.config import MemoryConfig
+from src.connections import ConnectionManager
+from src.memory import MemoryGuard
+
+def test_growth_is_attributed_to_the_parsing_code(read_data):
+    html = read_data("3.html").decode('iso-8859-1')
+    # Parsed once untraced, so imports and regex caches are not part of the growth
+    bot.parse_forms(html)
+    guard = MemoryGuard(MemoryConfig(enabled=True, frames=10, heap_budget=0.05, top=5))
+    guard.start()
+    try:
+        # Keep the parse result alive, as a leak would
+        kept = bot.parse_forms(html)
+        site, size, count = guard.growth()[0]
+        assert site.startswith("src/") and size > 20 * 1024
+        assert guard.check()
+        del kept
+        guard.collect()
+        assert guard.recycles == 1
+    finally:
+        guard.stop()
+
+def test_recycle_keeps_cookies_and_hooks(offline_config):
+    manager = ConnectionManager(offline_config)
+    client = manager.create_client()
+    client.cookies.set("BSSESSID", "abc", domain="buchung.hsz.rwth-aachen.de")
+    hooks = list(client.event_hooks['response'])
+
+    fresh = manager.recycle(client)
+    assert client.is_closed and not fresh.is_closed
+    assert fresh.cookies.get("BSSESSID") == "abc"
+    assert fresh.event_hooks['response'] == hooks
+    fresh.close()
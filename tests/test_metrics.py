@@ -0,0 +1,55 @@
+"""
+Span histograms and exports, recorded over a booking against the mock server.
+"""
+import json
+import httpx
+import pytest
+from src import bot
+from src.config import MetricsConfig
+from src.metrics import METRICS, Histogram
+from src.mock_server import MockBookingServer
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    METRICS.reset()
+    yield
+    METRICS.reset()
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.05, 0.05, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.cumulative() == [1, 3, 4, 5]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(1.0) == float('inf')
+
+def test_booking_flow_records_every_span(offline_config, tmp_path):
+    with MockBookingServer() as server:
+        offline_config.target_url = server.offer_url
+        with httpx.Client() as client:
+            booking_info = bot.find_course(client, offline_config, "13131849")
+            METRICS.record_detection()
+            assert bot.process_booking(client, offline_config, booking_info)
+
+    for span in ('fetch', 'connect', 'ttfb', 'body', 'parse', 'find_course', 'buchen', 'registration', 'confirmation'):
+        assert METRICS.spans[span].count >= 1, span
+    # One connection, reused by all five requests
+    assert METRICS.spans['connect'].count == 1
+    assert METRICS.spans['fetch'].count == 5
+    assert METRICS.polls == 1 and METRICS.poll_errors == 0
+
+    settings = MetricsConfig(json_path=str(tmp_path / "metrics.json"), prometheus_path=str(tmp_path / "metrics.prom"))
+    METRICS.export(settings)
+    exported = json.loads((tmp_path / "metrics.json").read_text())
+    assert exported['spans']['registration']['count'] == 1
+    prometheus = (tmp_path / "metrics.prom").read_text()
+    assert 'bot_span_seconds_count{span="confirmation"} 1' in prometheus
+    assert 'bot_span_seconds_bucket{span="fetch",le="+Inf"} 5' in prometheus
+    assert "bot_polls_total 1" in prometheus
+
+def test_failed_polls_count_as_errors(offline_config):
+    offline_config.target_url = "http://127.0.0.1:9/offer.html"
+    with httpx.Client() as client:
+        assert bot.find_course(client, offline_config, "13131849") is None
+    assert METRICS.polls == 1
+    assert METRICS.error_rate() == 1.0
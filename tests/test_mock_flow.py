@@ -0,0 +1,80 @@
+"""
+End-to-end booking flow against the local stand-in server.
+"""
+import time
+import asyncio
+import httpx
+import pytest
+from src import bot, async_bot
+from src.engine import PollingEngine
+from src.mock_server import MockBookingServer
+
+@pytest.fixture
+def mock_server():
+    with MockBookingServer() as server:
+        yield server
+
+def test_sync_flow_books_once(mock_server, offline_config):
+    offline_config.target_url = mock_server.offer_url
+    with httpx.Client() as client:
+        booking_info = bot.find_course(client, offline_config, "13131849")
+        assert booking_info['url'] == mock_server.base_url + "/cgi/anmeldung.fcgi"
+        assert bot.process_booking(client, offline_config, booking_info)
+    assert mock_server.stats['confirmations'] == 1
+
+def test_step_handlers_book_once(mock_server, offline_config):
+    offline_config.target_url = mock_server.offer_url
+    with httpx.Client() as client:
+        booking_info = bot.find_course(client, offline_config, "13131849")
+        page = bot.fetch_url(client, booking_info['url'], **bot.request_kwargs(booking_info['method'], booking_info['inputs']))
+        page = bot.handle_buchen_step(client, page.text, str(page.url))
+        page = bot.handle_registration_step(client, page.text, offline_config.user_info, str(page.url))
+        assert bot.handle_confirmation_step(client, page.text, str(page.url))
+    assert mock_server.stats['confirmations'] == 1
+
+def test_async_step_handlers_book_once(mock_server, offline_config):
+    offline_config.target_url = mock_server.offer_url
+
+    async def book():
+        async with httpx.AsyncClient() as client:
+            booking_info = await async_bot.find_course(client, offline_config, "13131849")
+            page = await async_bot.fetch_url(client, booking_info['url'],
+                                             **bot.request_kwargs(booking_info['method'], booking_info['inputs']))
+            page = await async_bot.handle_buchen_step(client, page.text, str(page.url))
+            page = await async_bot.handle_registration_step(client, page.text, offline_config.user_info, str(page.url))
+            return await async_bot.handle_confirmation_step(client, page.text, str(page.url))
+
+    assert asyncio.run(book())
+    assert mock_server.stats['confirmations'] == 1
+
+def test_async_engine_waits_for_scripted_opening(offline_config):
+    offline_config.engine.poll_interval = 0.02
+    with MockBookingServer(opening_at=time.time() + 0.3) as server:
+        offline_config.target_url = server.offer_url
+
+        async def book():
+            async with httpx.AsyncClient() as client:
+                booking_info = await PollingEngine(client, offline_config, "13131849").wait_for_course()
+                return await async_bot.process_booking(client, offline_config, booking_info)
+
+        assert asyncio.run(book())
+        assert server.stats['polls'] > 1
+        assert server.stats['confirmations'] == 1
+
+def test_closed_course_and_stale_session_are_rejected(offline_config):
+    with MockBookingServer(opening_at=time.time() + 3600) as server:
+        offline_config.target_url = server.offer_url
+        with httpx.Client() as client:
+            assert bot.find_course(client, offline_config, "13131849") is None
+            # Skipping the Buchen step leaves the session unknown to the server
+            response = client.post(server.base_url + "/cgi/anmeldung.fcgi", data={'fid': 'stale', 'Phase': 'final'})
+            assert "Fehler" in response.text
+        assert server.stats['confirmations'] == 0
+
+def test_error_injection_returns_503(offline_config):
+    with MockBookingServer(error_rate=1.0, seed=1) as server:
+        with httpx.Client() as client:
+            response = client.get(server.offer_url)
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+        assert server.stats['errors_injected'] == 1
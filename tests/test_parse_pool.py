@@ -0,0 +1,55 @@
+"""
+Parse pool: worker records match inline parsing, async bookings run through a pool.
+"""
+import time
+import asyncio
+import httpx
+import pytest
+from src import bot, async_bot
+from src.booking_flow import CONFIRMATIONS, job_key, read_step
+from src.config import ParsingConfig
+from src.mock_server import MockBookingServer
+from src.parse_pool import PARSE_POOL, ParsePool, course_states, booking_step
+
+BASE_URL = "https://buchung.hsz.rwth-aachen.de/angebote/aktueller_zeitraum/_Basketball_Spielbetrieb.html"
+
+@pytest.fixture
+def thread_pool():
+    PARSE_POOL.configure(ParsingConfig(executor="thread", workers=2))
+    yield PARSE_POOL
+    PARSE_POOL.configure(ParsingConfig())
+
+def test_process_workers_return_the_inline_records(read_data, offline_config):
+    offer = read_data("1.html")
+    registration = read_data("3.html")
+    pool = ParsePool(ParsingConfig(executor="process", workers=1))
+    try:
+        states = pool.executor.submit(course_states, offer, 'iso-8859-1', BASE_URL, ("13131849", "0")).result()
+        reading = pool.executor.submit(booking_step, 'buchen', registration, 'utf-8', BASE_URL,
+                                       offline_config.user_info, None).result()
+    finally:
+        pool.close()
+
+    state, booking_info = states["13131849"]
+    assert booking_info == bot.parse_booking_info(offer.decode('iso-8859-1'), BASE_URL, "13131849")
+    assert state and states["0"] == (None, None)
+    assert reading == read_step('buchen', registration.decode('utf-8'), BASE_URL, offline_config.user_info)
+
+def test_unknown_executor_is_rejected():
+    with pytest.raises(ValueError):
+        ParsePool(ParsingConfig(executor="gpu"))
+
+def test_async_booking_parses_in_the_pool(thread_pool, offline_config):
+    async def book(server):
+        async with httpx.AsyncClient() as client:
+            while not (booking_info := await async_bot.find_course(client, offline_config, "13131849")):
+                await asyncio.sleep(0.02)
+            return await async_bot.process_booking(client, offline_config, booking_info)
+
+    with MockBookingServer(opening_at=time.time() + 0.2) as server:
+        offline_config.target_url = server.offer_url
+        try:
+            assert asyncio.run(book(server))
+        finally:
+            CONFIRMATIONS.release(job_key(offline_config))
+    assert server.stats['confirmations'] == 1
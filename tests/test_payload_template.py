@@ -0,0 +1,33 @@
+"""
+Tests for precompiled registration payloads on data/3.html.
+"""
+from src.bot import prepare_registration_submission
+from src.payload_template import PayloadTemplateCache, scan_form
+
+BASE_URL = "https://buchung.hsz.rwth-aachen.de/cgi/anmeldung.fcgi"
+
+def test_template_matches_mapped_payload(offline_config, read_data, tmp_path):
+    html_content = read_data("3.html").decode('utf-8')
+    user = offline_config.user_info
+    expected = prepare_registration_submission(html_content, user, BASE_URL)
+
+    cache = PayloadTemplateCache(tmp_path)
+    assert cache.render(html_content, user, BASE_URL) is None
+    assert prepare_registration_submission(html_content, user, BASE_URL, cache) == expected
+
+    # A fresh cache loads the template from disk
+    assert PayloadTemplateCache(tmp_path).render(html_content, user, BASE_URL) == expected
+
+def test_volatile_fields_come_from_the_page(offline_config, read_data, tmp_path):
+    html_content = read_data("3.html").decode('utf-8')
+    user = offline_config.user_info
+    cache = PayloadTemplateCache(tmp_path)
+    prepare_registration_submission(html_content, user, BASE_URL, cache)
+
+    fresh_page = html_content.replace("8ca99193b7546b1962eadf2581e156f8dca3b7d203eadeadafdee3c3", "new-fid")
+    assert scan_form(fresh_page).fingerprint == scan_form(html_content).fingerprint
+    assert cache.render(fresh_page, user, BASE_URL)['data']['fid'] == "new-fid"
+
+    # Another user needs its own template
+    user.email = "someone.else@rwth-aachen.de"
+    assert cache.render(html_content, user, BASE_URL) is None
@@ -0,0 +1,61 @@
+"""
+First-wins racing of the booking steps, offline and against the mock server.
+"""
+import asyncio
+import httpx
+from src.config import RacingConfig
+from src.racing import RacingBooker
+from src.mock_server import MockBookingServer
+
+def test_first_successful_lane_wins_and_others_are_cancelled(offline_config):
+    cancelled = []
+
+    async def scenario():
+        clients = [httpx.AsyncClient() for _ in range(3)]
+        booker = RacingBooker(clients, offline_config)
+
+        async def send(client):
+            lane = clients.index(client)
+            try:
+                if lane == 0:
+                    await asyncio.sleep(5) # stuck connection
+                if lane == 1:
+                    return None # reset
+                await asyncio.sleep(0.01)
+                return httpx.Response(200, text=f"lane {lane}")
+            except asyncio.CancelledError:
+                cancelled.append(lane)
+                raise
+
+        winner, response = await booker.race('booking_page', send, clients)
+        for client in clients:
+            await client.aclose()
+        return clients.index(winner), response, booker.stats
+
+    lane, response, stats = asyncio.run(scenario())
+    assert lane == 2 and response.text == "lane 2"
+    assert cancelled == [0]
+    assert stats.wins == {'booking_page': {2: 1}}
+
+def test_raced_flow_confirms_exactly_once(offline_config):
+    offline_config.racing = RacingConfig(enabled=True, lanes=3, steps=["booking_page", "buchen", "registration"])
+
+    async def scenario(server):
+        clients = [httpx.AsyncClient() for _ in range(3)]
+        booker = RacingBooker(clients, offline_config)
+        booking_info = {
+            'type': 'form', 'url': server.base_url + "/cgi/anmeldung.fcgi", 'method': 'post',
+            'inputs': {'BS_Code': 'x', 'BS_Kursid_223193': 'buchen'},
+        }
+        first = await booker.process_booking(offline_config, booking_info)
+        # A retry after success must not submit a second confirmation
+        second = await booker.process_booking(offline_config, booking_info)
+        await asyncio.gather(*(c.aclose() for c in clients))
+        return first, second, booker.stats
+
+    with MockBookingServer(latency=0.01, jitter=0.02, seed=3) as server:
+        first, second, stats = asyncio.run(scenario(server))
+        assert first and not second
+        assert server.stats['confirmations'] == 1
+    assert set(stats.wins) == {'booking_page', 'buchen', 'registration'}
+    assert sum(stats.wins['booking_page'].values()) == 1
@@ -0,0 +1,86 @@
+"""
+Offline tests for the adaptive poll rate: token bucket, AIMD and Retry-After.
+"""
+import httpx
+from email.utils import formatdate
+from src import bot
+from src.config import RateControlConfig
+from src.rate_control import RateController, TokenBucket, parse_retry_after
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class FakeScheduler:
+    def __init__(self, in_burst: bool = False):
+        self.burst = in_burst
+
+    def in_burst(self) -> bool:
+        return self.burst
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert 9 <= parse_retry_after(formatdate(1000.0 + 10, usegmt=True), now=1000.0) <= 10
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+def test_token_bucket_reserves_tokens():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=1.0, clock=clock)
+    assert bucket.delay() == 0.0
+    assert bucket.delay() == 0.5
+    assert bucket.delay() == 1.0
+    # Both reservations are due after 1s, the extra 0.5s refills one token
+    clock.now += 1.5
+    assert bucket.delay() == 0.0
+    assert bucket.delay() == 0.5
+
+def test_aimd_backoff_and_retry_after():
+    clock = FakeClock()
+    controller = RateController(RateControlConfig(increase=1.0), lambda: 10.0, clock=clock)
+    assert controller.rate == 10.0
+
+    controller.observe(httpx.Response(429, headers={'Retry-After': '5'}))
+    assert controller.rate == 5.0
+    assert controller.delay() >= 5.0
+
+    clock.now += 10
+    controller.observe(httpx.Response(200))
+    assert controller.rate == 6.0
+    controller.observe(httpx.Response(503))
+    assert controller.rate == 3.0
+
+    # Never below min_rate, never above what the poll loop asks for
+    for _ in range(20):
+        controller.on_throttle()
+    assert controller.rate == controller.settings.min_rate
+    for _ in range(50):
+        controller.on_success()
+    assert controller.rate == 10.0
+
+def test_burst_window_returns_to_tolerated_rate():
+    clock = FakeClock()
+    scheduler = FakeScheduler()
+    controller = RateController(RateControlConfig(), lambda: 20.0, scheduler, clock=clock)
+    controller.on_throttle() # throttled at 20/s
+    controller.on_throttle() # backed off to 5/s
+    assert controller.rate == 5.0
+
+    scheduler.burst = True
+    controller.delay()
+    assert controller.rate == 20.0 * 0.5 * 0.9
+
+def test_fetch_url_returns_none_on_throttle():
+    controller = RateController(RateControlConfig(), lambda: 4.0)
+
+    def handler(request):
+        return httpx.Response(503, headers={'Retry-After': '2'})
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        controller.install(client)
+        assert bot.fetch_url(client, "https://example.org/offer.html") is None
+    assert controller.throttled == 1
+    assert controller.rate == 2.0
@@ -0,0 +1,62 @@
+"""
+Flight recorder: ring buffers, dumps after bookings, throttled poll logging.
+"""
+import json
+import httpx
+import pytest
+from src import bot
+from src.config import RecorderConfig
+from src.mock_server import MockBookingServer
+from src.recorder import RECORDER, LogThrottle
+
+@pytest.fixture
+def recorder(tmp_path):
+    RECORDER.configure(RecorderConfig(enabled=True, responses=4, events=64, dump_dir=str(tmp_path)))
+    yield RECORDER
+    RECORDER.configure(RecorderConfig())
+
+def test_booking_dumps_responses_and_steps(recorder, offline_config, tmp_path):
+    with MockBookingServer() as server, httpx.Client() as client:
+        offline_config.target_url = server.offer_url
+        for _ in range(3):
+            booking_info = bot.find_course(client, offline_config, "13131849")
+        # Unchanged poll bodies share one compressed copy
+        assert recorder.responses[0]['body'] is recorder.responses[2]['body']
+        assert bot.process_booking(client, offline_config, booking_info)
+
+    dump, = tmp_path.iterdir()
+    assert dump.name.endswith("booking-success")
+    events = [json.loads(line) for line in (dump / "events.jsonl").read_text(encoding='utf-8').splitlines()]
+    steps = [(e['event'], e['phase']) for e in events if 'phase' in e]
+    assert steps == [('booking', 'start'), ('booking_page', 'start'), ('booking_page', 'end'), ('buchen', 'start'), ('buchen', 'end'), ('registration', 'start'),
+                     ('registration', 'end'), ('confirmation', 'start'), ('confirmation', 'end'), ('booking', 'end')]
+    # The ring buffer keeps the last four responses, ending with the confirmation
+    index = json.loads((dump / "responses.json").read_text(encoding='utf-8'))
+    assert len(index) == 4 and index[-1]['method'] == 'POST'
+    assert bot.is_booking_successful((dump / index[-1]['file']).read_text(encoding='utf-8', errors='replace'))
+
+def test_failed_booking_is_dumped(recorder, offline_config, tmp_path):
+    def handler(request):
+        return httpx.Response(503)
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        assert not bot.process_booking(client, offline_config, {'url': "https://example.org/cgi", 'type': 'link'})
+    dump, = tmp_path.iterdir()
+    assert dump.name.endswith("booking-failure")
+    assert json.loads((dump / "responses.json").read_text(encoding='utf-8'))[0]['status'] == 503
+
+def test_disabled_recorder_keeps_nothing(offline_config, read_data):
+    def handler(request):
+        return httpx.Response(200, content=read_data("1.html"))
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        bot.find_course(client, offline_config, "13131849")
+    assert not RECORDER.responses and not RECORDER.events
+
+def test_log_throttle_counts_suppressed_messages():
+    throttle = LogThrottle(interval=3600)
+    assert throttle.allow('poll') == 0
+    assert throttle.allow('poll') is None
+    assert throttle.allow('poll') is None
+    throttle.last['poll'] -= 3600
+    assert throttle.allow('poll') == 2
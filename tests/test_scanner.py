@@ -0,0 +1,89 @@
+"""
+Offline tests for the streaming early-exit scanner against data/1.html.
+"""
+import httpx
+from bs4 import BeautifulSoup
+from src.bot import get_course_rows, find_row_by_kursnr, extract_booking_info_from_row
+from src.capture import CAPTURE, Capture
+from src.config import CaptureConfig, RecorderConfig
+from src.recorder import RECORDER
+from src.scanner import CourseScanner, find_course_streaming
+
+BASE_URL = "https://buchung.hsz.rwth-aachen.de/angebote/aktueller_zeitraum/_Basketball_Spielbetrieb.html"
+
+def chunked(body: bytes, size: int):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+def scan(body: bytes, kursnr: str, chunk_size: int = 37) -> CourseScanner:
+    scanner = CourseScanner(kursnr)
+    for chunk in chunked(body, chunk_size):
+        if scanner.feed(chunk):
+            break
+    return scanner
+
+def test_scanner_matches_soup(read_data):
+    body = read_data("1.html")
+    scanner = scan(body, "13131849")
+    assert scanner.done
+    assert len(scanner.buffer) < len(body)
+
+    booking_info = scanner.booking_info(BASE_URL)
+    row = find_row_by_kursnr(get_course_rows(BeautifulSoup(body, 'html.parser')), "13131849")
+    expected = extract_booking_info_from_row(row, BASE_URL)
+
+    assert booking_info['type'] == expected['type']
+    assert booking_info['url'] == expected['url']
+    assert booking_info['method'] == expected['method']
+    assert booking_info['inputs'] == {
+        'BS_Code': expected['inputs']['BS_Code'],
+        'BS_Kursid_223193': 'buchen',
+    }
+
+def test_scanner_states(read_data):
+    body = read_data("1.html")
+    assert scan(body, "13131812").state() == "Warteliste"
+    assert scan(body, "13131817").state() == "ab 07.12., 21:00"
+    assert scan(body, "13131817").booking_info(BASE_URL) is None
+
+def test_streaming_falls_back_to_soup(offline_config, read_data):
+    handler = lambda request: httpx.Response(200, content=read_data("1.html"))
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        assert find_course_streaming(client, offline_config, "13131849")['inputs']['BS_Kursid_223193'] == 'buchen'
+        assert find_course_streaming(client, offline_config, "99999999") is None
+
+def test_streamed_polls_are_captured(tmp_path, offline_config, read_data):
+    body = read_data("1.html")
+    handler = lambda request: httpx.Response(200, content=body)
+    CAPTURE.configure(CaptureConfig(enabled=True, dir=str(tmp_path)))
+    try:
+        with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+            assert find_course_streaming(client, offline_config, "13131849")['inputs']['BS_Kursid_223193'] == 'buchen'
+            assert find_course_streaming(client, offline_config, "13131817") is None
+    finally:
+        path = CAPTURE.close()
+        CAPTURE.configure(CaptureConfig())
+    capture = Capture(path)
+    # The whole page is kept, not just the part the scanner needed
+    assert len(capture) == 2 and all(capture.body(entry) == body for entry in capture.entries)
+
+def test_recorded_stream_still_stops_early(tmp_path, offline_config, read_data):
+    body = read_data("1.html")
+    sent = []
+
+    def chunks():
+        for chunk in chunked(body, 4096):
+            sent.append(chunk)
+            yield chunk
+
+    handler = lambda request: httpx.Response(200, content=chunks())
+    RECORDER.configure(RecorderConfig(enabled=True, dump_dir=str(tmp_path)))
+    try:
+        with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+            assert find_course_streaming(client, offline_config, "13131849")['inputs']['BS_Kursid_223193'] == 'buchen'
+        entry = RECORDER.responses[-1]
+    finally:
+        RECORDER.configure(RecorderConfig())
+    # The recorder keeps what the scanner read, the rest of the page is never fetched
+    assert sum(map(len, sent)) < len(body)
+    assert entry['status'] == 200 and entry['size'] == sum(map(len, sent))
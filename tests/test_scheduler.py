@@ -0,0 +1,51 @@
+"""
+Tests for the opening-time parser, the server clock estimate and burst pacing.
+"""
+from datetime import datetime
+from email.utils import formatdate
+from src.config import SchedulerConfig
+from src.scheduler import SERVER_TZ, parse_opening_time, ClockSync, BurstScheduler
+
+def test_parse_opening_time():
+    now = datetime(2025, 12, 3, 10, 0, tzinfo=SERVER_TZ)
+    assert parse_opening_time("ab 07.12., 21:00", now) == datetime(2025, 12, 7, 21, 0, tzinfo=SERVER_TZ)
+    # Around new year the closest year wins
+    assert parse_opening_time("ab 02.01., 19:30", now).year == 2026
+    assert parse_opening_time("Warteliste", now) is None
+
+def test_clock_sync_narrows_offset():
+    clock = ClockSync()
+    server_offset = 12.3
+    for local in (1000.0, 1000.45, 1000.9, 1001.35):
+        server = local + server_offset
+        clock.observe(local, local + 0.05, formatdate(int(server), usegmt=True))
+    assert abs(clock.offset - server_offset) <= clock.uncertainty
+    assert clock.uncertainty < 0.5
+
+class FixedClock(ClockSync):
+    def __init__(self, now: float):
+        super().__init__()
+        self.now = now
+
+    def server_time(self) -> float:
+        return self.now
+
+def test_burst_pacing():
+    settings = SchedulerConfig(enabled=True, slow_interval=5.0, burst_interval=0.1,
+                               burst_concurrency=4, burst_before=3.0, burst_after=60.0)
+    opening = datetime(2025, 12, 7, 21, 0, tzinfo=SERVER_TZ)
+    clock = FixedClock(opening.timestamp() - 600)
+    scheduler = BurstScheduler(settings, clock, opening)
+    assert scheduler.pacing() == (5.0, 1)
+
+    # Slow sleeps never overshoot the burst window
+    clock.now = opening.timestamp() - 5.0
+    interval, concurrency = scheduler.pacing()
+    assert concurrency == 1 and interval <= 2.0
+
+    clock.now = opening.timestamp() - 1.0
+    assert scheduler.pacing() == (0.1, 4)
+    clock.now = opening.timestamp() + 120
+    assert scheduler.pacing() == (5.0, 1)
+
+    assert BurstScheduler(settings, clock).pacing() is None
@@ -0,0 +1,83 @@
+"""
+Offline tests for the persistent session store.
+"""
+import json
+import time
+import asyncio
+import httpx
+from datetime import datetime, timedelta
+from src.config import SessionConfig, SchedulerConfig
+from src.scheduler import ClockSync, BurstScheduler, SERVER_TZ
+from src.session_store import SessionStore
+
+OFFER = "https://buchung.hsz.rwth-aachen.de/angebote/aktueller_zeitraum/_Basketball_Spielbetrieb.html"
+MOVED = "https://buchung.hsz.rwth-aachen.de/angebote/aktueller_zeitraum/basketball.html"
+
+def site(request):
+    if str(request.url) == OFFER:
+        return httpx.Response(301, headers={'Location': MOVED})
+    return httpx.Response(200, headers=[
+        ('Set-Cookie', 'sid=abc; Path=/'),
+        ('Set-Cookie', 'pref=1; Path=/; Max-Age=3600'),
+    ])
+
+def client(handler=site):
+    return httpx.Client(transport=httpx.MockTransport(handler), headers={'User-Agent': 'bot'}, follow_redirects=True)
+
+def test_roundtrip_restores_cookies_and_redirects(tmp_path):
+    settings = SessionConfig(enabled=True, path=str(tmp_path / "session.json"))
+    store = SessionStore(settings)
+    with client() as first:
+        store.install(first)
+        first.get(OFFER)
+        store.save(first)
+    assert [p.name for p in tmp_path.iterdir()] == ["session.json"]
+
+    restored = SessionStore(settings)
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200)
+
+    with client(handler) as second:
+        assert restored.restore(second) == 2
+        second.get(restored.resolve(OFFER))
+    # No redirect hop, and the cookies go out with the first request
+    assert [str(r.url) for r in requests] == [MOVED]
+    assert "sid=abc" in requests[0].headers['cookie']
+
+def test_expired_or_foreign_sessions_are_not_restored(tmp_path):
+    path = tmp_path / "session.json"
+    settings = SessionConfig(enabled=True, path=str(path), max_age=60)
+    cookie = {'name': 'sid', 'value': 'abc', 'domain': 'buchung.hsz.rwth-aachen.de', 'path': '/', 'secure': False}
+    path.write_text(json.dumps({
+        'saved_at': time.time(), 'user_agent': 'bot', 'redirects': {},
+        'cookies': [dict(cookie, expires=None), dict(cookie, name='old', expires=int(time.time()) - 1)],
+    }), encoding='utf-8')
+
+    with client() as c:
+        assert SessionStore(settings).restore(c) == 1
+    with httpx.Client(headers={'User-Agent': 'other'}) as c:
+        assert SessionStore(settings).restore(c) == 0
+    data = json.loads(path.read_text(encoding='utf-8'))
+    path.write_text(json.dumps(dict(data, saved_at=time.time() - 120)), encoding='utf-8')
+    with client() as c:
+        assert SessionStore(settings).restore(c) == 0
+
+def test_validation_once_before_opening_drops_rejected_session(tmp_path):
+    settings = SessionConfig(enabled=True, path=str(tmp_path / "session.json"), validate_before=30)
+    scheduler = BurstScheduler(SchedulerConfig(), ClockSync(), datetime.now(SERVER_TZ) + timedelta(seconds=20))
+    store = SessionStore(settings)
+    assert store.due_for_validation(scheduler)
+
+    async def check():
+        transport = httpx.MockTransport(lambda request: httpx.Response(403))
+        async with httpx.AsyncClient(transport=transport) as c:
+            c.cookies.set('sid', 'stale')
+            assert not await store.validate_async(c, OFFER)
+            assert not c.cookies
+
+    asyncio.run(check())
+    assert not store.due_for_validation(scheduler)
+    assert not (tmp_path / "session.json").exists()
@@ -0,0 +1,54 @@
+"""
+Waitlist monitor: jittered baseline polling within a global budget, booking when a slot frees up.
+"""
+import time
+import random
+import asyncio
+from src.config import OfferConfig, WaitlistConfig
+from src.mock_server import MockBookingServer
+from src.waitlist import WaitlistMonitor
+
+def test_interval_is_jittered_and_fits_the_budget(offline_config):
+    offline_config.waitlist = WaitlistConfig(interval=10.0, jitter=0.2, budget=0.5)
+    offers = [OfferConfig(f"https://buchung.hsz.rwth-aachen.de/angebote/aktueller_zeitraum/_{name}.html", kursnrs=["1"])
+              for name in ("Badminton", "Basketball_Spielbetrieb", "Volleyball", "Tennis", "Yoga", "Judo")]
+
+    async def check():
+        monitor = WaitlistMonitor(offline_config, offers, rng=random.Random(1))
+        # Six pages at 0.5 requests/s cannot be polled more often than every 12 s
+        assert monitor.baseline() == 12.0
+        intervals = [monitor.interval(monitor.pages[0]) for _ in range(200)]
+        await monitor.close()
+        return intervals
+
+    intervals = asyncio.run(check())
+    assert 12.0 * 0.8 <= min(intervals) < 11.0 and 13.0 < max(intervals) <= 12.0 * 1.2
+
+def test_books_when_slot_frees_up_within_budget(offline_config):
+    offline_config.waitlist = WaitlistConfig(interval=0.05, jitter=0.5, budget=20.0)
+    with MockBookingServer(opening_at=time.time() + 0.6, waitlist=True) as server:
+        # Several pages on one host share the global budget
+        offers = [OfferConfig(server.offer_url, kursnrs=["13131849"])]
+        offers += [OfferConfig(f"{server.offer_url}?page={i}", kursnrs=["0"]) for i in range(3)]
+
+        async def monitor():
+            watcher = WaitlistMonitor(offline_config, offers)
+            task = asyncio.create_task(watcher.run())
+            states = set()
+            deadline = time.monotonic() + 10
+            while not watcher.results and not task.done() and time.monotonic() < deadline:
+                states.update(state for page in watcher.pages for state in page.states.values())
+                await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return watcher, states
+
+        started = time.monotonic()
+        watcher, states = asyncio.run(monitor())
+        elapsed = time.monotonic() - started
+
+    assert "Warteliste" in states
+    assert watcher.results == {"Basketball Spielbetrieb/13131849": True}
+    assert server.stats['confirmations'] == 1
+    # One token up front plus 20 per second
+    assert server.stats['polls'] <= 1 + 20 * elapsed + 2
@@ -0,0 +1,69 @@
+"""
+Multi-offer watcher: shared host pools, priority by opening time, per-offer identity.
+"""
+import time
+import asyncio
+from datetime import datetime, timedelta
+from src.config import OfferConfig
+from src.mock_server import MockBookingServer
+from src.scheduler import SERVER_TZ
+from src.watcher import OfferWatcher, title_from_url, page_title
+
+def test_titles(read_data):
+    assert title_from_url("https://x/angebote/aktueller_zeitraum/_Basketball_Spielbetrieb.html") == "Basketball Spielbetrieb"
+    assert title_from_url("https://x/_Fu%DFball.html") == "Fußball"
+    assert page_title(read_data("1.html").decode('iso-8859-1')) == "Basketball Spielbetrieb"
+
+def test_pages_share_host_and_nearest_opening_polls_first(offline_config):
+    offline_config.watcher.host_rate = 1.0
+    urls = [f"https://buchung.hsz.rwth-aachen.de/angebote/aktueller_zeitraum/_{name}.html"
+            for name in ("Badminton", "Basketball_Spielbetrieb", "Volleyball")]
+    offers = [OfferConfig(url, kursnrs=["1"]) for url in urls]
+
+    async def check():
+        watcher = OfferWatcher(offline_config, offers)
+        assert len(watcher.hosts) == 1
+        badminton, basketball, volleyball = watcher.pages
+        now = datetime.now(SERVER_TZ)
+        badminton.scheduler.opening = now + timedelta(hours=2)
+        basketball.scheduler.opening = now + timedelta(minutes=1)
+        assert watcher.next_pages(time.monotonic()) == [basketball, badminton, volleyball]
+
+        # One token per second: only the most urgent page gets this tick
+        watcher.poll = lambda page: asyncio.sleep(0)
+        watcher.tick()
+        assert [page.polling for page in watcher.pages] == [False, True, False]
+        await asyncio.gather(*watcher.tasks)
+        await watcher.close()
+
+    asyncio.run(check())
+
+def test_books_open_offer_and_skips_foreign_page(offline_config):
+    offline_config.watcher.idle_interval = 0.05
+    with MockBookingServer() as open_now, MockBookingServer(opening_at=time.time() + 3600) as later:
+        offers = [
+            OfferConfig(open_now.offer_url, kursnrs=["13131849"]),
+            OfferConfig(later.offer_url, kursnrs=["13131849"]),
+            OfferConfig(later.offer_url + "?period=next", title="Volleyball", kursnrs=["13131849"]),
+        ]
+
+        async def watch():
+            watcher = OfferWatcher(offline_config, offers)
+            task = asyncio.create_task(watcher.run())
+            while not watcher.results:
+                await asyncio.sleep(0.02)
+            await asyncio.sleep(0.3)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return watcher
+
+        watcher = asyncio.run(watch())
+
+    booked, waiting, foreign = watcher.pages
+    assert watcher.results == {"Basketball Spielbetrieb/13131849": True}
+    assert open_now.stats['confirmations'] == 1 and later.stats['confirmations'] == 0
+    assert len(watcher.hosts) == 2
+    assert waiting.states["13131849"].startswith("ab ") and waiting.scheduler.opening
+    # The mismatched page is dropped after its first poll, unchanged polls are not parsed
+    assert foreign.verified is False and foreign.polls == 1
+    assert waiting.polls > 1 and waiting.parses == 1